@@ -29,6 +29,7 @@
 
 # pylint: disable=import-error
 from openshift_tools.zbxapi import ZabbixAPI, ZabbixConnection, ZabbixAPIError
+from openshift_tools.zbxapi.resolver import ZabbixResolver
 
 CUSTOM_SCRIPT_ACTION = '0'
 IPMI_ACTION = '1'
@@ -214,36 +215,19 @@ def operation_differences(zabbix_ops, user_ops):
 
 def get_users(zapi, users):
     '''get the mediatype id from the mediatype name'''
-    rval_users = []
+    userids = ZabbixResolver.shared(zapi).get_ids('user', users)
 
-    for user in users:
-        content = zapi.get_content('user',
-                                   'get',
-                                   {'filter': {'alias': user}})
-        rval_users.append({'userid': content['result'][0]['userid']})
-
-    return rval_users
+    return [{'userid': userids[user]} for user in users]
 
 def get_user_groups(zapi, groups):
     '''get the mediatype id from the mediatype name'''
-    user_groups = []
-
-    for group in groups:
-        content = zapi.get_content('usergroup',
-                                   'get',
-                                   {'search': {'name': group}})
-        for result in content['result']:
-            user_groups.append({'usrgrpid': result['usrgrpid']})
+    usrgrpids = ZabbixResolver.shared(zapi).get_ids('usergroup', groups)
 
-    return user_groups
+    return [{'usrgrpid': usrgrpids[group]} for group in groups if group in usrgrpids]
 
 def get_mediatype_id_by_name(zapi, m_name):
     '''get the mediatype id from the mediatype name'''
-    content = zapi.get_content('mediatype',
-                               'get',
-                               {'filter': {'description': m_name}})
-
-    return content['result'][0]['mediatypeid']
+    return ZabbixResolver.shared(zapi).get_ids('mediatype', [m_name])[m_name]
 
 def get_priority(priority):
     ''' determine priority
@@ -297,11 +281,7 @@ def get_condition_operator(inc_operator):
 
 def get_host_id_by_name(zapi, host_name):
     '''Get host id by name'''
-    content = zapi.get_content('host',
-                               'get',
-                               {'filter': {'name': host_name}})
-
-    return content['result'][0]['hostid']
+    return ZabbixResolver.shared(zapi).get_ids('host', [host_name], field='name')[host_name]
 
 def get_trigger_value(inc_trigger):
     '''determine the proper trigger value'''
@@ -315,20 +295,12 @@ def get_trigger_value(inc_trigger):
 
 def get_template_id_by_name(zapi, t_name):
     '''get the template id by name'''
-    content = zapi.get_content('template',
-                               'get',
-                               {'filter': {'host': t_name}})
-
-    return content['result'][0]['templateid']
+    return ZabbixResolver.shared(zapi).get_ids('template', [t_name])[t_name]
 
 
 def get_host_group_id_by_name(zapi, hg_name):
     '''Get hostgroup id by name'''
-    content = zapi.get_content('hostgroup',
-                               'get',
-                               {'filter': {'name': hg_name}})
-
-    return content['result'][0]['groupid']
+    return ZabbixResolver.shared(zapi).get_ids('hostgroup', [hg_name])[hg_name]
 
 def get_condition_type(event_source, inc_condition):
     '''determine the condition type'''
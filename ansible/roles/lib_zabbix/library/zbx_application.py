@@ -29,6 +29,7 @@ Ansible module for application
 
 # pylint: disable=import-error
 from openshift_tools.zbxapi import ZabbixAPI, ZabbixConnection
+from openshift_tools.zbxapi.resolver import ZabbixResolver
 
 def exists(content, key='result'):
     ''' Check if key exists in content or the size of content[key] > 0
@@ -45,14 +46,8 @@ def get_template_ids(zapi, template_name):
     '''
     get related templates
     '''
-    template_ids = []
     # Fetch templates by name
-    content = zapi.get_content('template',
-                               'get',
-                               {'search': {'host': template_name}})
-    if content.has_key('result'):
-        template_ids.append(content['result'][0]['templateid'])
-    return template_ids
+    return ZabbixResolver.shared(zapi).get_ids('template', [template_name]).values()
 
 def main():
     ''' Ansible module for application
@@ -96,6 +91,8 @@ def main():
             module.exit_json(changed=False, state="absent")
 
         content = zapi.get_content(zbx_class_name, 'delete', [content['result'][0][idname]])
+        # Don't let later modules resolve the name to the deleted id
+        ZabbixResolver.shared(zapi).forget(zbx_class_name)
         module.exit_json(changed=True, results=content['result'], state="absent")
 
     if state == 'present':
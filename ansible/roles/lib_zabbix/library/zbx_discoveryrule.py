@@ -26,6 +26,7 @@ Zabbix discovery rule ansible module
 
 # pylint: disable=import-error
 from openshift_tools.zbxapi import ZabbixAPI, ZabbixConnection
+from openshift_tools.zbxapi.resolver import ZabbixResolver
 
 def exists(content, key='result'):
     ''' Check if key exists in content or the size of content[key] > 0
@@ -38,18 +39,16 @@ def exists(content, key='result'):
 
     return True
 
-def get_template(zapi, template_name):
-    '''get a template by name
+def get_template_id(zapi, template_names):
+    '''get the id of the first of the templates that exists
     '''
-    content = zapi.get_content('template',
-                               'get',
-                               {'search': {'host': template_name},
-                                'output': 'extend',
-                                'selectInterfaces': 'interfaceid',
-                               })
-    if not content['result']:
-        return None
-    return content['result'][0]
+    template_ids = ZabbixResolver.shared(zapi).get_ids('template', template_names)
+
+    for template_name in template_names:
+        if template_ids.has_key(template_name):
+            return template_ids[template_name]
+
+    return None
 
 def get_type(vtype):
     '''
@@ -115,13 +114,13 @@ def main():
     idname = "itemid"
     dname = module.params['name']
     state = module.params['state']
-    template = get_template(zapi, module.params['template_name'])
+    templateid = get_template_id(zapi, module.params['template_name'])
 
     # selectInterfaces doesn't appear to be working but is needed.
     content = zapi.get_content(zbx_class_name,
                                'get',
                                {'search': {'name': dname},
-                                'templateids': template['templateid'],
+                                'templateids': templateid,
                                 #'selectDServices': 'extend',
                                 #'selectDChecks': 'extend',
                                 #'selectDhosts': 'dhostid',
@@ -141,6 +140,8 @@ def main():
             module.exit_json(changed=False, state="absent")
 
         content = zapi.get_content(zbx_class_name, 'delete', [content['result'][0][idname]])
+        # Don't let later modules resolve the key to the deleted id
+        ZabbixResolver.shared(zapi).forget(zbx_class_name)
         module.exit_json(changed=True, results=content['result'], state="absent")
 
 
@@ -148,7 +149,7 @@ def main():
     if state == 'present':
         params = {'name': dname,
                   'key_':  module.params['key'],
-                  'hostid':  template['templateid'],
+                  'hostid':  templateid,
                   'interfaceid': module.params['interfaceid'],
                   'lifetime': module.params['lifetime'],
                   'type': get_type(module.params['ztype']),
@@ -50,6 +50,7 @@
 
 # pylint: disable=import-error
 from openshift_tools.zbxapi import ZabbixAPI, ZabbixConnection
+from openshift_tools.zbxapi.resolver import ZabbixResolver
 
 def exists(content, key='result'):
     ''' Check if key exists in content or the size of content[key] > 0
@@ -96,14 +97,7 @@ def get_template_id(zapi, template_name):
     get related templates
     '''
     # Fetch templates by name
-    content = zapi.get_content('template',
-                               'get',
-                               {'filter': {'host': template_name},})
-
-    if content.has_key('result'):
-        return content['result'][0]['templateid']
-
-    return None
+    return ZabbixResolver.shared(zapi).get_id('template', template_name)
 
 def get_color(color_in):
     ''' Receive a color and translate it to a hex representation of the color
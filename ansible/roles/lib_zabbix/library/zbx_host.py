@@ -26,6 +26,7 @@ Zabbix host ansible module
 
 # pylint: disable=import-error
 from openshift_tools.zbxapi import ZabbixAPI, ZabbixConnection
+from openshift_tools.zbxapi.resolver import ZabbixResolver
 
 def exists(content, key='result'):
     ''' Check if key exists in content or the size of content[key] > 0
@@ -42,26 +43,19 @@ def get_group_ids(zapi, hostgroup_names):
     '''
     get hostgroups
     '''
-    # Fetch groups by name
-    group_ids = []
-    for hgr in hostgroup_names:
-        content = zapi.get_content('hostgroup', 'get', {'search': {'name': hgr}})
-        if content.has_key('result'):
-            group_ids.append({'groupid': content['result'][0]['groupid']})
+    # Fetch all of the groups by name at once
+    group_ids = ZabbixResolver.shared(zapi).get_ids('hostgroup', hostgroup_names)
 
-    return group_ids
+    return [{'groupid': group_ids[hgr]} for hgr in hostgroup_names if hgr in group_ids]
 
 def get_template_ids(zapi, template_names):
     '''
     get related templates
     '''
-    template_ids = []
-    # Fetch templates by name
-    for template_name in template_names:
-        content = zapi.get_content('template', 'get', {'search': {'host': template_name}})
-        if content.has_key('result'):
-            template_ids.append({'templateid': content['result'][0]['templateid']})
-    return template_ids
+    # Fetch all of the templates by name at once
+    template_ids = ZabbixResolver.shared(zapi).get_ids('template', template_names)
+
+    return [{'templateid': template_ids[tname]} for tname in template_names if tname in template_ids]
 
 def interfaces_equal(zbx_interfaces, user_interfaces):
     '''
@@ -123,6 +117,9 @@ def main():
             module.exit_json(changed=False, state="absent")
 
         content = zapi.get_content(zbx_class_name, 'delete', [content['result'][0][idname]])
+        # Don't let later modules resolve the name (or the names of its applications,
+        # items and triggers, which were deleted with it) to the deleted ids
+        ZabbixResolver.shared(zapi).forget(zbx_class_name)
         module.exit_json(changed=True, results=content['result'], state="absent")
 
     if state == 'present':
@@ -28,6 +28,7 @@
 
 # pylint: disable=import-error
 from openshift_tools.zbxapi import ZabbixAPI, ZabbixConnection
+from openshift_tools.zbxapi.resolver import ZabbixResolver
 
 def exists(content, key='result'):
     ''' Check if key exists in content or the size of content[key] > 0
@@ -79,6 +80,8 @@ def main():
             module.exit_json(changed=False, state="absent")
 
         content = zapi.get_content(zbx_class_name, 'delete', [content['result'][0][idname]])
+        # Don't let later modules resolve the name to the deleted id
+        ZabbixResolver.shared(zapi).forget(zbx_class_name)
         module.exit_json(changed=True, results=content['result'], state="absent")
 
     if state == 'present':
@@ -29,6 +29,7 @@
 
 # pylint: disable=import-error
 from openshift_tools.zbxapi import ZabbixAPI, ZabbixConnection
+from openshift_tools.zbxapi.resolver import ZabbixResolver
 
 def exists(content, key='result'):
     ''' Check if key exists in content or the size of content[key] > 0
@@ -64,37 +65,19 @@ def get_app_id(zapi, application):
     '''
     get related templates
     '''
-    # Fetch templates by name
-    content = zapi.get_content('application',
-                               'get',
-                               {'search': {'name': application},
-                                'selectApplications': ['applicationid', 'name']})
-    if content.has_key('result'):
-        return content['result'][0]['applicationid']
-
-    return None
+    # Fetch applications by name
+    return ZabbixResolver.shared(zapi).get_id('application', application)
 
 def get_template_id(zapi, template_name):
     '''
     get related templates
     '''
     # Fetch templates by name
-    content = zapi.get_content('template',
-                               'get',
-                               {'search': {'host': template_name},
-                                'selectApplications': ['applicationid', 'name']})
-    if content.has_key('result'):
-        return content['result'][0]['templateid']
-
-    return None
+    return ZabbixResolver.shared(zapi).get_id('template', template_name)
 
 def get_host_id_by_name(zapi, host_name):
     '''Get host id by name'''
-    content = zapi.get_content('host',
-                               'get',
-                               {'filter': {'name': host_name}})
-
-    return content['result'][0]['hostid']
+    return ZabbixResolver.shared(zapi).get_ids('host', [host_name], field='name')[host_name]
 
 def get_status(status):
     ''' Determine the status of the web scenario  '''
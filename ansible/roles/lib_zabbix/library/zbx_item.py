@@ -29,6 +29,7 @@
 
 # pylint: disable=import-error
 from openshift_tools.zbxapi import ZabbixAPI, ZabbixConnection
+from openshift_tools.zbxapi.resolver import ZabbixResolver
 
 def exists(content, key='result'):
     ''' Check if key exists in content or the size of content[key] > 0
@@ -80,33 +81,23 @@ def get_value_type(value_type):
 
     return vtype
 
-def get_app_ids(application_names, app_name_ids):
+def get_app_ids(zapi, application_names, templateid):
     ''' get application ids from names
     '''
-    applications = []
-    if application_names:
-        for app in application_names:
-            applications.append(app_name_ids[app])
+    if not application_names:
+        return []
 
-    return applications
+    app_ids = ZabbixResolver.shared(zapi).get_ids('application', application_names, params={'templateids': templateid})
+
+    return [app_ids[app_name] for app_name in application_names if app_name in app_ids]
 
 def get_template_id(zapi, template_name):
     '''
     get related templates
     '''
-    template_ids = []
-    app_ids = {}
-    # Fetch templates by name
-    content = zapi.get_content('template',
-                               'get',
-                               {'search': {'host': template_name},
-                                'selectApplications': ['applicationid', 'name']})
-    if content.has_key('result'):
-        template_ids.append(content['result'][0]['templateid'])
-        for app in content['result'][0]['applications']:
-            app_ids[app['name']] = app['applicationid']
+    templateid = ZabbixResolver.shared(zapi).get_id('template', template_name)
 
-    return template_ids, app_ids
+    return [templateid] if templateid else []
 
 def get_multiplier(inval):
     ''' Determine the multiplier
@@ -197,7 +188,7 @@ def main():
     zbx_class_name = 'item'
     state = module.params['state']
 
-    templateid, app_name_ids = get_template_id(zapi, module.params['template_name'])
+    templateid = get_template_id(zapi, module.params['template_name'])
 
     # Fail if a template was not found matching the name
     if not templateid:
@@ -227,6 +218,8 @@ def main():
             module.exit_json(changed=False, state="absent")
 
         content = zapi.get_content(zbx_class_name, 'delete', [content['result'][0]['itemid']])
+        # Don't let later modules resolve the key (or the item's triggers) to the deleted ids
+        ZabbixResolver.shared(zapi).forget(zbx_class_name)
         module.exit_json(changed=True, results=content['result'], state="absent")
 
     # Create and Update
@@ -239,7 +232,7 @@ def main():
                   'type': get_zabbix_type(module.params['zabbix_type']),
                   'value_type': get_value_type(module.params['value_type']),
                   'data_type': get_data_type(module.params['data_type']),
-                  'applications': get_app_ids(module.params['applications'], app_name_ids),
+                  'applications': get_app_ids(zapi, module.params['applications'], templateid[0]),
                   'formula': formula,
                   'multiplier': use_multiplier,
                   'description': module.params['description'],
@@ -26,6 +26,7 @@ Zabbix discovery rule ansible module
 
 # pylint: disable=import-error
 from openshift_tools.zbxapi import ZabbixAPI, ZabbixConnection
+from openshift_tools.zbxapi.resolver import ZabbixResolver
 
 def exists(content, key='result'):
     ''' Check if key exists in content or the size of content[key] > 0
@@ -167,12 +168,9 @@ def get_status(status):
 def get_app_ids(zapi, application_names, templateid):
     ''' get application ids from names
     '''
-    app_ids = []
-    for app_name in application_names:
-        content = zapi.get_content('application', 'get', {'filter': {'name': app_name}, 'templateids': templateid})
-        if content.has_key('result'):
-            app_ids.append(content['result'][0]['applicationid'])
-    return app_ids
+    app_ids = ZabbixResolver.shared(zapi).get_ids('application', application_names, params={'templateids': templateid})
+
+    return [app_ids[app_name] for app_name in application_names if app_name in app_ids]
 
 # pylint: disable=too-many-branches
 def main():
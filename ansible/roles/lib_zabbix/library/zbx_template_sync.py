@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+'''
+Ansible module for syncing a whole template
+'''
+# vim: expandtab:tabstop=4:shiftwidth=4
+#
+#   Zabbix template sync ansible module
+#
+#
+#   Copyright 2016 Red Hat Inc.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+# This is in place because each module looks similar to each other.
+# These need duplicate code as their behavior is very similar
+# but different for each zabbix class.
+# pylint: disable=duplicate-code
+
+# pylint: disable=import-error
+from openshift_tools.zbxapi import ZabbixAPI, ZabbixConnection, ZabbixAPIError
+from openshift_tools.zbxapi.resolver import ZabbixResolver
+from openshift_tools.zbxapi.templatesync import ZabbixTemplateSync
+
+def forget_deleted(zapi, changes):
+    ''' Don't let later modules resolve the names of pruned objects to their deleted ids '''
+    for zbx_class, verbs in changes.items():
+        if verbs.get('delete') and ZabbixResolver.fields.has_key(zbx_class):
+            ZabbixResolver.shared(zapi).forget(zbx_class)
+
+def main():
+    ''' Ansible module for syncing a whole template
+
+    Example:
+    - zbx_template_sync:
+        zbx_server: "{{ server }}"
+        zbx_user: "{{ user }}"
+        zbx_password: "{{ password }}"
+        template: "{{ g_template_os_linux }}"
+        fingerprint: True
+    '''
+
+    module = AnsibleModule(
+        argument_spec=dict(
+            zbx_server=dict(default='https://localhost/zabbix/api_jsonrpc.php', type='str'),
+            zbx_user=dict(default=os.environ.get('ZABBIX_USER', None), type='str'),
+            zbx_password=dict(default=os.environ.get('ZABBIX_PASSWORD', None), type='str'),
+            zbx_debug=dict(default=False, type='bool'),
+            template=dict(default=None, type='dict'),
+            prune=dict(default=False, type='bool'),
+            fingerprint=dict(default=False, type='bool'),
+            fingerprint_index=dict(default=None, type='str'),
+        ),
+        supports_check_mode=True
+    )
+
+    zapi = ZabbixAPI(ZabbixConnection(module.params['zbx_server'],
+                                      module.params['zbx_user'],
+                                      module.params['zbx_password'],
+                                      module.params['zbx_debug']))
+
+    template = module.params['template']
+    if not template or not template.get('name'):
+        module.exit_json(failed=True,
+                         changed=False,
+                         results='Must specifiy a template with a name.',
+                         state="present")
+
+    sync = ZabbixTemplateSync(zapi, template,
+                              check_mode=module.check_mode,
+                              prune=module.params['prune'],
+                              fingerprint=module.params['fingerprint'],
+                              index_file=module.params['fingerprint_index'])
+
+    try:
+        changed = sync.sync()
+    except ZabbixAPIError as error:
+        if not module.check_mode:
+            forget_deleted(zapi, sync.changes)
+        module.exit_json(failed=True, changed=sync.changed, results=str(error), changes=sync.changes,
+                         state="present")
+
+    if not module.check_mode:
+        forget_deleted(zapi, sync.changes)
+
+    module.exit_json(changed=changed, results=sync.changes, state="present")
+
+# pylint: disable=redefined-builtin, unused-wildcard-import, wildcard-import, locally-disabled
+# import module snippets.  This are required
+from ansible.module_utils.basic import *
+
+main()
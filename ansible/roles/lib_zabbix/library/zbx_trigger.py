@@ -29,6 +29,7 @@ ansible module for zabbix triggers
 
 # pylint: disable=import-error
 from openshift_tools.zbxapi import ZabbixAPI, ZabbixConnection
+from openshift_tools.zbxapi.resolver import ZabbixResolver
 
 def exists(content, key='result'):
     ''' Check if key exists in content or the size of content[key] > 0
@@ -61,18 +62,9 @@ def get_priority(priority):
 def get_deps(zapi, deps):
     ''' get trigger dependencies
     '''
-    results = []
-    for desc in deps:
-        content = zapi.get_content('trigger',
-                                   'get',
-                                   {'filter': {'description': desc},
-                                    'expandExpression': True,
-                                    'selectDependencies': 'triggerid',
-                                   })
-        if content.has_key('result'):
-            results.append({'triggerid': content['result'][0]['triggerid']})
+    triggerids = ZabbixResolver.shared(zapi).get_ids('trigger', deps)
 
-    return results
+    return [{'triggerid': triggerids[desc]} for desc in deps if desc in triggerids]
 
 
 def get_trigger_status(inc_status):
@@ -90,19 +82,9 @@ def get_template_id(zapi, template_name):
     '''
     get related templates
     '''
-    template_ids = []
-    app_ids = {}
-    # Fetch templates by name
-    content = zapi.get_content('template',
-                               'get',
-                               {'search': {'host': template_name},
-                                'selectApplications': ['applicationid', 'name']})
-    if content.has_key('result'):
-        template_ids.append(content['result'][0]['templateid'])
-        for app in content['result'][0]['applications']:
-            app_ids[app['name']] = app['applicationid']
+    templateid = ZabbixResolver.shared(zapi).get_id('template', template_name)
 
-    return template_ids, app_ids
+    return [templateid] if templateid else []
 
 def main():
     '''
@@ -155,7 +137,7 @@ def main():
 
     templateid = None
     if module.params['template_name']:
-        templateid, _ = get_template_id(zapi, module.params['template_name'])
+        templateid = get_template_id(zapi, module.params['template_name'])
 
     content = zapi.get_content(zbx_class_name,
                                'get',
@@ -175,6 +157,8 @@ def main():
         if not exists(content):
             module.exit_json(changed=False, state="absent")
         content = zapi.get_content(zbx_class_name, 'delete', [content['result'][0][idname]])
+        # Don't let later modules resolve the description to the deleted id
+        ZabbixResolver.shared(zapi).forget(zbx_class_name)
         module.exit_json(changed=True, results=content['result'], state="absent")
 
     # Create and Update
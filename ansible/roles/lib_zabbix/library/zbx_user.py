@@ -28,6 +28,7 @@ ansible module for zabbix users
 
 # pylint: disable=import-error
 from openshift_tools.zbxapi import ZabbixAPI, ZabbixConnection
+from openshift_tools.zbxapi.resolver import ZabbixResolver
 
 def exists(content, key='result'):
     ''' Check if key exists in content or the size of content[key] > 0
@@ -43,16 +44,8 @@ def exists(content, key='result'):
 def get_usergroups(zapi, usergroups):
     ''' Get usergroups
     '''
-    ugroups = []
-    for ugr in usergroups:
-        content = zapi.get_content('usergroup',
-                                   'get',
-                                   {'search': {'name': ugr},
-                                    #'selectUsers': 'userid',
-                                    #'getRights': 'extend'
-                                   })
-        if content['result']:
-            ugroups.append({'usrgrpid': content['result'][0]['usrgrpid']})
+    usrgrpids = ZabbixResolver.shared(zapi).get_ids('usergroup', usergroups)
+    ugroups = [{'usrgrpid': usrgrpids[ugr]} for ugr in usergroups if ugr in usrgrpids]
 
     return ugroups or None
 
@@ -129,6 +122,8 @@ def main():
             module.exit_json(changed=False, state="absent")
 
         content = zapi.get_content(zbx_class_name, 'delete', [content['result'][0][idname]])
+        # Don't let later modules resolve the name to the deleted id
+        ZabbixResolver.shared(zapi).forget(zbx_class_name)
         module.exit_json(changed=True, results=content['result'], state="absent")
 
     if state == 'present':
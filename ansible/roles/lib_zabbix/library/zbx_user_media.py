@@ -29,6 +29,7 @@
 
 # pylint: disable=import-error
 from openshift_tools.zbxapi import ZabbixAPI, ZabbixConnection
+from openshift_tools.zbxapi.resolver import ZabbixResolver
 
 def exists(content, key='result'):
     ''' Check if key exists in content or the size of content[key] > 0
@@ -54,11 +55,7 @@ def get_mtype(zapi, mtype):
     except ValueError:
         pass
 
-    content = zapi.get_content('mediatype', 'get', {'filter': {'description': mtype}})
-    if content.has_key('result') and content['result']:
-        return content['result'][0]['mediatypeid']
-
-    return None
+    return ZabbixResolver.shared(zapi).get_id('mediatype', mtype)
 
 def get_user(zapi, user):
     ''' Get userids from user aliases
@@ -33,6 +33,7 @@ zabbix ansible module for usergroups
 
 # pylint: disable=import-error
 from openshift_tools.zbxapi import ZabbixAPI, ZabbixConnection
+from openshift_tools.zbxapi.resolver import ZabbixResolver
 
 def exists(content, key='result'):
     ''' Check if key exists in content or the size of content[key] > 0
@@ -51,18 +52,19 @@ def get_rights(zapi, rights):
     if rights == None:
         return None
 
+    groupids = ZabbixResolver.shared(zapi).get_ids('hostgroup', [right.keys()[0] for right in rights])
+
     perms = []
     for right in rights:
         hstgrp = right.keys()[0]
         perm = right.values()[0]
-        content = zapi.get_content('hostgroup', 'get', {'search': {'name': hstgrp}})
-        if content['result']:
+        if groupids.has_key(hstgrp):
             permission = 0
             if perm == 'ro':
                 permission = 2
             elif perm == 'rw':
                 permission = 3
-            perms.append({'id': content['result'][0]['groupid'],
+            perms.append({'id': groupids[hstgrp],
                           'permission': permission})
     return perms
 
@@ -102,13 +104,9 @@ def get_userids(zapi, users):
     if not users:
         return None
 
-    userids = []
-    for alias in users:
-        content = zapi.get_content('user', 'get', {'search': {'alias': alias}})
-        if content['result']:
-            userids.append(content['result'][0]['userid'])
+    userids = ZabbixResolver.shared(zapi).get_ids('user', users)
 
-    return userids
+    return [userids[alias] for alias in users if alias in userids]
 
 def main():
     ''' Ansible module for usergroup
@@ -163,6 +161,8 @@ def main():
             module.exit_json(failed=True, changed=False, results='Need to pass in a user.', state="error")
 
         content = zapi.get_content(zbx_class_name, 'delete', [content['result'][0][idname]])
+        # Don't let later modules resolve the name to the deleted id
+        ZabbixResolver.shared(zapi).forget(zbx_class_name)
         module.exit_json(changed=True, results=content['result'], state="absent")
 
     # Create and Update
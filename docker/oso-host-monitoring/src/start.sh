@@ -20,6 +20,10 @@ time ansible-playbook /root/config.yml
 # Send a heartbeat when the container starts up
 /usr/bin/ops-zagg-client --send-heartbeat
 
+# fire off the docker info collector, which the docker checks read from.
+# The loop restarts it if it ever exits.
+/usr/local/bin/ops-run-in-loop 10 /usr/bin/ops-docker-info-collector &>> /var/log/ops-docker-info-collector.log &
+
 # fire off the check pmcd status script
 check-pmcd-status.sh &
 # fire off the pmcd script
@@ -29,9 +29,11 @@ sleep 3
 echo "Done."
 
 
-# Process and send metrics every minute
-echo -n "Starting metric processing loop... "
-/usr/local/bin/ops-run-in-loop 30 "/usr/bin/flock -n /var/tmp/ops-zagg-metric-processor.lock -c '/usr/bin/timeout -s9 600s /usr/bin/ops-zagg-metric-processor' &> /dev/null" &>> /var/log/ops-zagg-metric-processor.log  &
+# Process and send metrics as soon as they arrive. The daemon keeps running;
+# the loop only restarts it if it ever exits, which it does when a processing
+# cycle of a target hangs past its timeout (--timeout, 540s by default).
+echo -n "Starting metric processing daemon... "
+/usr/local/bin/ops-run-in-loop 30 "/usr/bin/flock -n /var/tmp/ops-zagg-metric-processor.lock -c '/usr/bin/ops-zagg-metric-processor --daemon' &> /dev/null" &>> /var/log/ops-zagg-metric-processor.log  &
 echo "Done."
 
 # Process heartbeats every minute
@@ -41,17 +41,20 @@ class SimpleZabbixRaw(object):
     what ansible returns (no processing done, no evaluations made).
     """
 
-    def __init__(self, url, user, password):
+    def __init__(self, url, user, password, api_stats_file=None):
         """Contructs the object
 
         Args:
             url: the zabbix api URL (ex: http://localhost/zabbix/api_jsonrpc.php)
             user: the zabbix api user
             password: the zabbix api password
+            api_stats_file: if set, the zabbix modules record their api calls in this file
+                            (see openshift_tools.zbxapi.ZabbixAPIStats)
         """
         self.url = url
         self.user = user
         self.password = password
+        self.api_stats_file = api_stats_file
 
         # for now, we want to always run the zabbix module locally
         self.pattern = 'localhost'
@@ -169,12 +172,18 @@ class SimpleZabbixRaw(object):
     def _run_ansible(self, args):
         """Actually make the call to the ansible runner."""
         zclass = args.pop('zbx_class')
+
+        environment = {}
+        if self.api_stats_file:
+            environment['ZABBIX_API_STATS'] = self.api_stats_file
+
         results = ansible.runner.Runner(
             forks=1,
             pattern=self.pattern,
             transport='local',
             module_name=zclass,
             complex_args=args,
+            environment=environment,
         ).run()
 
         if not results:
@@ -198,15 +207,16 @@ class SimpleZabbix(object):
     90% simple cases. For the other 10% cases, use SimpleZabbixRaw or the
     Ansible runner interface directly.
     """
-    def __init__(self, url, user, password):
+    def __init__(self, url, user, password, api_stats_file=None):
         """Contructs the object
 
         Args:
             url: the zabbix api URL (ex: http://localhost/zabbix/api_jsonrpc.php)
             user: the zabbix api user
             password: the zabbix api password
+            api_stats_file: if set, the zabbix modules record their api calls in this file
         """
-        self.raw = SimpleZabbixRaw(url, user, password)
+        self.raw = SimpleZabbixRaw(url, user, password, api_stats_file)
 
     def ensure_host_exists(self, name, templates, hostgroups):
         """Ensures a host entry is present in zabbix.
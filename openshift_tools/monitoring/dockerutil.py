@@ -11,7 +11,13 @@
 
 
 from openshift_tools.timeout import timeout
+import json
+import os
 import re
+import time
+
+# Where ops-docker-info-collector keeps the results of its 'docker info' calls
+DOCKER_INFO_CACHE = '/var/tmp/openshift_tools_docker_info.json'
 
 class DockerDiskStats(object):
     ''' Class to store docker storage information
@@ -50,30 +56,147 @@ class DockerDiskStats(object):
                '  metadata_space_percent_available: %r\n' % self.metadata_space_percent_available + \
                ')'
 
+    def to_dict(self):
+        ''' the stats as a dict, e.g. to cache them
+        '''
+        return dict(self.__dict__)
+
+    @staticmethod
+    def from_dict(data):
+        ''' the stats of a dict made by to_dict
+        '''
+        dds = DockerDiskStats()
+        dds.__dict__.update(data)
+        return dds
+
 class ParseError(Exception):
     ''' Exception class for when we can't parse the docker info
     '''
     pass
 
+class DockerInfoUnavailable(Exception):
+    ''' Exception class for when the docker info cache has no recent, successful call
+    '''
+    pass
+
+class DockerInfoCache(object):
+    ''' The result of the last 'docker info' call, kept in a file by ops-docker-info-collector
+        so that nothing else ever waits on the docker daemon. The file has:
+
+          time:         when the last call ended
+          latency:      the seconds it took (max_wait, if it timed out)
+          error:        why it failed, or None
+          last_success: when the last successful call ended
+          info:         the output of the last successful call
+          disk_usage:   its DockerDiskStats, as a dict (None if they couldn't be parsed)
+          started:      when the call in progress started, or None
+    '''
+
+    def __init__(self, path=None):
+        ''' construct the object
+        '''
+        self.path = path or DOCKER_INFO_CACHE
+
+    def read(self):
+        ''' The cache as a dict, or an empty dict if it can't be read
+        '''
+        try:
+            with open(self.path) as cache_file:
+                return json.load(cache_file)
+        except (IOError, ValueError):
+            return {}
+
+    def read_recent(self, max_age):
+        ''' The cache, if the last call ended at most max_age seconds ago.
+            Raises DockerInfoUnavailable otherwise.
+        '''
+        cache = self.read()
+        if not cache.get('time'):
+            raise DockerInfoUnavailable("No docker info in %s, is ops-docker-info-collector running?" % self.path)
+
+        if time.time() - cache['time'] > max_age:
+            raise DockerInfoUnavailable("The last docker info call ended more than %ss ago" % max_age)
+
+        return cache
+
+    def write(self, cache):
+        ''' Replace the cache atomically
+        '''
+        tmp_path = "%s.%s.tmp" % (self.path, os.getpid())
+        with open(tmp_path, 'w') as cache_file:
+            json.dump(cache, cache_file)
+        os.rename(tmp_path, self.path)
+
+    def refresh(self, docker_client_factory, max_wait):
+        ''' Call 'docker info', giving up after max_wait seconds, and cache the result.
+            The docker client comes from docker_client_factory(), inside the call, so that
+            failing to create it is cached like any other failure. Returns the new cache.
+        '''
+        cache = self.read()
+        cache['started'] = time.time()
+
+        try:
+            self.write(cache)
+
+            docker_util = DockerUtil(docker_client_factory(), max_wait=max_wait)
+            info = docker_util.get_info()
+            cache.update({'info': info, 'error': None, 'last_success': time.time()})
+
+            try:
+                cache['disk_usage'] = docker_util.get_disk_usage().to_dict()
+            except (ParseError, IndexError, KeyError, ZeroDivisionError):
+                # e.g. a storage driver other than devicemapper
+                cache['disk_usage'] = None
+
+        # Reason: disable pylint broad-except because any failure talking to docker is cached as is
+        # Status: permanently disabled
+        # pylint: disable=broad-except
+        except Exception as error:
+            cache['error'] = '%s: %s' % (error.__class__.__name__, error)
+
+        cache['time'] = time.time()
+        cache['latency'] = cache['time'] - cache['started']
+        cache['started'] = None
+        self.write(cache)
+
+        return cache
+
 class DockerUtil(object):
     ''' docker stats storage
     '''
-    def __init__(self, docker_client=None, max_wait=15):
+    def __init__(self, docker_client=None, max_wait=15, info_cache=None, max_age=900):
         ''' construct the object
+
+            With an info_cache (a DockerInfoCache) instead of a docker_client,
+            the docker info is the last one the cache got, as long as that call
+            succeeded and ended at most max_age seconds ago.
         '''
         self._docker = docker_client
         self._max_wait = max_wait
+        self._info_cache = info_cache
+        self._max_age = max_age
         self.__docker_info = None
 
     @property
     def _cached_docker_info(self):
         ''' Returns 'docker info' output as long as it doesn't take too long '''
         if not self.__docker_info:
-            with timeout(seconds=self._max_wait):
-                self.__docker_info = self._docker.info()
+            if self._docker is None and self._info_cache:
+                cache = self._info_cache.read_recent(self._max_age)
+                if cache.get('error'):
+                    raise DockerInfoUnavailable("The last docker info call failed: %s" % cache['error'])
+                self.__docker_info = cache['info']
+            else:
+                with timeout(seconds=self._max_wait):
+                    self.__docker_info = self._docker.info()
 
         return self.__docker_info
 
+    def get_info(self):
+        ''' Returns the 'docker info' output
+        '''
+        return self._cached_docker_info
+
     @staticmethod
     def convert_to_size_in_gb(value):
         ''' Parses out the number and unit type and normalizes the data to GB
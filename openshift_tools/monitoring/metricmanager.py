@@ -29,6 +29,15 @@
         # Read metrics from disk and print them:
         all_metrics = mm.read_metrics()
 
+        # Read metrics from disk 1000 at a time:
+        metric_iter = mm.iter_metrics()
+        for batch in iter(lambda: list(itertools.islice(metric_iter, 1000)), []):
+            print batch
+
+        # Read only one type of metric from disk (the other type is never parsed):
+        zbx_metrics = mm.read_metrics(MetricManager.ZBX_METRICS)
+        hb_metrics = mm.read_metrics(MetricManager.HEARTBEAT_METRICS)
+
         # Print out just the zabbix metrics:
         for metric in mm.filter_zbx_metrics(all_metrics):
             print metric
@@ -39,15 +48,63 @@
 
         # Delete this specific metric from disk
         mm.remove_metrics([zbx_metric, hb_metric]) # this can be a single metric too!
+
+        # Record a failed send; the metric moves to the dead-letter area after 10 failures
+        mm.record_failed_attempt(zbx_metric, 'connection refused', max_attempts=10)
+
+        # Look at, replay or purge the dead-lettered metrics
+        dead_metrics = mm.read_dead_letter_metrics()
+        mm.replay_dead_letter_metrics(dead_metrics)
+        mm.purge_dead_letter_metrics(dead_metrics)
+
+        # How many metrics are waiting, without listing the disk cache
+        print mm.spool_depths()
 '''
 
+import errno
+import fcntl
+import json
 import yaml
 import os
+import socket
+import threading
 import uuid
 import calendar
 import time
 import zbxsend
 
+# Heartbeats are written with this filename prefix so that readers can tell
+# the metric types apart by filename alone, without parsing the file.
+HEARTBEAT_PREFIX = 'hb-'
+
+# Metrics that can't be delivered are moved to this subdirectory of the disk cache.
+DEAD_LETTER_DIRECTORY = 'dead-letter'
+
+# Counters of the metrics written to and removed from each area of the disk cache
+# (zbx metrics, heartbeats and the dead-letter area):
+#   {"zbx": {"written": 10, "removed": 7}, "heartbeat": {...}, "dead-letter": {...}}
+# The depth of an area is written - removed.
+#
+# Every process that writes to or removes from the disk cache (the zagg web workers,
+# the processors) keeps its own counters in STATE_DIRECTORY, as
+# <host>-<pid>-<id>.counters, so that none of them locks or rewrites a file the others
+# write. SPOOL_STATS_FILE holds the counters of the processes that are gone, and is
+# reconciled with a listing of the disk cache by every processor cycle. The counters
+# of the disk cache are the sum of all of these files.
+SPOOL_STATS_FILE = 'spool-stats.json'
+PROCESS_STATS_SUFFIX = '.counters'
+
+# What the last metric processor cycle on the disk cache did (see write_processor_state)
+PROCESSOR_STATE_FILE = 'processor-state.json'
+
+# The bookkeeping files above are kept in this subdirectory of the disk cache, so that
+# updating them doesn't change the mtime of the disk cache. The processor daemon
+# takes a change of that mtime to mean new metrics.
+STATE_DIRECTORY = 'state'
+
+# The counters of this process, {metrics directory: counters}, and the name of its file
+_PROCESS_STATS = {'pid': None, 'name': None, 'counters': {}}
+_PROCESS_STATS_LOCK = threading.Lock()
 
 # Reason: disable pylint too-few-public-methods because this is
 #     a DTO with a little ctor logic.
@@ -58,6 +115,12 @@ class UniqueMetric(zbxsend.Metric):
         adds a unique ID, plus also adds auto-populating of the clock value.
     '''
 
+    # Delivery bookkeeping. These are only set on the instance (and so only
+    # written to disk) once a send of this metric has failed.
+    attempts = 0
+    last_error = None
+    dead_letter_reason = None
+
     # Reason: disable pylint too-many-arguments because this is a data only
     #         object, and we like to use the constructor to populate the
     #         data easily.
@@ -82,7 +145,10 @@ class UniqueMetric(zbxsend.Metric):
         else:
             self.unique_id = unique_id
 
-        self.filename = self.unique_id + '.yml'
+        if key == 'heartbeat':
+            self.filename = HEARTBEAT_PREFIX + self.unique_id + '.yml'
+        else:
+            self.filename = self.unique_id + '.yml'
 
         super(UniqueMetric, self).__init__(host, key, value, clock)
 
@@ -152,6 +218,10 @@ class MetricManager(object):
     ''' Manages a disk cache of metrics.
     '''
 
+    # Metric types that read_metrics() can be limited to
+    ZBX_METRICS = 'zbx'
+    HEARTBEAT_METRICS = 'heartbeat'
+
     def __init__(self, metrics_directory):
         ''' Construct object
 
@@ -159,6 +229,11 @@ class MetricManager(object):
             metrics_directory -- the directory where the metrics should be stored
         '''
         self.metrics_directory = metrics_directory
+        self.dead_letter_directory = os.path.join(metrics_directory, DEAD_LETTER_DIRECTORY)
+        self.state_directory = os.path.join(metrics_directory, STATE_DIRECTORY)
+
+        # The clocks of the metrics read by the last iter_metrics that are still on disk
+        self.pending_clocks = {}
 
     def metric_full_path(self, filename):
         ''' generates the full path of a specific metric.
@@ -177,6 +252,15 @@ class MetricManager(object):
         if not isinstance(metrics, list):
             metrics = [metrics]
 
+        self._dump_metrics(metrics)
+        self._update_spool_stats('written', self._count_areas(metrics))
+
+    def _dump_metrics(self, metrics):
+        ''' write (or overwrite) the files of a list of metrics
+
+            Keyword arguments:
+            metrics -- the list of metrics to be written to disk
+        '''
         for metric in metrics:
             with open(self.metric_full_path(metric.filename), 'w') as metric_file:
                 yaml.safe_dump(metric.__dict__, metric_file, default_flow_style=False)
@@ -192,27 +276,466 @@ class MetricManager(object):
 
         for metric in metrics:
             os.unlink(self.metric_full_path(metric.filename))
+            self.pending_clocks.pop(metric.filename, None)
+
+        self._update_spool_stats('removed', self._count_areas(metrics))
 
-    def read_metrics(self):
-        ''' read in all of the metrics contained in the disk cache
+    def read_metrics(self, metric_type=None):
+        ''' read in the metrics contained in the disk cache
 
             Keyword arguments:
-            None
+            metric_type -- only read metrics of this type (ZBX_METRICS or
+                           HEARTBEAT_METRICS). The type is determined from the
+                           filename, so files of the other type are never parsed.
+                           (default: read all metrics)
+        '''
+        return list(self.iter_metrics(metric_type))
+
+    def iter_metrics(self, metric_type=None):
+        ''' like read_metrics, but parses and yields the metrics one at a time
+            so that callers can work through a large disk cache in batches
+
+            Keyword arguments:
+            metric_type -- only read metrics of this type (see read_metrics)
         '''
-        metrics = []
+        if metric_type not in [None, self.ZBX_METRICS, self.HEARTBEAT_METRICS]:
+            raise ValueError("Unknown metric type: %s" % metric_type)
 
-        for filename in os.listdir(self.metrics_directory):
+        self.pending_clocks = {}
+
+        filenames = os.listdir(self.metrics_directory)
+        self.reconcile_spool_stats(filenames)
+
+        for filename in filenames:
             ext = os.path.splitext(filename)[-1][1:].lower().strip()
 
             # We only want to load yaml files
             if ext not in ['yml', 'yaml']:
                 continue
 
-            with open(self.metric_full_path(filename), 'r') as metric_file:
-                doc = yaml.load(metric_file)
-                metrics.append(UniqueMetric(doc['host'], doc['key'], doc['value'],
-                                            doc['clock'], doc['unique_id']))
-        return metrics
+            is_heartbeat_file = filename.startswith(HEARTBEAT_PREFIX)
+
+            if metric_type == self.HEARTBEAT_METRICS and not is_heartbeat_file:
+                continue
+
+            if metric_type == self.ZBX_METRICS and is_heartbeat_file:
+                continue
+
+            metric = self._load_metric(self.metric_full_path(filename))
+
+            # Heartbeats written before the filename prefix existed are moved
+            # over to the prefixed name so that the heartbeat reader finds them.
+            if metric.filename != filename and metric.key == 'heartbeat':
+                os.rename(self.metric_full_path(filename),
+                          self.metric_full_path(metric.filename))
+                self._update_spool_stats('removed', {self.ZBX_METRICS: 1})
+                self._update_spool_stats('written', {self.HEARTBEAT_METRICS: 1})
+
+                if metric_type == self.ZBX_METRICS:
+                    continue
+
+            self.pending_clocks[metric.filename] = metric.clock
+            yield metric
+
+    @staticmethod
+    def _load_metric(path):
+        ''' load a single metric file from disk
+
+            Keyword arguments:
+            path -- the full path of the metric file
+        '''
+        with open(path, 'r') as metric_file:
+            doc = yaml.load(metric_file)
+
+        metric = UniqueMetric(doc['host'], doc['key'], doc['value'],
+                              doc['clock'], doc['unique_id'])
+
+        for attr in ['attempts', 'last_error', 'dead_letter_reason']:
+            if doc.get(attr):
+                setattr(metric, attr, doc[attr])
+
+        return metric
+
+    def record_failed_attempt(self, metrics, reason, max_attempts):
+        ''' record a failed attempt to send one or more metrics. Metrics that
+            have now failed max_attempts times are moved to the dead-letter area.
+
+            Keyword arguments:
+            metrics      -- a single metric, or a list of metrics that failed to send
+            reason       -- why the send failed
+            max_attempts -- the number of failed attempts after which a metric is dead-lettered
+
+            Returns: the list of metrics that were dead-lettered
+        '''
+        if not isinstance(metrics, list):
+            metrics = [metrics]
+
+        dead_metrics = []
+        for metric in metrics:
+            metric.attempts += 1
+            metric.last_error = str(reason)
+
+            if metric.attempts >= max_attempts:
+                dead_metrics.append(metric)
+
+        self._dump_metrics([m for m in metrics if m not in dead_metrics])
+        self.dead_letter_metrics(dead_metrics, "failed %s send attempts, last error: %s" % \
+                                               (max_attempts, reason))
+
+        return dead_metrics
+
+    def dead_letter_metrics(self, metrics, reason):
+        ''' move one or more metrics from the disk cache to the dead-letter area
+
+            Keyword arguments:
+            metrics -- a single metric, or a list of metrics to be dead-lettered
+            reason  -- why the metrics can't be delivered
+        '''
+        if not isinstance(metrics, list):
+            metrics = [metrics]
+
+        if metrics and not os.path.isdir(self.dead_letter_directory):
+            os.makedirs(self.dead_letter_directory)
+
+        for metric in metrics:
+            metric.dead_letter_reason = str(reason)
+
+            with open(os.path.join(self.dead_letter_directory, metric.filename), 'w') as metric_file:
+                yaml.safe_dump(metric.__dict__, metric_file, default_flow_style=False)
+
+            os.unlink(self.metric_full_path(metric.filename))
+            self.pending_clocks.pop(metric.filename, None)
+
+        self._update_spool_stats('removed', self._count_areas(metrics))
+        self._update_spool_stats('written', {DEAD_LETTER_DIRECTORY: len(metrics)})
+
+    def read_dead_letter_metrics(self):
+        ''' read in all of the metrics in the dead-letter area
+
+            Keyword arguments:
+            None
+        '''
+        if not os.path.isdir(self.dead_letter_directory):
+            return []
+
+        return [self._load_metric(os.path.join(self.dead_letter_directory, filename))
+                for filename in os.listdir(self.dead_letter_directory)
+                if filename.endswith('.yml')]
+
+    def replay_dead_letter_metrics(self, metrics):
+        ''' move one or more metrics from the dead-letter area back into the disk
+            cache, so that they're sent again with a fresh attempt count
+
+            Keyword arguments:
+            metrics -- a single metric, or a list of dead-lettered metrics
+        '''
+        if not isinstance(metrics, list):
+            metrics = [metrics]
+
+        for metric in metrics:
+            for attr in ['attempts', 'last_error', 'dead_letter_reason']:
+                metric.__dict__.pop(attr, None)
+
+            self.write_metrics(metric)
+            os.unlink(os.path.join(self.dead_letter_directory, metric.filename))
+
+        self._update_spool_stats('removed', {DEAD_LETTER_DIRECTORY: len(metrics)})
+
+    def purge_dead_letter_metrics(self, metrics):
+        ''' permanently delete one or more metrics from the dead-letter area
+
+            Keyword arguments:
+            metrics -- a single metric, or a list of dead-lettered metrics
+        '''
+        if not isinstance(metrics, list):
+            metrics = [metrics]
+
+        for metric in metrics:
+            os.unlink(os.path.join(self.dead_letter_directory, metric.filename))
+
+        self._update_spool_stats('removed', {DEAD_LETTER_DIRECTORY: len(metrics)})
+
+    def oldest_pending_clock(self):
+        ''' the clock of the oldest metric read by the last iter_metrics (or read_metrics)
+            that hasn't been removed or dead-lettered since, or None
+
+            Keyword arguments:
+            None
+        '''
+        return min(self.pending_clocks.values() or [None])
+
+    def _count_areas(self, metrics):
+        ''' count a list of metrics by the area of the disk cache they're in
+
+            Keyword arguments:
+            metrics -- the list of metrics
+        '''
+        heartbeats = len(self.filter_heartbeat_metrics(metrics))
+        return {self.ZBX_METRICS: len(metrics) - heartbeats, self.HEARTBEAT_METRICS: heartbeats}
+
+    def _count_spool(self, filenames=None):
+        ''' count the files in every area of the disk cache, by listing it
+
+            Keyword arguments:
+            filenames -- the listing of the disk cache, if there is one already
+        '''
+        if filenames is None:
+            filenames = os.listdir(self.metrics_directory)
+
+        filenames = [f for f in filenames if f.endswith('.yml')]
+        heartbeats = len([f for f in filenames if f.startswith(HEARTBEAT_PREFIX)])
+
+        dead = 0
+        if os.path.isdir(self.dead_letter_directory):
+            dead = len([f for f in os.listdir(self.dead_letter_directory) if f.endswith('.yml')])
+
+        return {self.ZBX_METRICS: len(filenames) - heartbeats,
+                self.HEARTBEAT_METRICS: heartbeats,
+                DEAD_LETTER_DIRECTORY: dead}
+
+    def _update_spool_stats(self, counter, counts):
+        ''' add to the 'written' or 'removed' counter of areas of the disk cache, in the
+            counters of this process. Nothing is locked between processes, and the files
+            were already written or removed: when the counters can't be saved, the next
+            reconcile_spool_stats makes up for it.
+
+            Keyword arguments:
+            counter -- 'written' or 'removed'
+            counts  -- {area: number of metrics}
+        '''
+        if not any(counts.values()):
+            return
+
+        with _PROCESS_STATS_LOCK:
+            # A forked process starts its own counters
+            if _PROCESS_STATS['pid'] != os.getpid():
+                _PROCESS_STATS.update({'pid': os.getpid(), 'counters': {},
+                                       'name': '%s-%s-%s%s' % (socket.gethostname(), os.getpid(),
+                                                                  uuid.uuid4().hex[:8], PROCESS_STATS_SUFFIX)})
+
+            stats = _PROCESS_STATS['counters'].setdefault(self.metrics_directory, {})
+            for area, count in counts.items():
+                stats.setdefault(area, {'written': 0, 'removed': 0})[counter] += count
+
+            path = os.path.join(self.state_directory, _PROCESS_STATS['name'])
+            try:
+                try:
+                    self._write_spool_stats(path, stats)
+                except (IOError, OSError) as error:
+                    if error.errno != errno.ENOENT:
+                        raise
+                    self._make_state_directory()
+                    self._write_spool_stats(path, stats)
+
+            # The stats are only there for monitoring, they must never stop metrics from being handled
+            except (IOError, OSError):
+                pass
+
+    def _make_state_directory(self):
+        ''' create the directory of the bookkeeping files, writable by the group since
+            the zagg web workers and the processors can run as different users
+
+            Keyword arguments:
+            None
+        '''
+        try:
+            os.mkdir(self.state_directory)
+            os.chmod(self.state_directory, 0775)
+        except OSError as error:
+            if error.errno != errno.EEXIST:
+                raise
+
+    @staticmethod
+    def _write_spool_stats(path, stats):
+        ''' replace a file of counters atomically, so that readers never need a lock
+
+            Keyword arguments:
+            path  -- the file
+            stats -- the counters
+        '''
+        tmp_path = "%s.%s.tmp" % (path, os.getpid())
+        with open(tmp_path, 'w') as stats_file:
+            json.dump(stats, stats_file)
+        os.rename(tmp_path, path)
+
+    @staticmethod
+    def _read_spool_stats(path):
+        ''' the counters in a file, or None if it can't be read
+
+            Keyword arguments:
+            path -- the file
+        '''
+        try:
+            with open(path) as stats_file:
+                return json.load(stats_file)
+        except (IOError, ValueError):
+            return None
+
+    @staticmethod
+    def _add_spool_stats(stats, other):
+        ''' add the counters of other to stats
+
+            Keyword arguments:
+            stats -- the counters to add to
+            other -- the counters to add
+        '''
+        for area, counters in other.items():
+            for counter in ['written', 'removed']:
+                stats.setdefault(area, {'written': 0, 'removed': 0})[counter] += counters.get(counter, 0)
+
+    def _process_stats_files(self):
+        ''' the names of the files of per process counters
+
+            Keyword arguments:
+            None
+        '''
+        try:
+            return [f for f in os.listdir(self.state_directory) if f.endswith(PROCESS_STATS_SUFFIX)]
+        except OSError:
+            return []
+
+    @staticmethod
+    def _writer_is_gone(filename):
+        ''' whether the process a file of counters belongs to has exited. Only processes
+            of this host can be checked, the ones of other hosts are never gone.
+
+            Keyword arguments:
+            filename -- <host>-<pid>-<id>.json
+        '''
+        try:
+            host, pid, _ = filename.rsplit('-', 2)
+            pid = int(pid)
+        except ValueError:
+            return False
+
+        if host != socket.gethostname():
+            return False
+
+        try:
+            os.kill(pid, 0)
+        except OSError as error:
+            return error.errno == errno.ESRCH
+
+        return False
+
+    def reconcile_spool_stats(self, filenames):
+        ''' fold the counters of the processes that are gone into SPOOL_STATS_FILE, and
+            correct it so that the depths match a listing of the disk cache. Metrics that
+            were written or removed without being counted (or counted but never written)
+            are added to the written or the removed counter.
+
+            Processors call this once per cycle, through iter_metrics.
+
+            Keyword arguments:
+            filenames -- a listing of the disk cache, taken just now
+        '''
+        listed = self._count_spool(filenames)
+
+        try:
+            self._make_state_directory()
+            lock_fd = os.open(os.path.join(self.state_directory, 'reconcile.lock'),
+                              os.O_WRONLY | os.O_CREAT, 0664)
+        except OSError:
+            return
+
+        try:
+            fcntl.flock(lock_fd, fcntl.LOCK_EX)
+
+            stats = self._read_spool_stats(os.path.join(self.state_directory, SPOOL_STATS_FILE)) or {}
+            writers = {}
+            for filename in self._process_stats_files():
+                path = os.path.join(self.state_directory, filename)
+                counters = self._read_spool_stats(path)
+                if counters is None:
+                    continue
+
+                if not self._writer_is_gone(filename):
+                    self._add_spool_stats(writers, counters)
+                    continue
+
+                try:
+                    os.unlink(path)
+                except OSError:
+                    continue
+                self._add_spool_stats(stats, counters)
+
+            for area, count in listed.items():
+                counters = stats.setdefault(area, {'written': 0, 'removed': 0})
+                writer = writers.get(area, {'written': 0, 'removed': 0})
+                missing = count - (counters['written'] + writer['written'] -
+                                   counters['removed'] - writer['removed'])
+                if missing > 0:
+                    counters['written'] += missing
+                else:
+                    counters['removed'] -= missing
+
+            self._write_spool_stats(os.path.join(self.state_directory, SPOOL_STATS_FILE), stats)
+
+        # The stats are only there for monitoring, they must never stop metrics from being handled
+        except (IOError, OSError):
+            pass
+        finally:
+            os.close(lock_fd)
+
+    def spool_stats(self):
+        ''' the written and removed counters of every area of the disk cache, from the
+            spool stats. The disk cache is listed when there aren't any yet.
+
+            Keyword arguments:
+            None
+        '''
+        stats = self._read_spool_stats(os.path.join(self.state_directory, SPOOL_STATS_FILE))
+        writers = self._process_stats_files()
+
+        if stats is None and not writers:
+            return dict((area, {'written': count, 'removed': 0})
+                        for area, count in self._count_spool().items())
+
+        stats = stats or {}
+        for filename in writers:
+            self._add_spool_stats(stats, self._read_spool_stats(os.path.join(self.state_directory,
+                                                                              filename)) or {})
+
+        for area in [self.ZBX_METRICS, self.HEARTBEAT_METRICS, DEAD_LETTER_DIRECTORY]:
+            stats.setdefault(area, {'written': 0, 'removed': 0})
+
+        return stats
+
+    def spool_depths(self):
+        ''' the number of metrics in every area of the disk cache, from the spool stats:
+            {'zbx': n, 'heartbeat': n, 'dead-letter': n}
+
+            Keyword arguments:
+            None
+        '''
+        return dict((area, counters['written'] - counters['removed'])
+                    for area, counters in self.spool_stats().items())
+
+    def write_processor_state(self, state):
+        ''' save what the last processor cycle did (a dict), replacing the file atomically
+
+            Keyword arguments:
+            state -- the state of the processor
+        '''
+        self._make_state_directory()
+
+        path = os.path.join(self.state_directory, PROCESSOR_STATE_FILE)
+        tmp_path = "%s.%s.tmp" % (path, os.getpid())
+        with open(tmp_path, 'w') as state_file:
+            json.dump(state, state_file)
+        os.rename(tmp_path, path)
+
+    def read_processor_state(self):
+        ''' what the last processor cycle did, or an empty dict
+
+            Keyword arguments:
+            None
+        '''
+        try:
+            with open(os.path.join(self.state_directory, PROCESSOR_STATE_FILE)) as state_file:
+                return json.load(state_file)
+        except (IOError, ValueError):
+            return {}
 
     @staticmethod
     def filter_zbx_metrics(metrics):
@@ -0,0 +1,251 @@
+#!/usr/bin/env python2
+# vim: expandtab:tabstop=4:shiftwidth=4
+
+'''
+    Collects all of the PCP metrics of a host in one pass
+'''
+
+#   Copyright 2016 Red Hat Inc.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import fnmatch
+import time
+
+# Our buildbot does not have the pcp libraries installed and most likely
+# will never have them since this runs in a container.
+# pylint: disable=import-error
+from pcp import pmapi
+
+from openshift_tools.monitoring import pminfo
+from openshift_tools.monitoring.pcp_rates import RateEngine
+
+# What used to be cron-send-pcp-sampled-metrics (cpu), cron-send-disk-metrics,
+# cron-send-network-metrics and cron-send-filesystem-metrics.
+DEFAULT_GROUPS = [
+    # The cpu time counters add up all of the cpus
+    {'name': 'cpu',
+     'type': 'percent',
+     'divisor': 'hinv.ncpu',
+     'items': [{'metric': 'kernel.all.cpu.idle'},
+               {'metric': 'kernel.all.cpu.nice'},
+               {'metric': 'kernel.all.cpu.steal'},
+               {'metric': 'kernel.all.cpu.sys'},
+               {'metric': 'kernel.all.cpu.user'},
+               {'metric': 'kernel.all.cpu.wait.total'},
+               {'metric': 'kernel.all.cpu.irq.hard'},
+               {'metric': 'kernel.all.cpu.irq.soft'},
+              ],
+    },
+
+    {'name': 'disk',
+     'type': 'rate',
+     'discovery': {'key': 'disc.disk', 'macro': '#OSO_DISK'},
+     'skip_zero': True,
+     'items': [{'metric': 'disk.dev.total', 'key': 'disc.disk.tps', 'integer': True},
+               # The percent of the time the disk was busy
+               {'metric': 'disk.dev.avactive', 'key': 'disc.disk.putil', 'type': 'percent'},
+              ],
+    },
+
+    {'name': 'network',
+     'type': 'rate',
+     'discovery': {'key': 'disc.network', 'macro': '#OSO_NET_INTERFACE'},
+     'exclude': ['lo'],
+     'skip_zero': True,
+     'items': [{'metric': 'network.interface.in.bytes', 'key': 'disc.network.in.bytes', 'integer': True},
+               {'metric': 'network.interface.out.bytes', 'key': 'disc.network.out.bytes', 'integer': True},
+              ],
+    },
+
+    {'name': 'filesystem',
+     'type': 'raw',
+     'discovery': {'key': 'disc.filesys', 'macro': '#OSO_FILESYS'},
+     'exclude': ['*docker*'],
+     'items': [{'metric': 'filesys.full', 'key': 'disc.filesys.full'},
+               {'metric': 'filesys.inodes.pused', 'key': 'disc.filesys.inodes.pused',
+                'expression': 'filesys.usedfiles / (filesys.usedfiles + filesys.freefiles) * 100'},
+              ],
+    },
+]
+
+class PCPCollector(object):
+    ''' Samples a declarative list of metric groups, all through one PMAPI context.
+
+        Each group has a type, which says how its samples become a value:
+          raw:     the last sample
+          rate:    the rate per second of a counter, in bytes, counts or seconds
+                   (see pcp_rates), from the times pcp took the samples at
+          percent: the rate of a counter of time, as a percent of the time
+
+        and a list of items, each with:
+          metric:     the pcp metric
+          key:        the zabbix key (default: the metric). Metrics with instances
+                      are sent as key[instance]
+          type:       overrides the type of the group (optional)
+          scale:      multiply the value by this (optional)
+          integer:    round the value, for zabbix items of type int (optional)
+          expression: makes the metric a derived metric with this expression (optional)
+
+        Groups may also have:
+          discovery: {'key': ..., 'macro': ...} to send the instances as a low level discovery item
+          exclude:   shell-style patterns of instances to leave out
+          skip_zero: leave out instances whose samples are all 0
+          divisor:   a metric to divide the values by, e.g. hinv.ncpu
+
+        Every tick is a single pmFetch for the metrics of all groups.
+
+        With an archive, the ticks are read from a pmlogger archive, interval
+        seconds apart from start on, instead of being sampled live; see replay.
+    '''
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, groups=None, interval=10, count=2, archive=None, start=None):
+        ''' construct the object
+        '''
+        self.groups = groups or DEFAULT_GROUPS
+        self.interval = interval
+        self.archive = archive
+        self.start = start
+
+        # Rates and percents need at least two samples; raw values only need one
+        needs_samples = any([item.get('type', group['type']) != 'raw'
+                             for group in self.groups for item in group['items']])
+        self.count = max(count, 2) if needs_samples else 1
+
+        self.sampler = None
+        self.engine = None
+
+    def metrics(self):
+        ''' All of the metrics, and the expressions of the derived ones
+        '''
+        metrics = []
+        derived = {}
+        for group in self.groups:
+            for item in group['items']:
+                if item.get('expression'):
+                    derived[item['metric']] = item['expression']
+                elif item['metric'] not in metrics:
+                    metrics.append(item['metric'])
+
+            if group.get('divisor') and group['divisor'] not in metrics:
+                metrics.append(group['divisor'])
+
+        return metrics, derived
+
+    def sample(self):
+        ''' Take count samples, interval seconds apart.
+            Returns a list of (timestamp, {metric: {instance: value}})
+        '''
+        if self.sampler is None:
+            metrics, derived = self.metrics()
+            self.sampler = pminfo.PMSampler(metrics, derived, archive=self.archive,
+                                            start=self.start, step=self.interval)
+            self.engine = RateEngine(self.sampler.descriptions())
+
+        samples = []
+        for i in range(self.count):
+            samples.append(self.sampler.timed_fetch())
+            if i == self.count - 1:
+                break
+            if not self.archive:
+                time.sleep(self.interval)
+
+        return samples
+
+    def replay(self, end=None):
+        ''' Work out the values of every window of count ticks of the archive, up to end
+            (default: the end of the archive). Each window starts at the last tick of
+            the one before, so no interval is left out.
+            Yields (timestamp, (zabbix keys, discoveries)), like collect returns.
+        '''
+        try:
+            samples = self.sample()
+            while end is None or samples[-1][0] <= end:
+                yield samples[-1][0], self.collect(samples)
+
+                samples = samples[-1:] if self.count > 1 else []
+                while len(samples) < self.count:
+                    samples.append(self.sampler.timed_fetch())
+
+        except pmapi.pmErr as error:
+            if not pminfo.is_end_of_archive(error):
+                raise
+
+    # pylint: disable=too-many-locals
+    def collect(self, samples=None):
+        ''' Sample all of the groups and work out their values.
+            Returns ({zabbix key: value}, [(discovery key, macro, [instances])])
+        '''
+        samples = samples or self.sample()
+        rates = self.engine.rates(samples)
+        last = samples[-1][1]
+
+        zabbix_keys = {}
+        discoveries = []
+        for group in self.groups:
+            discovered = set()
+
+            divisor = 1
+            if group.get('divisor'):
+                divisor = float(last.get(group['divisor'], {}).get(None) or 1)
+
+            for item in group['items']:
+                item_type = item.get('type', group['type'])
+                if item_type == 'raw':
+                    values = last.get(item['metric'], {})
+                elif item_type == 'rate':
+                    values = rates[item['metric']]
+                elif item_type == 'percent':
+                    values = dict((inst, value * 100) for inst, value in rates[item['metric']].items())
+                else:
+                    raise ValueError('Unknown metric group type: %s' % item_type)
+
+                for instance, value in values.items():
+                    if instance is not None and \
+                       any([fnmatch.fnmatch(instance, pattern) for pattern in group.get('exclude', [])]):
+                        continue
+
+                    if group.get('skip_zero') and \
+                       not any([sample.get(item['metric'], {}).get(instance) for _, sample in samples]):
+                        continue
+
+                    value = value * item.get('scale', 1) / divisor
+                    if item.get('integer'):
+                        value = int(round(value))
+
+                    key = item.get('key', item['metric'])
+                    if instance is not None:
+                        key = '%s[%s]' % (key, instance)
+                        discovered.add(instance)
+
+                    zabbix_keys[key] = value
+
+            if group.get('discovery'):
+                discoveries.append((group['discovery']['key'], group['discovery']['macro'], sorted(discovered)))
+
+        return zabbix_keys, discoveries
+
+    def send(self, zagg_sender):
+        ''' Collect everything and send it as one ZaggSender batch
+        '''
+        zabbix_keys, discoveries = self.collect()
+
+        for discovery_key, macro, instances in discoveries:
+            zagg_sender.add_zabbix_dynamic_item(discovery_key, macro, instances)
+
+        zagg_sender.add_zabbix_keys(zabbix_keys)
+        zagg_sender.send_metrics()
+
+        return zabbix_keys, discoveries
@@ -0,0 +1,111 @@
+#!/usr/bin/env python2
+# vim: expandtab:tabstop=4:shiftwidth=4
+
+'''
+    Rates of PCP counters, from the timestamps, semantics and units of their samples
+'''
+
+#   Copyright 2016 Red Hat Inc.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+# Our buildbot does not have the pcp libraries installed and most likely
+# will never have them since this runs in a container.
+# pylint: disable=import-error
+from pcp import pmapi
+
+# Seconds in one unit of each PCP time scale, PM_TIME_NSEC through PM_TIME_HOUR
+TIME_SCALES = [1e-9, 1e-6, 1e-3, 1.0, 60.0, 3600.0]
+
+class MetricRate(object):
+    ''' How to turn the samples of one metric into values, from its pmDesc.
+
+        Counters become rates per second in base units: bytes, counts, or for
+        counters of time, seconds per second (the fraction of the time spent).
+        Instantaneous and discrete metrics keep their last value.
+    '''
+
+    # Reason: disable pylint too-few-public-methods because this holds the per metric constants
+    # Status: permanently disabled
+    # pylint: disable=too-few-public-methods
+    def __init__(self, desc):
+        ''' construct the object from the metric's pmDesc
+        '''
+        self.counter = desc.sem == pmapi.c_api.PM_SEM_COUNTER
+
+        units = desc.units
+        self.factor = (1024.0 ** units.scaleSpace) ** units.dimSpace * \
+                      (10.0 ** units.scaleCount) ** units.dimCount * \
+                      TIME_SCALES[units.scaleTime] ** units.dimTime
+
+        # 32 bit counters wrap often enough to be worth handling, a 64 bit counter
+        # going backwards was reset (e.g. a device that came back) instead
+        self.wrap = None
+        if desc.type in [pmapi.c_api.PM_TYPE_32, pmapi.c_api.PM_TYPE_U32]:
+            self.wrap = 2 ** 32
+
+    def deltas(self, first, second):
+        ''' The increase of every instance that is in both samples ({instance: value}).
+            Instances whose counter was reset are left out.
+        '''
+        deltas = dict((inst, second[inst] - value) for inst, value in first.iteritems() if inst in second)
+
+        for inst, delta in deltas.items():
+            if delta < 0:
+                if self.wrap:
+                    deltas[inst] = delta + self.wrap
+                else:
+                    del deltas[inst]
+
+        return deltas
+
+    def rates(self, samples):
+        ''' The values of all instances at once, from a list of (timestamp, {instance: value}).
+
+            Counter rates add up the increases between consecutive samples, so that
+            a wrap in any of them is accounted for. Instances that come and go are
+            rated over the samples they were in.
+        '''
+        if not self.counter:
+            return dict(samples[-1][1])
+
+        totals = {}
+        elapsed = {}
+        for (time1, first), (time2, second) in zip(samples, samples[1:]):
+            for inst, delta in self.deltas(first, second).iteritems():
+                totals[inst] = totals.get(inst, 0) + delta
+                elapsed[inst] = elapsed.get(inst, 0) + (time2 - time1)
+
+        return dict((inst, total * self.factor / elapsed[inst])
+                    for inst, total in totals.iteritems() if elapsed[inst] > 0)
+
+class RateEngine(object):
+    ''' Works out the values of all metrics of a set of samples
+    '''
+
+    def __init__(self, descs):
+        ''' construct the object from {metric: pmDesc}
+        '''
+        self.metrics = dict((metric, MetricRate(desc)) for metric, desc in descs.items())
+
+    def rates(self, samples):
+        ''' From a list of (timestamp, {metric: {instance: value}}), like PMSampler.timed_fetch
+            returns, work out {metric: {instance: value}}
+        '''
+        values = {}
+        for metric, metric_rate in self.metrics.items():
+            values[metric] = metric_rate.rates([(timestamp, sample.get(metric, {}))
+                                                for timestamp, sample in samples])
+
+        return values
@@ -23,19 +23,97 @@ PMInfo Python implementation
 # will never have them since this runs in a container.
 # pylint: disable=import-error
 from pcp import pmapi
-import re
+import array
+import ctypes
+import json
 import os
+import re
+import struct
 import time
-import multiprocessing
+
+# Where PMInfo caches the leaf metrics of the PMNS, unless it's given another file.
+# It's in the home directory, other users can't plant or replace it there.
+PMNS_CACHE_ENV_VAR = 'PCP_PMNS_CACHE'
+DEFAULT_PMNS_CACHE = os.path.join('~', '.openshift_tools_pmns_cache.json')
+
+# Metrics that change when the PMNS of pmcd can: when it restarts, or when PMDAs come and go
+PMNS_VERSION_METRICS = ['pmcd.pid', 'pmcd.seqnum']
+
+class PMNSCache(object):
+    """ The leaf metrics under PMNS prefixes, kept in a file between processes.
+
+        The entries belong to one version of the PMNS of pmcd (see PMNS_VERSION_METRICS),
+        and are dropped when it changes or once they're ttl seconds old. A file that
+        isn't ours is ignored, and the file is only readable by its owner.
+    """
+
+    def __init__(self, path, version, ttl=3600):
+        """ Load the entries of this version of the PMNS, if the file has them """
+        self.path = path
+        self.version = version
+        self.ttl = ttl
+        self.created = time.time()
+        self.entries = {}
+
+        try:
+            with open(path) as cache_file:
+                if os.fstat(cache_file.fileno()).st_uid != os.getuid():
+                    return
+                cached = json.load(cache_file)
+        except (IOError, OSError, ValueError):
+            return
+
+        if cached.get('version') == version and self.created - cached.get('created', 0) < ttl:
+            self.created = cached['created']
+            # json gives unicode, pmapi wants str
+            self.entries = dict((str(prefix), [str(leaf) for leaf in leaves])
+                                for prefix, leaves in cached.get('prefixes', {}).items())
+
+    def get(self, prefix):
+        """ The cached leaf metrics under prefix, or None """
+        return self.entries.get(prefix)
+
+    def put(self, prefix, leaves):
+        """ Cache the leaf metrics under prefix. Failing to write the file isn't an error. """
+        self.entries[prefix] = leaves
+
+        tmp_path = "%s.%s.tmp" % (self.path, os.getpid())
+        try:
+            cache_fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0600)
+        except OSError:
+            return
+
+        try:
+            with os.fdopen(cache_fd, 'w') as cache_file:
+                json.dump({'version': self.version, 'created': self.created, 'prefixes': self.entries},
+                          cache_file)
+            os.rename(tmp_path, self.path)
+        except (IOError, OSError):
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
 
 class PMInfo(object):
     """ Looks up values from pcp through the pmapi.
     """
 
-    def __init__(self):
-        """ Construct object - prepare for command line handling """
+    def __init__(self, archive=None, pmns_cache=None):
+        """ Construct object - prepare for command line handling
+
+            pmns_cache is the file PMNS walks are cached in (default: $PCP_PMNS_CACHE,
+            or DEFAULT_PMNS_CACHE), False not to cache them. Archives aren't cached.
+        """
         self.context = None
         self.metrics = []
+        self.archive = archive
+        self.derived = []
+
+        self.pmns_cache = None
+        if pmns_cache is not False and not archive:
+            self.pmns_cache = os.path.expanduser(pmns_cache or
+                                                 os.environ.get(PMNS_CACHE_ENV_VAR, DEFAULT_PMNS_CACHE))
+        self.pmns = None
 
     def extract_value(self, valfmt, vlist, typ):
         '''
@@ -54,41 +132,94 @@ class PMInfo(object):
         descs = self.context.pmLookupDescs(pmids)
         results = self.context.pmFetch(pmids)
 
-        for i in range(results.contents.numpmid):
-            num_vals = results.contents.get_numval(i)
-            m_name = None
-            # if num_vals is > 1 we have multiple instances returned
-            # query for the names so we can generate the keys
-            if num_vals > 1:
-                m_name = metrics[i] + '.'
-                text_descs = self.context.pmGetInDom(descs[i])
-            else:
-                m_name = metrics[i]
-            for j in range(num_vals):
-                desc = ''
-                try:
-                    m_value = self.extract_value(results.contents.get_valfmt(i),
-                                                 results.contents.get_vlist(i, j),
-                                                 descs[i].contents.type)
-                except pmapi.pmErr:
-                    #Impossible value or scale conversion
-                    rval[m_name] = m_value
-                    continue
-
-                if num_vals > 1:
-                    desc = re.sub(' ', '_', text_descs[1][j])
-
-                rval[m_name + desc] = m_value
+        try:
+            for i in range(results.contents.numpmid):
+                inst_ids, values = self.extract_arrays(results, i, descs[i].contents.type)
+
+                # if there are multiple instances, query for the names so we can generate the keys
+                if results.contents.get_numval(i) > 1:
+                    inst_list, name_list = self.context.pmGetInDom(descs[i])
+                    names = dict(zip(inst_list, name_list))
+                    for inst_id, m_value in zip(inst_ids, values):
+                        desc = re.sub(' ', '_', names.get(inst_id, str(inst_id)))
+                        rval[metrics[i] + '.' + desc] = m_value
+                else:
+                    for m_value in values:
+                        rval[metrics[i]] = m_value
+        finally:
+            self.context.pmFreeResult(results)
+
         return rval
 
+    def extract_arrays(self, results, i, value_type):
+        """ Extract all of the instances of metric i as (instance ids, values), with
+            extract_values, or with pmExtractValue for the types it can't do
+        """
+        extracted = extract_values(results.contents.get_vset(i).contents, value_type)
+        if extracted is None:
+            extracted = self.extract_one_by_one(results, i, value_type)
+
+        return extracted
+
+    def extract_one_by_one(self, results, i, value_type):
+        """ Extract the instances of metric i with pmExtractValue """
+        inst_ids = array.array('i')
+        values = []
+        valfmt = results.contents.get_valfmt(i)
+        for j in range(results.contents.get_numval(i)):
+            vlist = results.contents.get_vlist(i, j)
+            try:
+                values.append(self.extract_value(valfmt, vlist, value_type))
+            except pmapi.pmErr:
+                #Impossible value or scale conversion
+                continue
+            inst_ids.append(vlist.inst)
+
+        return inst_ids, values
+
     def get_children(self, root_string=''):
-        ''' Return all metrics
+        ''' Add all of the leaf metrics under root_string (all metrics, for '') to self.metrics.
+            They come from the PMNS cache when it has them.
+        '''
+        # Derived metrics are only in our PMNS, not in the one of pmcd, so walks that
+        # include them neither come from the cache nor go in it
+        pmns = None
+        if not any([root_string in ('', name) or name.startswith(root_string + '.') for name in self.derived]):
+            pmns = self.get_pmns_cache()
+
+        leaves = pmns.get(root_string) if pmns else None
+        if leaves is None:
+            leaves = []
+            self.walk_pmns(root_string, leaves)
+
+            if pmns:
+                pmns.put(root_string, leaves)
+
+        self.metrics += leaves
+
+    def get_pmns_cache(self):
+        ''' The PMNSCache of the PMNS of pmcd, or None if there isn't one '''
+        if self.pmns is None and self.pmns_cache:
+            try:
+                version = self.get_value(PMNS_VERSION_METRICS)
+                version = [version.get(metric) for metric in PMNS_VERSION_METRICS]
+            except pmapi.pmErr:
+                self.pmns_cache = None
+                return None
+
+            self.pmns = PMNSCache(self.pmns_cache, version)
+
+        return self.pmns
+
+    def walk_pmns(self, root_string, leaves):
+        ''' Append all of the leaf metrics under root_string to leaves, asking pmcd for
+            the children of every node
         '''
         status = self.context.pmGetChildrenStatus(root_string)
 
         # Status on leaf nodes is (None,None)
         if not status[0]:
-            self.metrics.append(root_string)
+            leaves.append(root_string)
             return
 
         zipped_status = zip(status[0], status[1])
@@ -99,15 +230,16 @@ class PMInfo(object):
                 child_name = child[0]
 
             if child[1] == 0:
-                self.metrics.append(child_name)
+                leaves.append(child_name)
             else:
-                self.get_children(child_name)
+                self.walk_pmns(child_name, leaves)
 
     def register_derived_metric(self, derived_metrics):
         """ This function registers the derived function name and expression """
 
         for dmetric, dexpression in derived_metrics.iteritems():
             self.context.pmRegisterDerived(dmetric, dexpression)
+            self.derived.append(dmetric)
 
     def execute(self, metrics=None):
         """ Using a PMAPI context (could be either host or archive),
@@ -122,32 +254,241 @@ class PMInfo(object):
 
     def connect(self):
         """ Establish a PMAPI context to archive, host or local, via args """
-        self.context = pmapi.pmContext()
-
-def calculate_percent_cpu(start, end, interval):
-    ''' Calculate the percent of cpu utilization from sample1 and sample2.
-        Requires:
-          start
-          end
-          interval
-    '''
-    num_cpu = multiprocessing.cpu_count()
-    jiffy = os.sysconf(os.sysconf_names['SC_CLK_TCK'])
-    return ((end - start) * 100 / (float(jiffy) * interval)) / (num_cpu * 10)
+        if self.archive:
+            self.context = pmapi.pmContext(pmapi.c_api.PM_CONTEXT_ARCHIVE, self.archive)
+        else:
+            self.context = pmapi.pmContext()
+
+    def replay(self, start=None, step=1):
+        """ Step through the archive every step seconds, from start (default: its beginning).
+            Every pmFetch then returns the next step, until pmErr PM_ERR_EOL.
+        """
+        if start is None:
+            start_time = self.context.pmGetArchiveLabel().start
+        else:
+            start_time = pmapi.timeval(int(start), int((start % 1) * 1000000))
+
+        self.context.pmSetMode(pmapi.c_api.PM_MODE_INTERP, start_time, int(step * 1000))
+
+def is_end_of_archive(error):
+    """ Whether a pmErr is the end of an archive """
+    return bool(error.args) and error.args[0] == pmapi.c_api.PM_ERR_EOL
+
+# struct codes of the numeric pcp types, the ones extract_values can do without pmExtractValue
+VALUE_CODES = {
+    pmapi.c_api.PM_TYPE_32: 'i',
+    pmapi.c_api.PM_TYPE_U32: 'I',
+    pmapi.c_api.PM_TYPE_64: 'q',
+    pmapi.c_api.PM_TYPE_U64: 'Q',
+    pmapi.c_api.PM_TYPE_FLOAT: 'f',
+    pmapi.c_api.PM_TYPE_DOUBLE: 'd',
+}
+
+# Python 2's array module has no 64 bit integers, those values stay tuples
+ARRAY_CODES = 'iIfd'
+
+# Where the value (or the pointer to its pmValueBlock) is in a pmValue,
+# and where the data starts in a pmValueBlock (PM_VAL_HDR_SIZE)
+PMVALUE_SIZE = ctypes.sizeof(pmapi.pmValue)
+PMVALUE_OFFSET = pmapi.pmValue.value.offset
+PMVALUE_BLOCK_HEADER = 4
+
+_VLIST_STRUCTS = {}
+
+def _vlist_struct(numval, code):
+    """ A struct.Struct that reads numval pmValues as inst, value, inst, value, ... """
+    key = (numval, code)
+    if key not in _VLIST_STRUCTS:
+        pmvalue = 'i%dx%s%dx' % (PMVALUE_OFFSET - 4, code,
+                                 PMVALUE_SIZE - PMVALUE_OFFSET - struct.calcsize('=' + code))
+        _VLIST_STRUCTS[key] = struct.Struct('=' + pmvalue * numval)
+
+    return _VLIST_STRUCTS[key]
+
+def extract_values(vset, value_type):
+    """ Extract all of the instances of a pmValueSet at once, for a numeric type.
+
+        The pmValue array is unpacked in one go; values kept in pmValueBlocks
+        (64 bit integers, doubles) are copied out and then unpacked in one go too.
+
+        Returns (instance ids, values) as arrays (values of 64 bit integers as a tuple),
+        or None if the type needs pmExtractValue.
+    """
+    code = VALUE_CODES.get(value_type)
+    if code is None:
+        return None
+
+    numval = max(vset.numval, 0)
+    if numval == 0:
+        return array.array('i'), array.array(code) if code in ARRAY_CODES else ()
+
+    insitu = vset.valfmt == pmapi.c_api.PM_VAL_INSITU
+    if insitu and struct.calcsize('=' + code) != 4:
+        return None
+
+    pointer_code = 'Q' if ctypes.sizeof(ctypes.c_void_p) == 8 else 'I'
+    vlist = _vlist_struct(numval, code if insitu else pointer_code)
+    raw = vlist.unpack(ctypes.string_at(ctypes.addressof(vset.vlist), vlist.size))
 
-def get_sampled_data(metrics, interval, count=1):
+    values = raw[1::2]
+    if not insitu:
+        width = struct.calcsize('=' + code)
+        blocks = ''.join([ctypes.string_at(pval + PMVALUE_BLOCK_HEADER, width) for pval in values])
+        values = struct.unpack('=%d%s' % (numval, code), blocks)
+
+    if code in ARRAY_CODES:
+        values = array.array(code, values)
+
+    return array.array('i', raw[::2]), values
+
+class PMSampler(PMInfo):
+    """ Samples the same metrics over and over through one PMAPI context.
+
+        The PMNS walk, pmLookupName, pmLookupDescs and pmGetInDom are done
+        once, up front; each sample is then a single pmFetch. The instance
+        names of a metric are only looked up again when an instance shows
+        up that hasn't been seen before.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, metrics=None, derived_metrics=None, archive=None, start=None, step=None):
+        """ Connect and resolve the metrics (all metrics, if none are given).
+            With an archive, every fetch is the next step seconds of it, from start.
+        """
+        super(PMSampler, self).__init__(archive)
+        self.connect()
+        if archive:
+            self.replay(start, step or 1)
+
+        metrics = list(metrics or [])
+        if derived_metrics:
+            self.register_derived_metric(derived_metrics)
+            metrics += derived_metrics.keys()
+
+        if not metrics:
+            self.get_children()
+        else:
+            for metric in metrics:
+                self.get_children(metric)
+
+        self.pmids = self.context.pmLookupName(self.metrics)
+        self.descs = self.context.pmLookupDescs(self.pmids)
+        self.types = [desc.contents.type for desc in self.descs]
+
+        # instance domain: {instance id: instance name}, shared by all of the metrics of the domain
+        self.instances = {}
+
+        # metric index: (instance ids, their names) of the last fetch
+        self.instance_keys = {}
+
+    def instance_names(self, i, inst_ids):
+        """ The names of the instances of metric i, refreshed from its instance domain if any are new """
+        indom = self.descs[i].contents.indom
+        names = self.instances.get(indom)
+        if names is None or any([inst_id not in names for inst_id in inst_ids]):
+            inst_list, name_list = self.context.pmGetInDom(self.descs[i])
+            names = dict(zip(inst_list, [re.sub(' ', '_', name) for name in name_list]))
+            self.instances[indom] = names
+
+        return names
+
+    def instance_names_of(self, i, inst_ids):
+        """ The names of inst_ids (an array of instance ids of metric i), in the same order.
+            As long as the instances don't change, the list of the last fetch is reused.
+        """
+        cached = self.instance_keys.get(i)
+        if cached is not None and cached[0] == inst_ids:
+            return cached[1]
+
+        names = self.instance_names(i, inst_ids)
+        keys = [names.get(inst_id, str(inst_id)) for inst_id in inst_ids]
+        self.instance_keys[i] = (inst_ids, keys)
+
+        return keys
+
+    def descriptions(self):
+        """ The pmDesc of every metric, as {metric: pmDesc} """
+        return dict((metric, desc.contents) for metric, desc in zip(self.metrics, self.descs))
+
+    def fetch(self):
+        """ Fetch the current values as {metric: {instance name: value}}.
+            Metrics without an instance domain have their value under None.
+        """
+        return self.timed_fetch()[1]
+
+    def timed_fetch(self):
+        """ Fetch the current values, along with the time pcp took them at, as (seconds, values) """
+        timestamp, arrays = self.fetch_arrays()
+
+        values = {}
+        for i, metric in enumerate(self.metrics):
+            inst_ids, metric_values = arrays[metric]
+            if self.descs[i].contents.indom == pmapi.c_api.PM_INDOM_NULL:
+                values[metric] = dict([(None, m_value) for m_value in metric_values[:1]])
+            else:
+                values[metric] = dict(zip(self.instance_names_of(i, inst_ids), metric_values))
+
+        return timestamp, values
+
+    def fetch_arrays(self):
+        """ Fetch the current values of every metric as arrays indexed alike:
+            (seconds, {metric: (instance ids, values)}). See extract_values.
+        """
+        arrays = {}
+        results = self.context.pmFetch(self.pmids)
+
+        try:
+            timestamp = results.contents.timestamp
+            timestamp = timestamp.tv_sec + timestamp.tv_usec / 1000000.0
+
+            for i in range(results.contents.numpmid):
+                arrays[self.metrics[i]] = self.extract_arrays(results, i, self.types[i])
+        finally:
+            self.context.pmFreeResult(results)
+
+        return timestamp, arrays
+
+    def sample(self):
+        """ Fetch the current values, keyed the same way as PMInfo.get_value """
+        return self.flatten(self.fetch())
+
+    @staticmethod
+    def flatten(values):
+        """ Key {metric: {instance name: value}} the same way as PMInfo.get_value """
+        rval = {}
+        for metric, instances in values.items():
+            # if there are multiple instances, their names are part of the keys
+            if len(instances) > 1:
+                for name, m_value in instances.items():
+                    rval[metric + '.' + name] = m_value
+            else:
+                for m_value in instances.values():
+                    rval[metric] = m_value
+
+        return rval
+
+def get_sampled_data(metrics, interval, count=1, archive=None, start=None):
     '''Recieve a list of metrics, a time interval, and a count.
        Sample the metrics based on an interval for count number of times.
+       With an archive, the samples are read from it, from start on.
     '''
     if not metrics:
         return {}
 
-    sampled_results = []
-    for i in range(count):
-        sampled_results.append(get_metrics(metrics))
-        if i == count - 1:
-            break
-        time.sleep(interval)
+    try:
+        sampler = PMSampler(metrics, archive=archive, start=start, step=interval)
+
+        sampled_results = []
+        for i in range(count):
+            sampled_results.append(sampler.sample())
+            if i == count - 1:
+                break
+            if not archive:
+                time.sleep(interval)
+
+    except pmapi.pmErr as error:
+        print error.message()
+        return {}
 
     results = {}
     for m_key in sampled_results[0]:
@@ -155,11 +496,32 @@ def get_sampled_data(metrics, interval, count=1):
 
     return results
 
-def get_metrics(metrics=None, derived_metrics=None):
+def replay_archive(archive, metrics, step, start=None, end=None, derived_metrics=None):
+    '''Step through a pmlogger archive every step seconds, from start to end
+       (default: all of it). Yields (timestamp, values), with values keyed the
+       same way as get_metrics.
+    '''
+    sampler = PMSampler(metrics, derived_metrics, archive=archive, start=start, step=step)
+
+    while True:
+        try:
+            timestamp, values = sampler.timed_fetch()
+        except pmapi.pmErr as error:
+            if is_end_of_archive(error):
+                return
+            raise
+
+        if end is not None and timestamp > end:
+            return
+
+        yield timestamp, sampler.flatten(values)
+
+def get_metrics(metrics=None, derived_metrics=None, archive=None):
     '''Get a list of metrics and query pcp for their values
+       (with an archive, the first values in the archive)
     '''
     try:
-        pcp = PMInfo()
+        pcp = PMInfo(archive)
         pcp.connect()
 
         if derived_metrics:
@@ -39,24 +39,102 @@ def get_metrics(metrics=None):
     If nothing is passed in, all metric will be returned
     '''
     pminfo = PMInfo()
-
-    metrics = PMInfo.get_pminfo_metrics(metrics)
-
     pminfo.fetch_pminfo_metrics(metrics)
-    pminfo.build_metric_regex(metrics)
-    pminfo.create_metric_dict()
-    pminfo.parse_pminfo()
 
     return pminfo.metric_dict
 
+class PMInfoParser(object):
+    '''
+    Parses the output of pminfo -f a line at a time, e.g.
+
+        <blank line>
+        kernel.all.load
+            inst [1 or "1 minute"] value 0.07
+            inst [5 or "5 minute"] value 0.1
+        <blank line>
+        kernel.all.cpu.irq.hard
+            value 0
+        <blank line>
+        quota.project.files.soft
+        No value(s) available!
+
+    A metric name follows a blank line; indented lines are its values, and any
+    other line (an error) means the metric has no values.
+
+    Results are { metric: value }, or { metric.instance: value } for metrics
+    with instances. Instance names have their spaces replaced by underscores;
+    instances without a name go by their number.
+    '''
+    inst_line = re.compile(r'^    inst \[(\d+)(?: or "(.*)")?\] value (.*)$')
+
+    def __init__(self):
+        self.results = {}
+        self.metric = None
+        self.values = None
+
+    def feed(self, line):
+        '''
+        Parse the next line
+        '''
+        line = line.rstrip('\n')
+
+        if not line.strip():
+            self.finish_metric()
+            self.metric = None
+            return
+
+        if self.metric is None:
+            self.metric = line.strip()
+            self.values = {}
+            return
+
+        if self.values is None:
+            # The metric already had an error
+            return
+
+        if line.startswith('    value '):
+            self.values[self.metric] = line[len('    value '):].strip()
+            return
+
+        match = self.inst_line.match(line)
+        if match:
+            inst_id, inst_name, value = match.groups()
+            name = inst_name.replace(' ', '_') if inst_name is not None else inst_id
+            self.values[self.metric + '.' + name] = value.strip()
+            return
+
+        if line.startswith('    '):
+            print "PMINFOParser: Unknown metric key and value: %s : %s" % (self.metric, line)
+            return
+
+        # No value(s) available!, Error: Metric not supported, ...
+        self.values = None
+
+    def finish_metric(self):
+        '''
+        Keep the values of the metric that just ended
+        '''
+        if self.metric is not None and self.values:
+            self.results.update(self.values)
+
+        self.values = None
+
+    def parse(self, lines):
+        '''
+        Parse all of lines (any iterable, e.g. a file) and return the results
+        '''
+        for line in lines:
+            self.feed(line)
+        self.finish_metric()
+
+        return self.results
+
 class PMInfo(object):
     '''
     PMINFOParser: Performance CoPilot pminfo output parser
     '''
 
     def __init__(self):
-        self.data = None
-        self.metric_regex = None
         self.metric_dict = {}
 
     def metric_print(self):
@@ -67,35 +145,20 @@ class PMInfo(object):
             print key
             print "  %s" % value
 
-    def build_metric_regex(self, metrics):
+    def fetch_pminfo_metrics(self, metrics=None):
         '''
-        Build the metric regex
+        This function calls pminfo with the -f switch, which 'fetches' the values
+        (of every metric below the given names, or of all metrics), and parses
+        its output as it streams in.
         '''
-        joined_metrics = '|'.join(metrics)
-        metric_str = '\n(' + joined_metrics + ')\n'
-        self.metric_regex = re.compile(metric_str)
+        process = PMInfo.start_pminfo(['-f'], metrics)
+        self.metric_dict = PMInfoParser().parse(iter(process.stdout.readline, ''))
+        process.wait()
 
     @staticmethod
-    def get_pminfo_metrics(metrics):
+    def start_pminfo(args=None, metric_keys=None):
         '''
-        Get a list of metrics from pminfo.  Return them in a list
-        '''
-        metrics = PMInfo.run_pminfo(metric_keys=metrics).strip().split('\n')
-        metrics = [s.strip() for s in metrics]
-
-        return  metrics
-
-    def fetch_pminfo_metrics(self, metrics):
-        '''
-        This function calls the pminfo function with the -f swith.
-        The -f switch 'fetches' the values from pminfo.
-        '''
-        self.data = PMInfo.run_pminfo(['-f'], metrics)
-
-    @staticmethod
-    def run_pminfo(args=None, metric_keys=None):
-        '''
-        Function to run pminfo command with a list of metrics
+        Function to start the pminfo command with a list of metrics
         '''
         cmd = ['/usr/bin/pminfo']
 
@@ -105,52 +168,11 @@ class PMInfo(object):
         if metric_keys:
             cmd += metric_keys
 
-        process = subprocess.Popen(cmd, stderr=None, stdout=subprocess.PIPE)
-        return  process.stdout.read()
-
-    def create_metric_dict(self):
-        '''
-        Build a metric dict that will be used to collect the metrics and values
+        return subprocess.Popen(cmd, stderr=None, stdout=subprocess.PIPE)
 
+    @staticmethod
+    def run_pminfo(args=None, metric_keys=None):
         '''
-        split_data = re.split(self.metric_regex, self.data)
-        exception_list = ['No value(s) available!',
-                          'Error: Metric not supported',
-                         ]
-        for i in range(1, len(split_data), 2):
-            if any([exce in split_data[i+1] for exce in exception_list]):
-                continue
-            self.metric_dict[split_data[i]] = split_data[i+1]
-
-    def parse_pminfo(self):
-        '''
-        Function to parse pminfo and return a dict of { metric: metric_value(s) }
+        Function to run pminfo command with a list of metrics
         '''
-
-        results = {}
-        inst_line = re.compile(r'\[\d+ or')
-
-        for metric, metric_value in self.metric_dict.items():
-            if metric_value.startswith('    value'):
-                metric_value = metric_value.strip()
-                value = metric_value.split()[1]
-                results[metric] = value
-            elif metric_value.startswith('    inst'):
-                insts = metric_value.split('    inst ')
-                for inst in insts:
-                    if not inst:
-                        continue
-                    metric_subname = None
-                    if inst_line.match(inst):
-                        metric_subname = inst.split('"')[1].replace(" ", "_")
-                    else:
-                        metric_subname = inst.split('[')[1].split(']')[0]
-
-                    metric_value = inst.split('] value ')[1].strip()
-                    metric_name = metric + "." + metric_subname
-                    results[metric_name] = metric_value
-            else:
-                print "PMINFOParser: Unknown metric key and value: %s : %s" \
-                      % (metric, metric_value)
-
-        self.metric_dict = results
+        return PMInfo.start_pminfo(args, metric_keys).stdout.read()
@@ -24,11 +24,38 @@ The purpose of this module is to process metrics and send them to Zabbix.
 # the size that the zabbix sender uses.
 CHUNK_SIZE = 250
 
+# This is the number of failed send attempts after which a metric is moved
+# to the dead-letter area of the metric manager. Attempts are only counted
+# while the trapper is up, so an outage doesn't use them up.
+MAX_ATTEMPTS = 100
+
+# Seconds to wait on the zabbix trapper
+TIMEOUT = 15
+
 from openshift_tools.monitoring.metricmanager import UniqueMetric
-# Reason: disable pylint import-error because it does not exist in the buildbot
-# Status: permanently disabled
-# pylint: disable=import-error
-from zbxsend import send_to_zabbix
+import json
+import re
+import socket
+import struct
+import time
+
+# The trapper's response info, e.g. "processed: 2; failed: 1; total: 3; seconds spent: 0.000068"
+# (or "Processed 2 Failed 1 Total 3 Seconds spent 0.000068" from zabbix 1.8)
+TRAPPER_INFO = re.compile(r'processed:?\s*(\d+);?\s*failed:?\s*(\d+)', re.IGNORECASE)
+
+class ZabbixSenderError(Exception):
+    '''
+        ZabbixSenderError
+        Raised when the trapper couldn't be reached, or didn't answer properly
+    '''
+    pass
+
+class ZabbixRefusedError(Exception):
+    '''
+        ZabbixRefusedError
+        The trapper is up, but refused some of the metrics it was sent
+    '''
+    pass
 
 # Reason: disable pylint too-few-public-methods because this class is a simple
 #     helper / wrapper class.
@@ -37,15 +64,17 @@ from zbxsend import send_to_zabbix
 class ZabbixSender(object):
     """Used as a wrapper to bind together the authentication and the send call.
     """
-    def __init__(self, server, port):
+    def __init__(self, server, port, timeout=TIMEOUT):
         """Constructs the object
 
         Args:
             server: the zabbix server where the trapper is running
             port: the zabbix port that the trapper is listening on
+            timeout: seconds to wait on the trapper
         """
         self.server = server
         self.port = port
+        self.timeout = timeout
 
     def send(self, metrics):
         """Sends the metric information to the zabbix trapper.
@@ -57,7 +86,77 @@ class ZabbixSender(object):
             True: metrics were successfully sent to zabbix.
             False: an error occurred.
         """
-        return send_to_zabbix(metrics, self.server, self.port)
+        try:
+            self.send_counted(metrics)
+            return True
+        except ZabbixSenderError:
+            return False
+
+    def send_counted(self, metrics):
+        """Sends the metric information to the zabbix trapper, and reports how many
+        of the metrics it took. The trapper answers "success" even when it refuses
+        some of them (e.g. items that don't exist, or values of the wrong type).
+
+        This speaks the same protocol as zbxsend.send_to_zabbix, which only
+        returns whether the trapper answered.
+
+        Args:
+            metrics: a list of UniqueMetrics to send to zabbix.
+
+        Returns: (the number of metrics processed, the number of metrics that failed)
+
+        Raises: ZabbixSenderError when the trapper couldn't be reached or didn't answer "success"
+        """
+        # Zabbix has a very fragile JSON parser, so the packet isn't dumped as a whole
+        metrics_data = []
+        for metric in metrics:
+            metrics_data.append('\t\t{\n'
+                                '\t\t\t"host":%s,\n'
+                                '\t\t\t"key":%s,\n'
+                                '\t\t\t"value":%s,\n'
+                                '\t\t\t"clock":%s}' % (json.dumps(metric.host), json.dumps(metric.key),
+                                                        json.dumps(metric.value), metric.clock or time.time()))
+        json_data = '{\n\t"request":"sender data",\n\t"data":[\n%s]\n}' % ',\n'.join(metrics_data)
+        packet = 'ZBXD\1' + struct.pack('<Q', len(json_data)) + json_data
+
+        zabbix = socket.socket()
+        try:
+            zabbix.settimeout(self.timeout)
+            zabbix.connect((self.server, self.port))
+            zabbix.sendall(packet)
+
+            resp_hdr = self._recv_all(zabbix, 13)
+            if not resp_hdr.startswith('ZBXD\1') or len(resp_hdr) != 13:
+                raise ZabbixSenderError("Wrong zabbix response")
+
+            resp = json.loads(self._recv_all(zabbix, struct.unpack('<Q', resp_hdr[5:])[0]))
+
+        except (socket.error, ValueError) as error:
+            raise ZabbixSenderError("Error while sending to zabbix: %s" % error)
+
+        finally:
+            zabbix.close()
+
+        if resp.get('response') != 'success':
+            raise ZabbixSenderError("Got error from zabbix: %s" % resp)
+
+        match = TRAPPER_INFO.search(resp.get('info') or '')
+        if not match:
+            # Nothing says that some were refused
+            return len(metrics), 0
+
+        return int(match.group(1)), int(match.group(2))
+
+    @staticmethod
+    def _recv_all(sock, count):
+        """Reads count bytes from sock, or less if it is closed first"""
+        buf = ''
+        while len(buf) < count:
+            chunk = sock.recv(count - len(buf))
+            if not chunk:
+                break
+            buf += chunk
+        return buf
 
 class ZabbixMetricProcessor(object):
     """Processes metrics and sends them to Zabbix Trapper.
@@ -66,7 +165,8 @@ class ZabbixMetricProcessor(object):
     # Reason: This is the API I want (stylistic exception)
     # Status: permanently disabled
     # pylint: disable=too-many-arguments
-    def __init__(self, metric_manager, zbxapi, zbxsender, hostname, verbose=False):
+    def __init__(self, metric_manager, zbxapi, zbxsender, hostname, verbose=False,
+                 max_attempts=MAX_ATTEMPTS):
         """Constructs the object
 
         Args:
@@ -75,8 +175,10 @@ class ZabbixMetricProcessor(object):
             zbxsender: this is used to send the metrics to zabbix
             hostname: the hostname of the zagg processor (so it can be overridden)
             verbose: whether this class should output or not.
+            max_attempts: failed sends after which a metric is dead-lettered
         """
         self.metric_manager = metric_manager
+        self.max_attempts = max_attempts
         self.zbxapi = zbxapi
         self.zbxsender = zbxsender
         self._verbose = verbose
@@ -104,11 +206,54 @@ class ZabbixMetricProcessor(object):
         Returns: a list of errors, if any
         """
 
+        # Read only the zbx metrics from disk
+        zbx_metrics = self.metric_manager.read_metrics(self.metric_manager.ZBX_METRICS)
+
+        return self._process_zbx_metrics_with_stats(zbx_metrics)
+
+    def process_hb_metrics(self):
+        """Processes heartbeat metrics provided by metric_manager
+
+        Args: None
+
+        Returns: a list of errors, if any
+        """
+
+        # Read only the heartbeat metrics from disk
+        hb_metrics = self.metric_manager.read_metrics(self.metric_manager.HEARTBEAT_METRICS)
+
+        return self._process_hb_metrics_with_stats(hb_metrics)
+
+    def process_all_metrics(self):
+        """Processes both heartbeat and zbx metrics from a single read of the metric_manager
+
+        Args: None
+
+        Returns: a list of errors, if any
+        """
+
         # Read metrics from disk
         all_metrics = self.metric_manager.read_metrics()
 
-        # Process the zbx metrics
+        # Process heartbeat metrics First (this ordering is important)
+        # This ensures a host in zabbix has been created.
+        hb_metrics = self.metric_manager.filter_heartbeat_metrics(all_metrics)
+        hb_errors = self._process_hb_metrics_with_stats(hb_metrics)
+
         zbx_metrics = self.metric_manager.filter_zbx_metrics(all_metrics)
+        zbx_errors = self._process_zbx_metrics_with_stats(zbx_metrics)
+
+        return hb_errors + zbx_errors
+
+    def _process_zbx_metrics_with_stats(self, zbx_metrics):
+        """Sends zbx metrics, followed by the zagg processor metrics about them
+
+        Args:
+            zbx_metrics: a list of zbx metrics to process.
+
+        Returns: a list of errors, if any
+        """
+
         zbx_errors = self._process_normal_metrics(zbx_metrics)
 
         # Now we need to try to send our zagg processor metrics.
@@ -125,20 +270,15 @@ class ZabbixMetricProcessor(object):
 
         return zbx_errors + zagg_metrics_errors
 
-    def process_hb_metrics(self):
-        """Processes heartbeat metrics provided by metric_manager
+    def _process_hb_metrics_with_stats(self, hb_metrics):
+        """Sends heartbeat metrics, followed by the zagg processor metrics about them
 
-        Args: None
+        Args:
+            hb_metrics: a list of heartbeat metrics to process.
 
         Returns: a list of errors, if any
         """
 
-        # Read metrics from disk
-        all_metrics = self.metric_manager.read_metrics()
-
-        # Process heartbeat metrics First (this ordering is important)
-        # This ensures a host in zabbix has been created.
-        hb_metrics = self.metric_manager.filter_heartbeat_metrics(all_metrics)
         hb_errors = self._process_heartbeat_metrics(hb_metrics)
 
         # Now we need to try to send our zagg processor metrics.
@@ -156,6 +296,41 @@ class ZabbixMetricProcessor(object):
         return hb_errors + zagg_metrics_errors
 
 
+    def process_api_stats(self, api_stats):
+        """Sends the zagg processor metrics about the zabbix api calls it made
+
+        Args:
+            api_stats: a ZabbixAPIStats of the calls (see openshift_tools.zbxapi)
+
+        Returns: a list of errors, if any
+        """
+
+        methods = api_stats.to_dict().values()
+        calls = sum([method['calls'] for method in methods])
+        latency_total = sum([method['latency_total'] for method in methods])
+
+        # Make the slowest calls easy to spot in the processor output
+        for method, stats in api_stats.slowest(5):
+            self._log("Zabbix API %s: %s calls, %.2fs total, %.2fs max, %s bytes received" % \
+                      (method, stats['calls'], stats['latency_total'], stats['latency_max'],
+                       stats['response_bytes']))
+
+        zagg_metrics = []
+        zagg_metrics.append(UniqueMetric(self._hostname, 'zagg.server.zbxapi.calls', calls))
+        zagg_metrics.append(UniqueMetric(self._hostname, 'zagg.server.zbxapi.errors',
+                                         sum([method['errors'] for method in methods])))
+        zagg_metrics.append(UniqueMetric(self._hostname, 'zagg.server.zbxapi.latency.avg',
+                                         latency_total / calls if calls else 0.0))
+        zagg_metrics.append(UniqueMetric(self._hostname, 'zagg.server.zbxapi.latency.max',
+                                         max([method['latency_max'] for method in methods] or [0.0])))
+        zagg_metrics.append(UniqueMetric(self._hostname, 'zagg.server.zbxapi.bytes.received',
+                                         sum([method['response_bytes'] for method in methods])))
+
+        # We write them to disk so that we can retry sending if there's an error
+        self.metric_manager.write_metrics(zagg_metrics)
+
+        return self._process_normal_metrics(zagg_metrics)
+
     def _handle_templates(self, all_templates):
         """Handle templates by ensuring they exist.
 
@@ -238,6 +413,9 @@ class ZabbixMetricProcessor(object):
         # Handle the Hostgroups
         errors.extend(self._handle_hostgroups(all_hostgroups))
 
+        failed_metrics = []
+        sent = 0
+
         for i, hb_metric in enumerate(hb_metrics):
 
             try:
@@ -258,6 +436,7 @@ class ZabbixMetricProcessor(object):
 
                     # We've successfuly sent the heartbeat, so remove it from disk
                     self.metric_manager.remove_metrics(hb_metric)
+                    sent += 1
                 else:
                     raise Exception("Error while sending to zabbix")
 
@@ -269,6 +448,14 @@ class ZabbixMetricProcessor(object):
                              (i + 1, hb_metric.host, error.message))
 
                 errors.append(error)
+                failed_metrics.append((hb_metric, error))
+
+        # When none went through, zabbix is down and the heartbeats aren't to blame:
+        # leave them alone instead of rewriting them all on every retry.
+        if sent:
+            for hb_metric, error in failed_metrics:
+                if self.metric_manager.record_failed_attempt(hb_metric, error, self.max_attempts):
+                    self._log("Heartbeat metric for host [%s] moved to dead-letter" % hb_metric.host)
 
         return errors
 
@@ -292,27 +479,52 @@ class ZabbixMetricProcessor(object):
 
         # Accumulate the errors
         errors = []
+        failed_chunks = []
 
         # Send metrics to Zabbix in chunks
         for i, chunk_ix in enumerate(range(0, len(metrics), CHUNK_SIZE)):
             chunk = metrics[chunk_ix:(chunk_ix + CHUNK_SIZE)]
 
             try:
-                if self.zbxsender.send(chunk):
+                processed, failed = self.zbxsender.send_counted(chunk)
+
+                if not failed:
                     self._log("Sending normal metrics chunk %s to Zabbix (size %s): success" % \
                                  (i + 1, len(chunk)))
 
                     # We've successfuly sent the metrics chunk, so remove them from disk
                     self.metric_manager.remove_metrics(chunk)
+                elif processed:
+                    # The trapper stored the others, and doesn't say which ones it refused.
+                    # Sending any of them again would store their values twice.
+                    error = ZabbixRefusedError("Zabbix refused %s of %s metrics" % (failed, len(chunk)))
+                    errors.append(error)
+                    self._log("Sending normal metrics chunk %s to Zabbix (size %s): FAILED: %s, "
+                              "the others were stored, removing the chunk" % \
+                                 (i + 1, len(chunk), error.message))
+                    self.metric_manager.remove_metrics(chunk)
                 else:
-                    raise Exception("Error while sending to zabbix")
+                    # Nothing was stored, the trapper refused every one of them
+                    error = ZabbixRefusedError("Zabbix refused all %s metrics" % len(chunk))
+                    errors.append(error)
+                    self._log("Sending normal metrics chunk %s to Zabbix (size %s): FAILED: %s, "
+                              "moving them to dead-letter" % (i + 1, len(chunk), error.message))
+                    self.metric_manager.dead_letter_metrics(chunk, "rejected by the zabbix trapper")
 
             # Reason: disable pylint broad-except because we want to process as much as possible
             # Status: permanently disabled
             # pylint: disable=broad-except
             except Exception as error:
                 errors.append(error)
+                failed_chunks.append((chunk, error))
                 self._log("Sending normal metrics chunk %s to Zabbix (size %s): FAILED: %s" % \
                              (i + 1, len(chunk), error.message))
 
+        # Chunks that couldn't be sent at all only count as a failed attempt when the
+        # trapper answered for other chunks. When it answered for none, it is down, and
+        # the metrics are left as they are until it is back.
+        if len(failed_chunks) < len(range(0, len(metrics), CHUNK_SIZE)):
+            for chunk, error in failed_chunks:
+                self.metric_manager.record_failed_attempt(chunk, error, self.max_attempts)
+
         return errors
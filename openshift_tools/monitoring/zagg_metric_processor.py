@@ -20,6 +20,16 @@
 The purpose of this module is to process metrics and send them to Zagg.
 """
 
+import itertools
+import Queue
+import threading
+
+# This is the number of metrics we send to the zagg in each request.
+CHUNK_SIZE = 1000
+
+# This is the number of requests that can be in flight to the zagg at once.
+IN_FLIGHT = 4
+
 # Reason: disable pylint too-few-public-methods because this class is a simple
 #     helper / wrapper class.
 # Status: permanently disabled
@@ -28,31 +38,100 @@ class ZaggMetricProcessor(object):
     """Processes metrics and sends them to a zagg
     """
 
-    def __init__(self, metric_manager, zagg_client):
+    def __init__(self, metric_manager, zagg_client, chunk_size=CHUNK_SIZE, in_flight=IN_FLIGHT):
         """Constructs the object
 
         Args:
             metric_manager: this is where we get the metrics from.
             zagg_client: this is where they're going to
+            chunk_size: the number of metrics sent in each request
+            in_flight: the number of requests that are sent concurrently
         """
         self.metric_manager = metric_manager
         self.zagg_client = zagg_client
+        self.chunk_size = chunk_size
+        self.in_flight = in_flight
 
     def process_metrics(self):
-        """Processes all metrics provided by metric_manager"""
-        # Read metrics from disk
-        metrics = self.metric_manager.read_metrics()
+        """Processes all metrics provided by metric_manager
 
-        if not metrics:
-            print "nothing to do!"
-            return True # we successfully sent 0 metrics to zagg
+        The metrics are read from disk and sent in chunks, with up to in_flight
+        chunks being sent at the same time. Each chunk is removed from disk as
+        soon as the zagg has accepted it. After the first failed chunk no new
+        chunks are started; the rest stay on disk for the next run.
+
+        Args: None
 
-        status, _ = self.zagg_client.add_metric(metrics)
+        Returns: a list of errors, if any
+        """
+        errors = []
+        # The size of each chunk that was sent successfully
+        sent_chunks = []
 
-        if status == 200:
-            # We've successfuly sent the metrics, so remove them from disk
-            self.metric_manager.remove_metrics(metrics)
+        # The queue is bounded so that we only read as many metrics from
+        # disk as we can have in flight.
+        chunk_queue = Queue.Queue(maxsize=self.in_flight)
+        workers = []
+        for _ in range(self.in_flight):
+            worker = threading.Thread(target=self._send_chunks, args=(chunk_queue, errors, sent_chunks))
+            worker.daemon = True
+            worker.start()
+            workers.append(worker)
+
+        metric_iter = self.metric_manager.iter_metrics()
+        while not errors:
+            chunk = list(itertools.islice(metric_iter, self.chunk_size))
+            if not chunk:
+                break
+            chunk_queue.put(chunk)
+
+        # Tell the workers there's nothing left to send
+        for _ in workers:
+            chunk_queue.put(None)
+
+        for worker in workers:
+            worker.join()
+
+        if not sent_chunks and not errors:
+            print "nothing to do!"
         else:
-            # TODO: add logging of the failure, and signal of failure
-            # For now, we'll just leave them on disk and try again
-            pass
+            print "Sent %s metrics in %s chunks to zagg, %s errors occurred." % \
+                  (sum(sent_chunks), len(sent_chunks), len(errors))
+
+        return errors
+
+    def _send_chunks(self, chunk_queue, errors, sent_chunks):
+        """Worker thread body: send chunks from the queue until a None is received
+
+        Args:
+            chunk_queue: the queue of metric chunks to send
+            errors: list of errors, appended to when a chunk fails
+            sent_chunks: list of chunk sizes, appended to when a chunk was sent
+
+        Returns: None
+        """
+        while True:
+            chunk = chunk_queue.get()
+            if chunk is None:
+                return
+
+            # Once a chunk has failed, the remaining queued chunks are left on disk
+            if errors:
+                continue
+
+            try:
+                status, _ = self.zagg_client.add_metric(chunk)
+
+                if status == 200:
+                    # We've successfuly sent the chunk, so remove it from disk
+                    self.metric_manager.remove_metrics(chunk)
+                    sent_chunks.append(len(chunk))
+                else:
+                    # We'll just leave them on disk and try again
+                    errors.append("Error while sending to zagg: status %s" % status)
+
+            # Reason: disable pylint broad-except because a failed chunk must not kill the worker
+            # Status: permanently disabled
+            # pylint: disable=broad-except
+            except Exception as error:
+                errors.append(error)
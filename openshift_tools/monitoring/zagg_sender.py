@@ -135,8 +135,10 @@ class ZaggSender(object):
                                                  )
         self.unique_metrics.append(hb_metric)
 
-    def add_zabbix_keys(self, zabbix_keys, host=None):
-        """ create unique metric from zabbix key value pair """
+    def add_zabbix_keys(self, zabbix_keys, host=None, clock=None):
+        """ create unique metric from zabbix key value pair
+            (taken at clock, default: now)
+        """
 
         if not host:
             host = self.host
@@ -144,12 +146,12 @@ class ZaggSender(object):
         zabbix_metrics = []
 
         for key, value in zabbix_keys.iteritems():
-            zabbix_metric = UniqueMetric(host, key, value)
+            zabbix_metric = UniqueMetric(host, key, value, clock)
             zabbix_metrics.append(zabbix_metric)
 
         self.unique_metrics += zabbix_metrics
 
-    def add_zabbix_dynamic_item(self, discovery_key, macro_string, macro_array, host=None):
+    def add_zabbix_dynamic_item(self, discovery_key, macro_string, macro_array, host=None, clock=None):
         """
         This creates a dynamic item prototype that is required
         for low level discovery rules in Zabbix.
@@ -172,7 +174,7 @@ class ZaggSender(object):
         data_array = [{'{%s}' % macro_string : i} for i in macro_array]
         json_data = json.dumps({'data' : data_array})
 
-        zabbix_dynamic_item = UniqueMetric(host, discovery_key, json_data)
+        zabbix_dynamic_item = UniqueMetric(host, discovery_key, json_data, clock)
 
         self.unique_metrics.append(zabbix_dynamic_item)
 
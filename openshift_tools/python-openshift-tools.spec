@@ -87,6 +87,10 @@ PCP Python libraries developed for monitoring OpenShift.
 %files monitoring-pcp
 %{python_sitelib}/openshift_tools/monitoring/pminfo*.py
 %{python_sitelib}/openshift_tools/monitoring/pminfo*.py[co]
+%{python_sitelib}/openshift_tools/monitoring/pcp_collector.py
+%{python_sitelib}/openshift_tools/monitoring/pcp_collector.py[co]
+%{python_sitelib}/openshift_tools/monitoring/pcp_rates.py
+%{python_sitelib}/openshift_tools/monitoring/pcp_rates.py[co]
 
 # ----------------------------------------------------------------------------------
 # python-openshift-tools-monitoring-docker subpackage
@@ -9,6 +9,7 @@ see zagg_client.py for example on how to use
 import requests
 # pylint: disable=import-error,no-name-in-module
 import requests.packages.urllib3.connectionpool as httplib
+import Queue
 import time
 import urllib3
 
@@ -45,6 +46,11 @@ class RestApi(object):
 
         self.base_uri = "http://" + self.host + "/"
 
+        # Reuse connections (HTTP keep-alive) across requests from this object.
+        # requests.Session isn't thread-safe, so each request checks one out of
+        # this pool, which grows to the number of concurrent requests.
+        self._sessions = Queue.LifoQueue()
+
     @property
     def _auth(self):
         """
@@ -54,6 +60,15 @@ class RestApi(object):
             return requests.auth.HTTPBasicAuth(self.username, self.password)
         return None
 
+    def _get_session(self):
+        """
+        check out a session that no other thread is using
+        """
+        try:
+            return self._sessions.get_nowait()
+        except Queue.Empty:
+            return requests.Session()
+
     def request(self, url, method, timeout=120, headers=None, params=None,
                 data=None, retries=0):
         """
@@ -69,15 +84,16 @@ class RestApi(object):
             # pylint: disable=no-member
             requests.packages.urllib3.disable_warnings()
 
-        _headers = self.headers or {}
+        _headers = dict(self.headers or {})
 
         if headers:
             _headers.update(headers)
 
         attempts = retries + 1
         while attempts > 0:
+            session = self._get_session()
             try:
-                response = requests.request(
+                response = session.request(
                     auth=None if not self._auth else self._auth,
                     allow_redirects=True,
                     method=method,
@@ -104,3 +120,6 @@ class RestApi(object):
                     raise
                 else:
                     time.sleep(1)
+
+            finally:
+                self._sessions.put(session)
@@ -35,10 +35,17 @@ if __name__ == '__main__':
 # pylint: disable=line-too-long
 # Disabling line length for readability
 
+import atexit
+import collections
+import fcntl
 import json
+import os
 import requests
 import httplib
 import copy
+import threading
+import time
+from multiprocessing.pool import ThreadPool
 
 class ZabbixAPIError(Exception):
     '''
@@ -56,13 +63,313 @@ class ZabbixAPIError(Exception):
 class ZabbixConnection(object):
     '''
     Placeholder for connection options
+
+    pool_size is the number of HTTP connections kept open to the server.
+    timeout is passed to requests: seconds, or a (connect, read) tuple. None waits forever.
+    token_cache is the path of a file where auth tokens are kept between processes
+    (default: $ZABBIX_TOKEN_CACHE, if set).
+    cache_ttl enables caching of *.get responses for that many seconds, keeping
+    at most cache_size responses (see ZabbixAPICache).
+    stats is a ZabbixAPIStats to record the calls in (default: the process-wide one
+    dumped to $ZABBIX_API_STATS at exit, if set, or a new one).
     '''
-    def __init__(self, server, username, password, ssl_verify=False, verbose=False):
+    def __init__(self, server, username, password, ssl_verify=False, verbose=False,
+                 pool_size=10, timeout=None, token_cache=None, cache_ttl=None, cache_size=1000,
+                 stats=None):
         self.server = server
         self.username = username
         self.password = password
         self.verbose = verbose
         self.ssl_verify = ssl_verify
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.token_cache = token_cache or os.environ.get('ZABBIX_TOKEN_CACHE', None)
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self.stats = stats
+
+class ZabbixAPIStats(object):
+    '''
+    Per-method call counts, latency histograms and request/response sizes of zabbix api calls.
+
+    Setting $ZABBIX_API_STATS to a file path makes every ZabbixAPI in the process record
+    into one shared ZabbixAPIStats, which is merged into that (JSON) file at exit.
+    Several processes, e.g. ansible modules, can share the file.
+    '''
+    ENV_VAR = 'ZABBIX_API_STATS'
+
+    # Upper bounds (in seconds) of the latency histogram buckets, the last bucket is everything slower
+    LATENCY_BUCKETS = [0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+
+    _process_stats = None
+
+    def __init__(self):
+        self.methods = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def new_method():
+        ''' The stats of a method that hasn't been called yet '''
+        return {'calls': 0, 'errors': 0, 'latency_total': 0.0, 'latency_max': 0.0,
+                'latency_buckets': [0] * (len(ZabbixAPIStats.LATENCY_BUCKETS) + 1),
+                'request_bytes': 0, 'response_bytes': 0, 'response_bytes_max': 0}
+
+    def record(self, method, latency, request_bytes, response_bytes, error=False):
+        ''' Record one call '''
+        bucket = len([bound for bound in ZabbixAPIStats.LATENCY_BUCKETS if latency > bound])
+
+        with self.lock:
+            stats = self.methods.setdefault(method, ZabbixAPIStats.new_method())
+            stats['calls'] += 1
+            stats['errors'] += 1 if error else 0
+            stats['latency_total'] += latency
+            stats['latency_max'] = max(stats['latency_max'], latency)
+            stats['latency_buckets'][bucket] += 1
+            stats['request_bytes'] += request_bytes
+            stats['response_bytes'] += response_bytes
+            stats['response_bytes_max'] = max(stats['response_bytes_max'], response_bytes)
+
+    def merge(self, methods):
+        ''' Add the per-method stats of another ZabbixAPIStats (see to_dict) to ours '''
+        with self.lock:
+            for method, other in methods.items():
+                stats = self.methods.setdefault(method, ZabbixAPIStats.new_method())
+                for key in ['calls', 'errors', 'latency_total', 'request_bytes', 'response_bytes']:
+                    stats[key] += other[key]
+                for key in ['latency_max', 'response_bytes_max']:
+                    stats[key] = max(stats[key], other[key])
+                stats['latency_buckets'] = [mine + theirs for mine, theirs in
+                                            zip(stats['latency_buckets'], other['latency_buckets'])]
+
+    def to_dict(self):
+        ''' The per-method stats, ready to be dumped as JSON '''
+        with self.lock:
+            return copy.deepcopy(self.methods)
+
+    def slowest(self, count=10):
+        ''' The (method, stats) pairs with the most total latency first '''
+        methods = self.to_dict()
+        return sorted(methods.items(), key=lambda item: item[1]['latency_total'], reverse=True)[:count]
+
+    def dump(self, path):
+        '''
+        Merge our stats into the JSON file at path, holding a lock on it so
+        that processes dumping at the same time don't lose each other's calls.
+        '''
+        with open(path, 'a+') as stats_file:
+            fcntl.flock(stats_file, fcntl.LOCK_EX)
+            stats_file.seek(0)
+            data = stats_file.read()
+
+            merged = ZabbixAPIStats()
+            if data:
+                merged.merge(json.loads(data))
+            merged.merge(self.to_dict())
+
+            stats_file.seek(0)
+            stats_file.truncate()
+            stats_file.write(json.dumps(merged.to_dict(), indent=2, sort_keys=True))
+
+    @staticmethod
+    def collect(path):
+        '''
+        Read and empty the JSON file at path.
+        Returns a ZabbixAPIStats of all of the calls dumped to it since the last collect.
+        '''
+        stats = ZabbixAPIStats()
+        if not os.path.exists(path):
+            return stats
+
+        with open(path, 'r+') as stats_file:
+            fcntl.flock(stats_file, fcntl.LOCK_EX)
+            data = stats_file.read()
+            if data:
+                stats.merge(json.loads(data))
+            stats_file.seek(0)
+            stats_file.truncate()
+
+        return stats
+
+    @staticmethod
+    def process_stats():
+        '''
+        The process-wide ZabbixAPIStats that is dumped to $ZABBIX_API_STATS at exit,
+        or None if that isn't set
+        '''
+        path = os.environ.get(ZabbixAPIStats.ENV_VAR)
+        if not path:
+            return None
+
+        if ZabbixAPIStats._process_stats is None:
+            ZabbixAPIStats._process_stats = ZabbixAPIStats()
+            atexit.register(ZabbixAPIStats._process_stats.dump, path)
+
+        return ZabbixAPIStats._process_stats
+
+class ZabbixAPICache(object):
+    '''
+    A size-bounded LRU cache of zabbix api responses, whose entries expire after ttl seconds.
+    Entries are keyed on the api method and its canonicalized params.
+    '''
+    def __init__(self, ttl, max_size):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.entries = collections.OrderedDict()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+        # Calls can be made from several threads (see iter_events and AsyncZabbixAPI)
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(method, params):
+        ''' The cache key of a call '''
+        return (method, json.dumps(params, sort_keys=True))
+
+    def get(self, method, params):
+        '''
+        Returns the cached (response, content) of a call, or None
+        '''
+        key = ZabbixAPICache.key(method, params)
+        with self.lock:
+            entry = self.entries.pop(key, None)
+
+            if entry is None or time.time() - entry[0] > self.ttl:
+                self.stats['misses'] += 1
+                return None
+
+            # Re-insert to mark it as the most recently used entry
+            self.entries[key] = entry
+            self.stats['hits'] += 1
+
+        # Callers are free to modify what they get back
+        return entry[1], copy.deepcopy(entry[2])
+
+    def put(self, method, params, response, content):
+        ''' Cache the (response, content) of a call '''
+        entry = (time.time(), response, copy.deepcopy(content))
+        with self.lock:
+            self.entries[ZabbixAPICache.key(method, params)] = entry
+
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def invalidate(self, zbx_class=None):
+        ''' Drop the entries of one zabbix class (e.g. 'template'), or all of them '''
+        with self.lock:
+            for key in self.entries.keys():
+                if zbx_class is None or key[0].split('.')[0] == zbx_class:
+                    del self.entries[key]
+                    self.stats['invalidations'] += 1
+
+class ZabbixBatchCall(object):
+    '''
+    A call queued in a ZabbixAPIBatch. Its content is filled in when the batch is sent.
+    '''
+    def __init__(self, method, params, rid):
+        self.method = method
+        self.params = params
+        self.rid = rid
+        self.content = None
+
+    @property
+    def done(self):
+        ''' Whether the batch holding this call has been sent '''
+        return self.content is not None
+
+    def result(self):
+        '''
+        Returns the result of the call, or raises ZabbixAPIError if the call failed
+        '''
+        if not self.done:
+            raise ZabbixAPIError('%s has not been sent yet' % self.method)
+
+        if self.content.has_key('error'):
+            raise ZabbixAPIError('%s failed: %s' % (self.method, self.content['error']))
+
+        return self.content['result']
+
+    def error(self):
+        ''' Returns the error of the call, or None if it succeeded '''
+        return self.content.get('error') if self.done else None
+
+# The batch works closely with the ZabbixAPI internals
+# pylint: disable=protected-access
+class ZabbixAPIBatch(object):
+    '''
+    Queues zabbix api calls and sends them as JSON-RPC batch requests.
+    See ZabbixAPI.batch.
+    '''
+    def __init__(self, zapi, max_size=100):
+        self.zapi = zapi
+        self.max_size = max_size
+        self.calls = []
+
+    def add(self, method, params):
+        '''
+        Queue a call, e.g. batch.add('host.get', {'filter': {'host': 'a'}})
+        Returns the ZabbixBatchCall for it.
+        '''
+        call = ZabbixBatchCall(method, params, len(self.calls) + 1)
+        self.calls.append(call)
+        return call
+
+    def send(self):
+        '''
+        Send all of the queued calls that haven't been sent yet.
+        Each call gets its own result or error; returns all calls in the order they were queued.
+        '''
+        self._send_calls([call for call in self.calls if not call.done])
+
+        # Our token (possibly from the token cache) has expired, log in again and retry
+        expired = [call for call in self.calls if ZabbixAPI.session_terminated(call.content)]
+        if expired:
+            self.zapi.relogin()
+            self._send_calls(expired)
+
+        return self.calls
+
+    def _send_calls(self, pending):
+        '''
+        Send the given calls in batches of up to max_size, and fill in their content
+        '''
+        for chunk_ix in range(0, len(pending), self.max_size):
+            chunk = pending[chunk_ix:chunk_ix + self.max_size]
+            _, content = self.zapi._post([self.zapi._rpc_body(call.method, call.params, call.rid)
+                                          for call in chunk])
+
+            # Responses can come back in any order, they're matched up by id.
+            # A single object instead of a list means the whole batch was rejected.
+            if isinstance(content, list):
+                responses = dict((resp.get('id'), resp) for resp in content)
+            else:
+                responses = {}
+
+            # Like unbatched calls, writes throw away the cached responses of their class
+            for method in set([call.method for call in chunk]):
+                self.zapi._invalidate_cache(method)
+
+            for call in chunk:
+                if responses.has_key(call.rid):
+                    call.content = responses[call.rid]
+                elif isinstance(content, dict) and content.has_key('error'):
+                    call.content = {'error': content['error']}
+                else:
+                    call.content = {'error': 'No response for call %s' % call.rid}
+
+    def __enter__(self):
+        if self.zapi._batch is not None:
+            raise ZabbixAPIError('Zabbix API batches can not be nested')
+
+        self.zapi._batch = self
+        return self
+
+    # pylint: disable=redefined-builtin
+    def __exit__(self, type, value, traceback):
+        self.zapi._batch = None
+
+        # Don't send anything if the block raised
+        if type is None:
+            self.send()
 
 class ZabbixAPI(object):
     '''
@@ -111,6 +418,9 @@ class ZabbixAPI(object):
         'Usermedia': ['get'],
     }
 
+    # Methods that don't change anything, so they don't invalidate the response cache
+    read_only_methods = ['get', 'isreadable', 'iswritable', 'export', 'getsla', 'getscriptsbyhosts', 'login', 'logout']
+
     def __init__(self, zabbix_connection=None):
         self.server = zabbix_connection.server
         self.username = zabbix_connection.username
@@ -120,14 +430,45 @@ class ZabbixAPI(object):
 
         self.verbose = zabbix_connection.verbose
         self.ssl_verify = zabbix_connection.ssl_verify
+        self.timeout = zabbix_connection.timeout
         if self.verbose:
             httplib.HTTPSConnection.debuglevel = 1
             httplib.HTTPConnection.debuglevel = 1
         self.auth = None
 
+        # One session per object, so that all calls reuse the same pooled
+        # (keep-alive) connections instead of doing a TCP+TLS handshake each.
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1,
+                                                pool_maxsize=zabbix_connection.pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.requests_sent = 0
+        self._batch = None
+        self.token_cache = zabbix_connection.token_cache
+
+        self.stats = zabbix_connection.stats or ZabbixAPIStats.process_stats() or ZabbixAPIStats()
+
+        self.cache = None
+        if zabbix_connection.cache_ttl:
+            self.cache = ZabbixAPICache(zabbix_connection.cache_ttl, zabbix_connection.cache_size)
+
         for cname, _ in self.classes.items():
             setattr(self, cname.lower(), getattr(self, cname)(self))
 
+        # We log in lazily, on the first call that needs it (see _get_auth)
+
+    def login(self, use_cache=True):
+        '''
+        Log in to zabbix and keep the auth token. If a token cache is configured,
+        a cached token for this server and user is used instead of logging in,
+        and new tokens are saved to it.
+        '''
+        if use_cache and self.token_cache:
+            self.auth = ZabbixAPI._read_token_cache(self.token_cache).get(self._token_cache_key)
+            if self.auth:
+                return
+
         # pylint: disable=no-member
         # This method does not exist until the metaprogramming executed
         resp, content = self.user.login(user=self.username, password=self.password)
@@ -140,7 +481,73 @@ class ZabbixAPI(object):
         else:
             raise ZabbixAPIError("Error in call to zabbix. Http status: {0}.".format(resp.status_code))
 
-    def perform(self, method, rpc_params):
+        if self.token_cache:
+            self._write_token_cache()
+
+    def _get_auth(self):
+        '''
+        Returns the auth token, logging in first if we haven't yet
+        '''
+        if self.auth is None:
+            self.login()
+
+        return self.auth
+
+    @property
+    def _token_cache_key(self):
+        ''' Tokens are cached per server and user '''
+        return "%s %s" % (self.server, self.username)
+
+    @staticmethod
+    def _read_token_cache(path):
+        '''
+        Returns the tokens in the cache file as a dict, or an empty dict if it can't be read
+        '''
+        try:
+            with open(path) as cache_file:
+                return json.load(cache_file)
+        except (IOError, ValueError):
+            return {}
+
+    def _write_token_cache(self):
+        '''
+        Save (or, if self.auth is None, drop) our token in the cache file.
+        The file is only readable by its owner, and is replaced atomically.
+        '''
+        tokens = ZabbixAPI._read_token_cache(self.token_cache)
+
+        if self.auth:
+            tokens[self._token_cache_key] = self.auth
+        else:
+            tokens.pop(self._token_cache_key, None)
+
+        tmp_path = "%s.%s.tmp" % (self.token_cache, os.getpid())
+        cache_fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0600)
+        with os.fdopen(cache_fd, 'w') as cache_file:
+            json.dump(tokens, cache_file)
+        os.rename(tmp_path, self.token_cache)
+
+    @staticmethod
+    def session_terminated(content):
+        '''
+        Whether a response says that our auth token is no longer valid
+        '''
+        if not isinstance(content, dict) or not isinstance(content.get('error'), dict):
+            return False
+
+        return 'Session terminated' in str(content['error'].get('data', ''))
+
+    def relogin(self):
+        '''
+        Throw away our (expired) token and log in again
+        '''
+        self.auth = None
+        if self.token_cache:
+            self._write_token_cache()
+
+        self.login(use_cache=False)
+
+    def perform(self, method, rpc_params, use_cache=True):
         '''
         This method calls your zabbix server.
 
@@ -151,37 +558,99 @@ class ZabbixAPI(object):
             rpc_params - parameters that will be passed to the API method;
             id - an arbitrary identifier of the request;
             auth - a user authentication token; since we don't have one yet, it's set to null.
+
+        Inside of a batch (see ZabbixAPI.batch), the call is queued instead and a
+        ZabbixBatchCall is returned.
+
+        With use_cache=False, a get neither comes from nor goes into the response cache
+        (e.g. the pages of iter_history, which would only push everything else out of it).
         '''
-        jsonrpc = "2.0"
-        rid = 1
+        if self._batch is not None and method != 'user.login':
+            return self._batch.add(method, rpc_params.get('params', {}))
 
-        headers = {}
-        headers["Content-type"] = "application/json"
+        params = rpc_params.get('params', {})
+        zbx_method = method.split('.', 1)[1]
+
+        use_cache = use_cache and self.cache is not None
+        if self.cache:
+            if zbx_method != 'get':
+                self._invalidate_cache(method)
+            elif use_cache:
+                cached = self.cache.get(method, params)
+                if cached:
+                    return cached
+
+        response, content = self._post(self._rpc_body(method, params, 1))
+
+        # Our token (possibly from the token cache) has expired, log in again and retry
+        if ZabbixAPI.session_terminated(content):
+            self.relogin()
+            response, content = self._post(self._rpc_body(method, params, 1))
 
+        if use_cache and zbx_method == 'get' and content.has_key('result'):
+            self.cache.put(method, params, response, content)
+
+        return response, content
+
+    def _invalidate_cache(self, method):
+        '''
+        Anything that can change a class throws away what the response cache knows about it
+        '''
+        zbx_class, zbx_method = method.split('.', 1)
+        if self.cache and zbx_method not in ZabbixAPI.read_only_methods:
+            self.cache.invalidate(None if method == 'configuration.import' else zbx_class)
+
+    def cache_stats(self):
+        '''
+        Returns the hit/miss/eviction/invalidation counts of the response cache,
+        or None if caching isn't enabled
+        '''
+        return dict(self.cache.stats, size=len(self.cache.entries)) if self.cache else None
+
+    def _rpc_body(self, method, params, rid):
+        '''
+        Build the JSON-RPC request object for a single call
+        '''
         body = {
-            "jsonrpc": jsonrpc,
+            "jsonrpc": "2.0",
             "method":  method,
-            "params":  rpc_params.get('params', {}),
+            "params":  params,
             "id":      rid,
-            'auth':    self.auth,
         }
 
-        if method in ['user.login', 'api.version']:
-            del body['auth']
+        if method not in ['user.login', 'api.version']:
+            body['auth'] = self._get_auth()
+
+        return body
+
+    def _post(self, body):
+        '''
+        Send a JSON-RPC request object (or a list of them, for a batch) to the server
+        '''
+        headers = {}
+        headers["Content-type"] = "application/json"
+
+        method = 'batch' if isinstance(body, list) else body['method']
+        if self.verbose:
+            print "METHOD:", [call['method'] for call in body] if isinstance(body, list) else method
 
         body = json.dumps(body)
 
         if self.verbose:
             print "BODY:", body
-            print "METHOD:", method
             print "HEADERS:", headers
 
-        request = requests.Request("POST", self.server, data=body, headers=headers)
-        session = requests.Session()
-        req_prep = session.prepare_request(request)
-        response = session.send(req_prep, verify=self.ssl_verify)
+        start = time.time()
+        try:
+            response = self.session.post(self.server, data=body, headers=headers,
+                                         verify=self.ssl_verify, timeout=self.timeout)
+        except requests.exceptions.RequestException:
+            self.stats.record(method, time.time() - start, len(body), 0, error=True)
+            raise
+        self.requests_sent += 1
 
         if response.status_code not in [200, 201]:
+            self.stats.record(method, time.time() - start, len(body), len(response.content), error=True)
             raise ZabbixAPIError('Error calling zabbix.  Zabbix returned %s' % response.status_code)
 
         if self.verbose:
@@ -192,8 +661,144 @@ class ZabbixAPI(object):
         except ValueError as err:
             content = {"error": err.message}
 
+        self.stats.record(method, time.time() - start, len(body), len(response.content),
+                          error=isinstance(content, dict) and content.has_key('error'))
+
         return response, content
 
+    def batch(self, max_size=100):
+        '''
+        Returns a context manager that queues the calls made inside of it and
+        sends them as JSON-RPC batches of up to max_size calls when it exits.
+
+            with zapi.batch() as batch:
+                hosts = zapi.host.get(filter={'host': 'a.example.com'})
+                groups = zapi.hostgroup.get(filter={'name': 'Linux servers'})
+
+            print hosts.result(), groups.result()
+        '''
+        return ZabbixAPIBatch(self, max_size)
+
+    def connection_stats(self):
+        '''
+        Returns how many HTTP requests were sent and how many connections
+        were opened to send them. With working keep-alive, connections stays
+        at (or below) the pool size no matter how many requests are sent.
+        '''
+        connections = 0
+        for adapter in set(self.session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools[key]
+                if pool:
+                    connections += pool.num_connections
+
+        return {'requests': self.requests_sent, 'connections': connections}
+
+    def iter_events(self, time_from, time_till, params=None, window=86400, page_size=1000, workers=1):
+        '''
+        Yields the events with a clock in [time_from, time_till), oldest window first,
+        without ever holding more than a page (or one window per worker) in memory.
+
+        params are any other event.get params, e.g. {'objectids': [...], 'selectHosts': 'extend'}.
+        The span is fetched window seconds at a time and each window is paged through with
+        an eventid cursor. With workers > 1, that many windows are fetched in parallel.
+        '''
+        return self._iter_windows('event', params, time_from, time_till, window, page_size, workers)
+
+    def iter_history(self, time_from, time_till, params=None, window=3600, page_size=1000, workers=1):
+        '''
+        Yields the history values with a clock in [time_from, time_till), like iter_events.
+
+        params are any other history.get params, e.g. {'history': 0, 'itemids': [...]}.
+        Each window is paged through with a clock cursor.
+        '''
+        return self._iter_windows('history', params, time_from, time_till, window, page_size, workers)
+
+    def _iter_windows(self, zbx_class, params, time_from, time_till, window, page_size, workers):
+        '''
+        Yields the objects of each time window in turn.
+
+        Sequential fetches size the next window on what the last one held, aiming for
+        about one page per window. Parallel fetches use fixed windows.
+        '''
+        # Log in up front so that parallel fetches share one token
+        self._get_auth()
+
+        if workers > 1:
+            spans = [(start, min(start + window, time_till)) for start in range(time_from, time_till, window)]
+            fetch = lambda span: [obj for page in self._iter_window(zbx_class, params, span[0], span[1], page_size)
+                                  for obj in page]
+
+            pool = ThreadPool(workers)
+            try:
+                for span_ix in range(0, len(spans), workers):
+                    for objects in pool.map(fetch, spans[span_ix:span_ix + workers]):
+                        for obj in objects:
+                            yield obj
+            finally:
+                pool.close()
+
+            return
+
+        start = time_from
+        while start < time_till:
+            end = min(start + window, time_till)
+
+            pages = 0
+            count = 0
+            for page in self._iter_window(zbx_class, params, start, end, page_size):
+                pages += 1
+                count += len(page)
+                for obj in page:
+                    yield obj
+
+            if pages > 1:
+                window = max(window // pages, 1)
+            elif count < page_size // 4:
+                window *= 2
+
+            start = end
+
+    def _iter_window(self, zbx_class, params, start, end, page_size):
+        '''
+        Yields pages of the objects with a clock in [start, end).
+
+        Events are paged with eventid_from. History has no id, so it's paged by clock
+        and the values already seen at the cursor's clock are skipped.
+        '''
+        query = dict(params or {}, time_from=start, time_till=end - 1, limit=page_size, sortorder='ASC')
+        query['sortfield'] = 'eventid' if zbx_class == 'event' else 'clock'
+
+        history_key = lambda obj: (obj['itemid'], obj['clock'], obj.get('ns'), obj['value'])
+        seen = set()
+
+        while True:
+            # Always a plain call, even on an AsyncZabbixAPI, and never cached: pages are only read once
+            _, content = ZabbixAPI.perform(self, zbx_class + '.get', {'params': query}, use_cache=False)
+            if content.has_key('error'):
+                raise ZabbixAPIError('%s.get failed: %s' % (zbx_class, content['error']))
+
+            page = content['result']
+            fresh = [obj for obj in page if history_key(obj) not in seen] if seen else page
+            if fresh:
+                yield fresh
+
+            if len(page) < query['limit']:
+                return
+
+            if zbx_class == 'event':
+                query['eventid_from'] = str(int(page[-1]['eventid']) + 1)
+                continue
+
+            clock = int(page[-1]['clock'])
+            if int(page[0]['clock']) == clock:
+                # More values in one second than fit in a page
+                query['limit'] *= 2
+
+            query['time_from'] = clock
+            seen = set(history_key(obj) for obj in page if int(obj['clock']) == clock)
+
     @staticmethod
     def meta(cname, method_names):
         '''
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+'''
+  Concurrent ZabbixAPI client
+
+if __name__ == '__main__':
+    zapi = AsyncZabbixAPI(ZabbixConnection(server, username, password), concurrency=10)
+
+    # Each call returns right away with a ZabbixFuture
+    hosts = zapi.host.get({'filter': {'host': 'a.example.com'}})
+    groups = zapi.hostgroup.get({'filter': {'name': 'Linux servers'}})
+    print hosts.result(), groups.result()
+
+    # Or hand over a list of calls and get their contents back, in order
+    print zapi.gather([('host', 'get', {}), ('template', 'get', {})])
+
+'''
+# vim: expandtab:tabstop=4:shiftwidth=4
+
+#   Copyright 2016 Red Hat Inc.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+from multiprocessing.pool import ThreadPool
+import requests
+
+from openshift_tools.zbxapi import ZabbixAPI, ZabbixAPIError
+
+class ZabbixFuture(object):
+    '''
+    A call running on an AsyncZabbixAPI. Wait on it with result() or content().
+    '''
+    def __init__(self, method, async_result):
+        self.method = method
+        self.async_result = async_result
+
+    @property
+    def done(self):
+        ''' Whether the call has finished '''
+        return self.async_result.ready()
+
+    def response(self, timeout=None):
+        ''' Wait for the call and return its (response, content) '''
+        return self.async_result.get(timeout)
+
+    def content(self, timeout=None):
+        ''' Wait for the call and return its JSON-RPC content, like ZabbixAPI.get_content '''
+        return self.response(timeout)[1]
+
+    def result(self, timeout=None):
+        '''
+        Wait for the call and return its result, or raise ZabbixAPIError if it failed
+        '''
+        content = self.content(timeout)
+        if content.has_key('error'):
+            raise ZabbixAPIError('%s failed: %s' % (self.method, content['error']))
+
+        return content['result']
+
+class AsyncZabbixAPI(ZabbixAPI):
+    '''
+    A ZabbixAPI whose calls run concurrently.
+
+    It has the same class/method surface as ZabbixAPI (zapi.host.get(...),
+    zapi.get_content(...)), but each call returns a ZabbixFuture right away.
+    At most concurrency calls are in flight at once; they share the object's
+    pooled connections, which is sized to match.
+    '''
+    def __init__(self, zabbix_connection=None, concurrency=10):
+        super(AsyncZabbixAPI, self).__init__(zabbix_connection)
+
+        # Every call in flight needs a connection of its own
+        if zabbix_connection.pool_size < concurrency:
+            adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+            self.session.mount('http://', adapter)
+            self.session.mount('https://', adapter)
+
+        self.concurrency = concurrency
+        self.pool = ThreadPool(concurrency)
+
+    def perform(self, method, rpc_params):
+        '''
+        Start the call on the thread pool and return a ZabbixFuture for it.
+
+        Logging in and batches (see ZabbixAPI.batch) stay synchronous.
+        '''
+        if method == 'user.login' or self._batch is not None:
+            return super(AsyncZabbixAPI, self).perform(method, rpc_params)
+
+        # Log in before fanning out, so that all calls share one token
+        self._get_auth()
+
+        return ZabbixFuture(method, self.pool.apply_async(super(AsyncZabbixAPI, self).perform,
+                                                          (method, rpc_params)))
+
+    def get_content(self, zbx_class_name, method, params):
+        '''
+        Start zbx_class_name.method(params), e.g. ('host', 'get', {}), and return a ZabbixFuture for it
+        '''
+        zbx_class_inst = self.__getattribute__(zbx_class_name.lower())
+        zbx_class = self.__getattribute__(zbx_class_name.capitalize())
+        return zbx_class.__dict__[method](zbx_class_inst, params)
+
+    def gather(self, calls, timeout=None):
+        '''
+        Run a list of (zbx_class_name, method, params) calls concurrently and
+        return their contents, in the same order.
+        '''
+        futures = [self.get_content(zbx_class_name, method, params) for zbx_class_name, method, params in calls]
+        return [future.content(timeout) for future in futures]
+
+    def close(self):
+        ''' Stop the thread pool once the running calls have finished '''
+        self.pool.close()
+        self.pool.join()
+
+    def __enter__(self):
+        return self
+
+    # pylint: disable=redefined-builtin
+    def __exit__(self, type, value, traceback):
+        self.close()
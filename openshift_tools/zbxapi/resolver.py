@@ -0,0 +1,222 @@
+#!/usr/bin/env python
+'''
+  Zabbix name to id resolver
+
+if __name__ == '__main__':
+    zapi = ZabbixAPI(ZabbixConnection(server, username, password))
+    resolver = ZabbixResolver.shared(zapi)
+
+    # One template.get for all of the names
+    print resolver.get_ids('template', ['Template OpenShift Node', 'Template Docker'])
+    print resolver.get_id('hostgroup', 'Linux servers')
+
+'''
+# vim: expandtab:tabstop=4:shiftwidth=4
+
+#   Copyright 2016 Red Hat Inc.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import fcntl
+import json
+import os
+import time
+import weakref
+
+from openshift_tools.zbxapi import ZabbixAPIError
+
+class ZabbixResolver(object):
+    '''
+    Resolves the names of zabbix objects to their ids, a whole list of names per api call.
+
+    Results are kept in memory, and if $ZABBIX_RESOLVER_CACHE is set, on disk for ttl seconds
+    so that all of the modules of a playbook run share them. The lib_zabbix role sets it to a
+    new file once per run, ids cached by an earlier run (of objects that may have been deleted
+    and recreated since) are never used. Entries are keyed by server. Only names that were found
+    are cached.
+
+    Use ZabbixResolver.shared(zapi), so that all of the lookups made with one ZabbixAPI
+    (one module run) go through the same resolver.
+    '''
+    CACHE_ENV_VAR = 'ZABBIX_RESOLVER_CACHE'
+
+    # zabbix class: (name field, id field)
+    fields = {
+        'application': ('name', 'applicationid'),
+        'discoveryrule': ('key_', 'itemid'),
+        'host': ('host', 'hostid'),
+        'hostgroup': ('name', 'groupid'),
+        'item': ('key_', 'itemid'),
+        'mediatype': ('description', 'mediatypeid'),
+        'template': ('host', 'templateid'),
+        'trigger': ('description', 'triggerid'),
+        'user': ('alias', 'userid'),
+        'usergroup': ('name', 'usrgrpid'),
+    }
+
+    # Deleting an object of a class also deletes these objects that belong to it
+    cascades = {
+        'host': ['application', 'discoveryrule', 'item', 'trigger'],
+        'template': ['application', 'discoveryrule', 'item', 'trigger'],
+        'item': ['trigger'],
+    }
+
+    _shared = weakref.WeakKeyDictionary()
+
+    def __init__(self, zapi, cache_file=None, ttl=900):
+        self.zapi = zapi
+        self.cache_file = cache_file or os.environ.get(ZabbixResolver.CACHE_ENV_VAR)
+        if self.cache_file:
+            self.cache_file = os.path.expanduser(self.cache_file)
+        self.ttl = ttl
+        self.ids = {}
+
+    @staticmethod
+    def shared(zapi):
+        '''
+        The resolver of a ZabbixAPI, created on first use
+        '''
+        if zapi not in ZabbixResolver._shared:
+            ZabbixResolver._shared[zapi] = ZabbixResolver(zapi)
+
+        return ZabbixResolver._shared[zapi]
+
+    def _cache_key(self, zbx_class, field, params):
+        ''' Names only mean the same thing for the same class, field and extra get params '''
+        return "%s %s %s" % (zbx_class, field, json.dumps(params or {}, sort_keys=True))
+
+    def get_ids(self, zbx_class, names, field=None, params=None):
+        '''
+        Resolve names to ids, with at most one zbx_class.get call.
+
+        field overrides the name field (e.g. 'name' for the visible name of hosts),
+        and params are any other get params that scope the names (e.g. {'templateids': ...}).
+
+        Returns a dict of name: id. Names that don't exist are left out.
+        '''
+        name_field, id_field = ZabbixResolver.fields[zbx_class]
+        name_field = field or name_field
+
+        key = self._cache_key(zbx_class, name_field, params)
+        known = self.ids.setdefault(key, {})
+
+        missing = [name for name in set(names) if name not in known]
+        if missing and self.cache_file:
+            known.update(self._read_cache().get(key, {}))
+            missing = [name for name in missing if name not in known]
+
+        if missing:
+            query = dict(params or {})
+            query['filter'] = {name_field: missing}
+            query['output'] = [name_field, id_field]
+
+            content = self.zapi.get_content(zbx_class, 'get', query)
+            if content.has_key('error'):
+                raise ZabbixAPIError('%s.get failed: %s' % (zbx_class, content['error']))
+
+            found = {}
+            for result in content['result']:
+                # Names aren't always unique (e.g. applications of different templates), the first one wins
+                found.setdefault(result[name_field], result[id_field])
+
+            known.update(found)
+            if found and self.cache_file:
+                self._write_cache(key, found)
+
+        return dict((name, known[name]) for name in names if name in known)
+
+    def get_id(self, zbx_class, name, field=None, params=None):
+        '''
+        Resolve one name to its id, or None if it doesn't exist
+        '''
+        return self.get_ids(zbx_class, [name], field, params).get(name)
+
+    def forget(self, zbx_class, names=None):
+        '''
+        Drop names (or all names) of a class from the cache, e.g. after deleting those objects.
+        All names of the classes whose objects were deleted along with them are dropped too.
+        '''
+        forget = [(zbx_class, names)] + [(cascade, None) for cascade in ZabbixResolver.cascades.get(zbx_class, [])]
+
+        for forget_class, forget_names in forget:
+            keys = [key for key in self.ids.keys() if key.split(' ')[0] == forget_class]
+            for key in keys:
+                for name in forget_names if forget_names is not None else self.ids[key].keys():
+                    self.ids[key].pop(name, None)
+
+        if self.cache_file:
+            self._write_cache(None, {}, forget=forget)
+
+    def _read_cache(self):
+        '''
+        Returns this server's unexpired entries in the cache file as {key: {name: id}}
+        '''
+        try:
+            with open(self.cache_file) as cache_file:
+                server_cache = json.load(cache_file).get(self.zapi.server, {})
+        except (IOError, ValueError):
+            return {}
+
+        now = time.time()
+        return dict((key, dict((name, entry[0]) for name, entry in names.items() if now - entry[1] < self.ttl))
+                    for key, names in server_cache.items())
+
+    def _write_cache(self, key, found, forget=None):
+        '''
+        Add found ({name: id}) under key to the cache file, and drop the names in forget
+        ([(zbx_class, names or None for all)]). The modules of parallel hosts update the
+        file at the same time, so this holds a lock (on a file next to it) while doing so.
+        The file is only readable by its owner, and is replaced atomically.
+        The disk cache only saves calls, so failing to update it isn't an error.
+        '''
+        try:
+            lock_fd = os.open(self.cache_file + '.lock', os.O_WRONLY | os.O_CREAT, 0600)
+        except OSError:
+            return
+
+        try:
+            fcntl.flock(lock_fd, fcntl.LOCK_EX)
+
+            try:
+                with open(self.cache_file) as cache_file:
+                    cache = json.load(cache_file)
+            except (IOError, ValueError):
+                cache = {}
+
+            server_cache = cache.setdefault(self.zapi.server, {})
+            now = time.time()
+
+            if key is not None:
+                names = server_cache.setdefault(key, {})
+                for name, zbx_id in found.items():
+                    names[name] = [zbx_id, now]
+
+            for zbx_class, forget_names in forget or []:
+                for cache_key, names in server_cache.items():
+                    if cache_key.split(' ')[0] != zbx_class:
+                        continue
+                    for name in forget_names if forget_names is not None else names.keys():
+                        names.pop(name, None)
+
+            tmp_path = "%s.%s.tmp" % (self.cache_file, os.getpid())
+            cache_fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0600)
+            with os.fdopen(cache_fd, 'w') as cache_file:
+                json.dump(cache, cache_file)
+            os.rename(tmp_path, self.cache_file)
+
+        except (IOError, OSError):
+            pass
+
+        finally:
+            os.close(lock_fd)
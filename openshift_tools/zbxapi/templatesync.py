@@ -0,0 +1,610 @@
+#!/usr/bin/env python
+'''
+  Zabbix template reconciliation
+
+if __name__ == '__main__':
+    zapi = ZabbixAPI(ZabbixConnection(server, username, password))
+
+    # template is a definition like the ones in the os_zabbix role's vars
+    sync = ZabbixTemplateSync(zapi, template, check_mode=True)
+    print sync.sync(), sync.changes
+
+    # Skip everything that hasn't changed since the last fingerprinted sync
+    sync = ZabbixTemplateSync(zapi, template, fingerprint=True, index_file='/var/tmp/zbx_sync_index.json')
+    print sync.sync(), sync.changes
+
+'''
+# vim: expandtab:tabstop=4:shiftwidth=4
+
+#   Copyright 2016 Red Hat Inc.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+# These mirror the conversions of the lib_zabbix modules on purpose,
+# so that a synced template looks exactly like one built object by object.
+# pylint: disable=duplicate-code
+
+import hashlib
+import json
+import os
+
+from openshift_tools.zbxapi import ZabbixAPIError
+
+def get_data_type(data_type):
+    '''
+    Possible values:
+    0 - decimal;
+    1 - octal;
+    2 - hexadecimal;
+    3 - bool;
+    '''
+    vtype = 0
+    if 'octal' in data_type:
+        vtype = 1
+    elif 'hexadecimal' in data_type:
+        vtype = 2
+    elif 'bool' in data_type:
+        vtype = 3
+
+    return vtype
+
+def get_value_type(value_type):
+    '''
+    Possible values:
+    0 - numeric float;
+    1 - character;
+    2 - log;
+    3 - numeric unsigned;
+    4 - text
+    '''
+    vtype = 0
+    if 'int' in value_type:
+        vtype = 3
+    elif 'log' in value_type:
+        vtype = 2
+    elif 'char' in value_type:
+        vtype = 1
+    elif 'str' in value_type:
+        vtype = 4
+
+    return vtype
+
+def get_multiplier(inval):
+    ''' Determine the multiplier
+    '''
+    if inval == None or inval == '':
+        return None, 0
+
+    rval = None
+    try:
+        rval = int(inval)
+    except ValueError:
+        pass
+
+    if rval:
+        return rval, 1
+
+    return rval, 0
+
+def get_zabbix_type(ztype):
+    '''
+    Determine the type of an item or discovery rule
+    '''
+    _types = {'agent': 0,
+              'SNMPv1': 1,
+              'trapper': 2,
+              'simple': 3,
+              'SNMPv2': 4,
+              'internal': 5,
+              'SNMPv3': 6,
+              'active': 7,
+              'aggregate': 8,
+              'web': 9,
+              'external': 10,
+              'database monitor': 11,
+              'ipmi': 12,
+              'ssh': 13,
+              'telnet': 14,
+              'calculated': 15,
+              'JMX': 16,
+              'SNMP trap': 17,
+             }
+
+    for typ in _types.keys():
+        if ztype in typ or ztype == typ:
+            _vtype = _types[typ]
+            break
+    else:
+        _vtype = 2
+
+    return _vtype
+
+def get_priority(priority):
+    ''' determine priority
+    '''
+    prior = 0
+    if 'info' in priority:
+        prior = 1
+    elif 'warn' in priority:
+        prior = 2
+    elif 'avg' == priority or 'ave' in priority:
+        prior = 3
+    elif 'high' in priority:
+        prior = 4
+    elif 'dis' in priority:
+        prior = 5
+
+    return prior
+
+def get_trigger_status(inc_status):
+    ''' Determine the trigger's status
+        0 is enabled
+        1 is disabled
+    '''
+    r_status = 0
+    if inc_status == 'disabled':
+        r_status = 1
+
+    return r_status
+
+def remove_none(params):
+    ''' Remove any None valued params '''
+    return dict((key, value) for key, value in params.items() if value is not None)
+
+class ZabbixTemplateSync(object):
+    '''
+    Makes a zabbix template match a complete definition, e.g.
+
+        {'name': 'Template Heartbeat',
+         'zitems': [{'key': 'heartbeat.ping', 'applications': ['Heartbeat']}],
+         'ztriggers': [{'name': 'Heartbeat.ping has failed on {HOST.NAME}',
+                        'expression': '{Template Heartbeat:heartbeat.ping.nodata(20m)}=1',
+                        'priority': 'avg'}]}
+
+    Applications, items, triggers, discovery rules, item prototypes and trigger
+    prototypes are supported. Everything that exists is fetched in one batch,
+    diffed in memory, and only the differences are sent: one batch of
+    create/update/delete calls per zabbix class.
+
+    With check_mode, nothing is changed, only the changes are worked out.
+    With prune, objects of the template that aren't in the definition are deleted.
+
+    With fingerprint, a hash of the definition is stored on the template as the
+    {$SYNC_FINGERPRINT} user macro, and a sync whose hash matches it stops after
+    the first template.get. If an index file is given as well (default:
+    $ZABBIX_SYNC_INDEX, if set), the hash and id of every object are kept there,
+    and as long as the template still carries the fingerprint of the index,
+    only the objects whose definition changed are fetched and compared.
+    Changes made to the template by other means aren't noticed while its
+    fingerprint matches; sync once without fingerprint to catch up on them.
+    '''
+    FINGERPRINT_MACRO = '{$SYNC_FINGERPRINT}'
+    INDEX_ENV_VAR = 'ZABBIX_SYNC_INDEX'
+
+    # zabbix class: (definition list, name field, id field)
+    classes = [
+        ('discoveryrule', 'zdiscoveryrules', 'key_', 'itemid'),
+        ('item', 'zitems', 'key_', 'itemid'),
+        ('itemprototype', 'zitemprototypes', 'key_', 'itemid'),
+        ('trigger', 'ztriggers', 'description', 'triggerid'),
+        ('triggerprototype', 'ztriggerprototypes', 'description', 'triggerid'),
+    ]
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, zapi, template, check_mode=False, prune=False, fingerprint=False, index_file=None):
+        self.zapi = zapi
+        self.template = template
+        self.check_mode = check_mode
+        self.prune = prune
+        self.fingerprint = fingerprint
+        self.index_file = index_file or os.environ.get(ZabbixTemplateSync.INDEX_ENV_VAR, None)
+
+        # zabbix class: {'create': [names], 'update': [names], 'delete': [names]}
+        self.changes = {}
+
+    @property
+    def changed(self):
+        ''' Whether the template needed (or, in check mode, would need) any change '''
+        return any([names for verbs in self.changes.values() for names in verbs.values()])
+
+    def _record(self, zbx_class, verb, names):
+        ''' Remember what we changed '''
+        if names:
+            self.changes.setdefault(zbx_class, {}).setdefault(verb, []).extend(names)
+
+    def _call(self, zbx_class, method, params):
+        ''' Make a call, and raise ZabbixAPIError if it failed '''
+        content = self.zapi.get_content(zbx_class, method, params)
+        if content.has_key('error'):
+            raise ZabbixAPIError('%s.%s failed: %s' % (zbx_class, method, content['error']))
+
+        return content['result']
+
+    def sync(self):
+        '''
+        Reconcile the template. Returns whether anything changed.
+        '''
+        templates = self._call('template', 'get', {'filter': {'host': self.template['name']},
+                                                   'selectApplications': ['applicationid', 'name'],
+                                                   'selectMacros': 'extend'})
+        hashes = self.hashes()
+        fingerprint = self.hash_of(hashes)
+
+        if templates:
+            template = templates[0]
+            macro = self.fingerprint_macro(template)
+            if self.fingerprint and macro and macro['value'] == fingerprint:
+                return False
+        else:
+            self._record('template', 'create', [self.template['name']])
+            if self.check_mode:
+                # Everything in the definition would be created
+                self._record('application', 'create', sorted(self.application_names()))
+                for zbx_class, definitions, _, _ in ZabbixTemplateSync.classes:
+                    self._record(zbx_class, 'create', [self.definition_name(zbx_class, definition)
+                                                       for definition in self.template.get(definitions) or []])
+                return self.changed
+
+            result = self._call('template', 'create', {'host': self.template['name'],
+                                                       'groups': [{'groupid': '1'}]})
+            template = {'templateid': result['templateids'][0], 'applications': [], 'macros': []}
+
+        templateid = template['templateid']
+
+        # With an index that matches the template, only the objects whose definition changed need looking at
+        indexed = None
+        if self.fingerprint and self.index_file:
+            entry = self.read_index().get(self.template['name'])
+            macro = self.fingerprint_macro(template)
+            if entry and macro and entry['fingerprint'] == macro['value'] and entry['templateid'] == templateid:
+                indexed = entry['objects']
+
+        if indexed is None:
+            existing = self.fetch(templateid)
+            changed = dict((zbx_class, set(names.keys())) for zbx_class, names in hashes.items())
+            ids = dict((zbx_class, {}) for zbx_class in hashes.keys())
+        else:
+            changed = {}
+            for zbx_class, names in hashes.items():
+                known = indexed.get(zbx_class, {})
+                changed[zbx_class] = set([name for name, obj_hash in names.items()
+                                          if known.get(name, [None])[0] != obj_hash])
+                if self.prune:
+                    changed[zbx_class].update([name for name in known.keys() if name not in names])
+
+            existing = self.fetch(templateid, changed)
+            ids = dict((zbx_class, dict((name, known[1]) for name, known in indexed.get(zbx_class, {}).items()
+                                        if name in hashes[zbx_class] and name not in changed[zbx_class]))
+                       for zbx_class in hashes.keys())
+
+        app_ids = self.sync_applications(templateid, template['applications'])
+
+        for zbx_class, definitions, name_field, id_field in ZabbixTemplateSync.classes:
+            desired = [self.params(zbx_class, definition, templateid, app_ids, ids)
+                       for definition in self.template.get(definitions) or []
+                       if self.definition_name(zbx_class, definition) in changed[zbx_class]]
+            ids[zbx_class].update(self.sync_objects(zbx_class, desired, existing[zbx_class], name_field, id_field))
+
+        self.sync_trigger_dependencies(existing['trigger'], ids['trigger'], changed['trigger'])
+
+        if self.fingerprint and not self.check_mode:
+            self.store_fingerprint(template, fingerprint, hashes, ids)
+
+        return self.changed
+
+    def hashes(self):
+        '''
+        The hash of the definition of every object of the template.
+        Returns {zbx_class: {name: hash}}
+        '''
+        hashes = {}
+        for zbx_class, definitions, _, _ in ZabbixTemplateSync.classes:
+            hashes[zbx_class] = dict((self.definition_name(zbx_class, definition), self.hash_of(definition))
+                                     for definition in self.template.get(definitions) or [])
+
+        return hashes
+
+    @staticmethod
+    def hash_of(definition):
+        ''' A stable hash of (part of) a definition '''
+        return hashlib.sha1(json.dumps(definition, sort_keys=True)).hexdigest()
+
+    @staticmethod
+    def fingerprint_macro(template):
+        ''' The fingerprint user macro of the template, or None '''
+        for macro in template.get('macros') or []:
+            if macro['macro'] == ZabbixTemplateSync.FINGERPRINT_MACRO:
+                return macro
+
+        return None
+
+    def store_fingerprint(self, template, fingerprint, hashes, ids):
+        '''
+        Store the fingerprint on the template, and the hash and id of every object in the index
+        '''
+        macro = self.fingerprint_macro(template)
+        if macro is None:
+            self._call('usermacro', 'create', {'hostid': template['templateid'],
+                                               'macro': ZabbixTemplateSync.FINGERPRINT_MACRO,
+                                               'value': fingerprint})
+        elif macro['value'] != fingerprint:
+            self._call('usermacro', 'update', {'hostmacroid': macro['hostmacroid'], 'value': fingerprint})
+
+        if not self.index_file:
+            return
+
+        # Deleting items also deletes their triggers, which the index wouldn't know about
+        if any([verbs.get('delete') for verbs in self.changes.values()]):
+            self.write_index(None)
+            return
+
+        objects = dict((zbx_class, dict((name, [obj_hash, ids[zbx_class].get(name)])
+                                        for name, obj_hash in names.items()))
+                       for zbx_class, names in hashes.items())
+        self.write_index({'fingerprint': fingerprint, 'templateid': template['templateid'], 'objects': objects})
+
+    def read_index(self):
+        '''
+        Returns this server's entries in the index file as {template name: entry}
+        '''
+        try:
+            with open(self.index_file) as index_file:
+                return json.load(index_file).get(self.zapi.server, {})
+        except (IOError, ValueError):
+            return {}
+
+    def write_index(self, entry):
+        '''
+        Replace (or with None, drop) the template's entry in the index file.
+        The file is only readable by its owner, and is replaced atomically.
+        '''
+        try:
+            with open(self.index_file) as index_file:
+                index = json.load(index_file)
+        except (IOError, ValueError):
+            index = {}
+
+        server_index = index.setdefault(self.zapi.server, {})
+        if entry is None:
+            server_index.pop(self.template['name'], None)
+        else:
+            server_index[self.template['name']] = entry
+
+        tmp_path = "%s.%s.tmp" % (self.index_file, os.getpid())
+        index_fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0600)
+        with os.fdopen(index_fd, 'w') as index_file:
+            json.dump(index, index_file)
+        os.rename(tmp_path, self.index_file)
+
+    def fetch(self, templateid, names=None):
+        '''
+        Fetch all of the objects of the template, in a single batch request.
+        names ({zbx_class: [names]}) limits the fetch to just those objects.
+        Returns {zbx_class: [objects]}
+        '''
+        queries = {
+            'discoveryrule': {'output': 'extend'},
+            'item': {'output': 'extend', 'selectApplications': 'applicationid'},
+            'itemprototype': {'output': 'extend', 'selectApplications': 'applicationid',
+                              'selectDiscoveryRule': 'itemid'},
+            'trigger': {'output': 'extend', 'expandExpression': True, 'selectDependencies': 'triggerid'},
+            'triggerprototype': {'output': 'extend', 'expandExpression': True},
+        }
+
+        name_fields = dict((zbx_class, name_field) for zbx_class, _, name_field, _ in ZabbixTemplateSync.classes)
+
+        calls = {}
+        with self.zapi.batch():
+            for zbx_class, query in queries.items():
+                if names is not None:
+                    if not names[zbx_class]:
+                        continue
+                    query['filter'] = {name_fields[zbx_class]: sorted(names[zbx_class])}
+
+                query.update({'templateids': templateid, 'inherited': False})
+                calls[zbx_class] = self.zapi.perform(zbx_class + '.get', {'params': query})
+
+        existing = dict((zbx_class, []) for zbx_class in queries.keys())
+        if calls:
+            existing.update((zbx_class, call.result()) for zbx_class, call in calls.items())
+
+        return existing
+
+    def application_names(self):
+        ''' All of the applications used by the items and item prototypes of the definition '''
+        names = set()
+        for definitions in ['zitems', 'zitemprototypes']:
+            for definition in self.template.get(definitions) or []:
+                names.update(definition.get('applications') or [])
+
+        return names
+
+    def sync_applications(self, templateid, applications):
+        '''
+        Create the applications that are missing, with a single call.
+        Returns {application name: applicationid}
+        '''
+        app_ids = dict((app['name'], app['applicationid']) for app in applications)
+        missing = sorted(self.application_names() - set(app_ids.keys()))
+
+        self._record('application', 'create', missing)
+        if missing and not self.check_mode:
+            result = self._call('application', 'create', [{'name': name, 'hostid': templateid} for name in missing])
+            app_ids.update(zip(missing, result['applicationids']))
+
+        return app_ids
+
+    @staticmethod
+    def definition_name(zbx_class, definition):
+        ''' The name an object of the definition is known by in zabbix '''
+        if zbx_class in ['trigger', 'triggerprototype']:
+            return definition['name']
+
+        return definition['key']
+
+    # One branch per zabbix class
+    # pylint: disable=too-many-arguments
+    @staticmethod
+    def params(zbx_class, definition, templateid, app_ids, ids):
+        '''
+        The zabbix api params for an object of the definition, with the same
+        defaults as lib_zabbix's create_template.yml.
+        '''
+        if zbx_class == 'discoveryrule':
+            return remove_none({'name': definition.get('name') or definition['key'],
+                                'key_': definition['key'],
+                                'hostid': templateid,
+                                'lifetime': definition.get('lifetime', 30),
+                                'type': get_zabbix_type(definition.get('ztype') or 'trapper'),
+                                'description': definition.get('description') or '',
+                               })
+
+        if zbx_class in ['item', 'itemprototype']:
+            formula, use_multiplier = get_multiplier(definition.get('multiplier'))
+            params = {'name': definition.get('name') or definition['key'],
+                      'key_': definition['key'],
+                      'hostid': templateid,
+                      'type': get_zabbix_type(definition.get('zabbix_type') or 'trapper'),
+                      'value_type': get_value_type(definition.get('value_type') or 'int'),
+                      'data_type': get_data_type(definition.get('data_type') or 'decimal'),
+                      'applications': [app_ids.get(app) for app in definition.get('applications') or []],
+                      'formula': formula,
+                      'multiplier': use_multiplier,
+                      'description': definition.get('description') or '',
+                      'units': definition.get('units') or '',
+                      'delay': definition.get('interval') or 60,
+                      'delta': definition.get('delta') or 0,
+                     }
+
+            if zbx_class == 'itemprototype':
+                params['ruleid'] = ids['discoveryrule'].get(definition['discoveryrule_key'])
+
+            return remove_none(params)
+
+        params = {'description': definition['name'],
+                  'comments': definition.get('description') or '',
+                  'expression': definition['expression'],
+                  'priority': get_priority(definition.get('priority') or 'avg'),
+                  'url': definition.get('url') or '',
+                  'status': get_trigger_status(definition.get('status')),
+                 }
+
+        return remove_none(params)
+
+    @staticmethod
+    def differences(params, current):
+        ''' The params whose value in zabbix (current) differs '''
+        differences = {}
+        for key, value in params.items():
+            if key == 'hostid':
+                continue
+
+            elif key == 'applications':
+                if set([app['applicationid'] for app in current[key]]) != set(value):
+                    differences[key] = value
+
+            elif key == 'ruleid':
+                if current['discoveryRule']['itemid'] != value:
+                    differences[key] = value
+
+            elif current[key] != value and current[key] != str(value):
+                differences[key] = value
+
+        return differences
+
+    # pylint: disable=too-many-arguments
+    def sync_objects(self, zbx_class, desired, existing, name_field, id_field):
+        '''
+        Create, update (and with prune, delete) the objects of one zabbix class,
+        with one batch request. Returns {name: id} of the desired objects.
+        '''
+        by_name = dict((obj[name_field], obj) for obj in existing)
+        ids = dict((name, obj[id_field]) for name, obj in by_name.items())
+
+        creates = [params for params in desired if not by_name.has_key(params[name_field])]
+
+        updates = []
+        for params in desired:
+            if by_name.has_key(params[name_field]):
+                differences = ZabbixTemplateSync.differences(params, by_name[params[name_field]])
+                if differences:
+                    differences[id_field] = by_name[params[name_field]][id_field]
+                    updates.append((params[name_field], differences))
+
+        deletes = []
+        if self.prune:
+            desired_names = set([params[name_field] for params in desired])
+            deletes = [name for name in by_name.keys() if name not in desired_names]
+
+        self._record(zbx_class, 'create', [params[name_field] for params in creates])
+        self._record(zbx_class, 'update', [name for name, _ in updates])
+        self._record(zbx_class, 'delete', deletes)
+
+        if self.check_mode or not (creates or updates or deletes):
+            return ids
+
+        create_call = None
+        with self.zapi.batch() as batch:
+            if creates:
+                create_call = self.zapi.perform(zbx_class + '.create', {'params': creates})
+            if updates:
+                self.zapi.perform(zbx_class + '.update', {'params': [differences for _, differences in updates]})
+            if deletes:
+                self.zapi.perform(zbx_class + '.delete', {'params': [ids[name] for name in deletes]})
+
+        # Raise if any of them failed
+        for call in batch.calls:
+            call.result()
+
+        if create_call:
+            ids.update(zip([params[name_field] for params in creates], create_call.result()[id_field + 's']))
+        for name in deletes:
+            ids.pop(name)
+
+        return ids
+
+    def sync_trigger_dependencies(self, existing, trigger_ids, names):
+        '''
+        Set the dependencies of the triggers (of those in names), once they all exist.
+        Dependencies on triggers outside of the template are looked up with a single call.
+        '''
+        definitions = [definition for definition in self.template.get('ztriggers') or []
+                       if definition['name'] in names]
+        dep_names = set([dep for definition in definitions for dep in definition.get('dependencies') or []])
+
+        dep_ids = dict((name, trigger_ids[name]) for name in dep_names if trigger_ids.get(name))
+        outside = sorted(dep_names - set(dep_ids.keys()))
+        if outside:
+            for trigger in self._call('trigger', 'get', {'filter': {'description': outside},
+                                                         'output': ['triggerid', 'description']}):
+                dep_ids.setdefault(trigger['description'], trigger['triggerid'])
+
+        current = dict((trigger['description'], set([dep['triggerid'] for dep in trigger['dependencies']]))
+                       for trigger in existing)
+
+        updates = []
+        for definition in definitions:
+            name = definition['name']
+            wanted = set([dep_ids[dep] for dep in definition.get('dependencies') or [] if dep_ids.get(dep)])
+            if wanted != current.get(name, set()) and trigger_ids.get(name):
+                updates.append((name, {'triggerid': trigger_ids[name],
+                                       'dependencies': [{'triggerid': dep_id} for dep_id in sorted(wanted)]}))
+
+        # Triggers that were just created or updated are already accounted for
+        accounted = set(self.changes.get('trigger', {}).get('create', []) +
+                        self.changes.get('trigger', {}).get('update', []))
+        self._record('trigger', 'update', [name for name, _ in updates if name not in accounted])
+
+        if updates and not self.check_mode:
+            self._call('trigger', 'update', [update for _, update in updates])
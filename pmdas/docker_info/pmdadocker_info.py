@@ -0,0 +1,168 @@
+#!/usr/bin/env python2
+'''
+Performance Metrics Domain Agent exporting the docker storage stats and
+the latency of 'docker info', from the cache of ops-docker-info-collector
+'''
+#
+# Copyright (c) 2016 Red Hat.
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the
+# Free Software Foundation; either version 2 of the License, or (at your
+# option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License
+# for more details.
+#
+
+# Pylint has libraries that are not installed on the build bot.
+# pylint: disable=import-error
+import cpmapi as c_api
+from pcp.pmapi import pmUnits
+from pcp.pmda import PMDA, pmdaMetric
+import json
+import os
+import time
+
+# Where ops-docker-info-collector keeps its cache (see openshift_tools.monitoring.dockerutil).
+# This runs under pmcd's python3, so it reads it itself instead of importing dockerutil.
+DOCKER_INFO_CACHE = os.environ.get('DOCKER_INFO_CACHE', '/var/tmp/openshift_tools_docker_info.json')
+
+# (item, metric, DockerDiskStats attribute)
+STORAGE_METRICS = [
+    (5, 'storage.data.space.used', 'data_space_used'),
+    (6, 'storage.data.space.available', 'data_space_available'),
+    (7, 'storage.data.space.total', 'data_space_total'),
+    (8, 'storage.data.space.percent_available', 'data_space_percent_available'),
+    (9, 'storage.metadata.space.used', 'metadata_space_used'),
+    (10, 'storage.metadata.space.available', 'metadata_space_available'),
+    (11, 'storage.metadata.space.total', 'metadata_space_total'),
+    (12, 'storage.metadata.space.percent_available', 'metadata_space_percent_available'),
+]
+
+class DockerInfo(PMDA):
+    '''
+    Performance Metrics Domain Agent exporting what ops-docker-info-collector
+    found out on its last 'docker info' call. Fetches only read its cache file
+    (when it changed), so they never wait on the docker daemon:
+
+    # $PCP_PMDAS_DIR/docker_info/Install
+    $ pminfo -fmdtT docker_info
+    '''
+
+    def docker_info_fetch(self):
+        '''
+        Called once per PCP "fetch" PDU from pmcd(1)
+        Read the cache again if it changed
+        '''
+        try:
+            stat = os.stat(DOCKER_INFO_CACHE)
+            stamp = (stat.st_mtime, stat.st_size, stat.st_ino)
+            if stamp == self.stamp:
+                return
+
+            with open(DOCKER_INFO_CACHE) as cache_file:
+                self.cache = json.load(cache_file)
+            self.stamp = stamp
+
+        # The collector replaces the file atomically, so this is a missing cache
+        except (IOError, OSError, ValueError):
+            pass
+
+    def docker_info_fetch_callback(self, cluster, item, inst):
+        '''
+        Main fetch callback - looks up value associated with requested PMID
+        '''
+        if inst != c_api.PM_IN_NULL:
+            return [c_api.PM_ERR_INST, 0]
+        elif cluster != 0:
+            return [c_api.PM_ERR_PMID, 0]
+
+        if not self.cache.get('time'):
+            return [c_api.PM_ERR_AGAIN, 0]
+
+        if item == 0:
+            return [0 if self.cache.get('error') else 1, 1]
+        elif item == 1:
+            return [self.cache['latency'], 1]
+        elif item == 2:
+            if not self.cache.get('last_success'):
+                return [c_api.PM_ERR_AGAIN, 0]
+            return [max(time.time() - self.cache['last_success'], 0.0), 1]
+        elif item == 3:
+            # A call that is taking a while shows up before it finishes, or times out
+            if not self.cache.get('started'):
+                return [0.0, 1]
+            return [max(time.time() - self.cache['started'], 0.0), 1]
+
+        disk_usage = self.cache.get('disk_usage') or {}
+        if item == 4:
+            if disk_usage.get('is_loopback') is None:
+                return [c_api.PM_ERR_AGAIN, 0]
+            return [int(disk_usage['is_loopback']), 1]
+
+        for storage_item, _, attr in STORAGE_METRICS:
+            if item == storage_item:
+                if disk_usage.get(attr) is None:
+                    return [c_api.PM_ERR_AGAIN, 0]
+                return [disk_usage[attr], 1]
+
+        return [c_api.PM_ERR_PMID, 0]
+
+    def setup_docker_info_metrics(self, name):
+        '''
+        Setup the metric table
+        '''
+        # This class inherits from PDMA which includes these methods
+        # pylint: disable=no-member
+        seconds = pmUnits(0, 1, 0, 0, c_api.PM_TIME_SEC, 0)
+        gbytes = pmUnits(1, 0, 0, c_api.PM_SPACE_GBYTE, 0, 0)
+        none = pmUnits(0, 0, 0, 0, 0, 0)
+
+        self.add_metric(name + '.ping',
+                        pmdaMetric(self.pmid(0, 0), c_api.PM_TYPE_U32, c_api.PM_INDOM_NULL,
+                                   c_api.PM_SEM_INSTANT, none),
+                        'Whether the last docker info call succeeded')
+        self.add_metric(name + '.latency',
+                        pmdaMetric(self.pmid(0, 1), c_api.PM_TYPE_DOUBLE, c_api.PM_INDOM_NULL,
+                                   c_api.PM_SEM_INSTANT, seconds),
+                        'Time the last docker info call took')
+        self.add_metric(name + '.last_success_age',
+                        pmdaMetric(self.pmid(0, 2), c_api.PM_TYPE_DOUBLE, c_api.PM_INDOM_NULL,
+                                   c_api.PM_SEM_INSTANT, seconds),
+                        'Time since the last successful docker info call')
+        self.add_metric(name + '.in_progress',
+                        pmdaMetric(self.pmid(0, 3), c_api.PM_TYPE_DOUBLE, c_api.PM_INDOM_NULL,
+                                   c_api.PM_SEM_INSTANT, seconds),
+                        'Time the docker info call in progress has taken so far, 0 if none is')
+        self.add_metric(name + '.storage.is_loopback',
+                        pmdaMetric(self.pmid(0, 4), c_api.PM_TYPE_U32, c_api.PM_INDOM_NULL,
+                                   c_api.PM_SEM_DISCRETE, none),
+                        'Whether docker storage is on a loopback device')
+
+        for item, metric, attr in STORAGE_METRICS:
+            self.add_metric(name + '.' + metric,
+                            pmdaMetric(self.pmid(0, item), c_api.PM_TYPE_DOUBLE, c_api.PM_INDOM_NULL,
+                                       c_api.PM_SEM_INSTANT, none if 'percent' in attr else gbytes),
+                            'Docker storage %s, as of the last successful docker info call' % \
+                            attr.replace('_', ' '))
+
+    def __init__(self, name, domain):
+        PMDA.__init__(self, name, domain)
+
+        self.cache = {}
+        self.stamp = None
+        self.setup_docker_info_metrics(name)
+
+        # This class inherits from PDMA which includes these methods
+        # pylint: disable=no-member
+        self.set_fetch(self.docker_info_fetch)
+        self.set_fetch_callback(self.docker_info_fetch_callback)
+
+
+if __name__ == '__main__':
+    # This class inherits from PDMA which includes the run method
+    # pylint: disable=no-member
+    DockerInfo('docker_info', 509).run()
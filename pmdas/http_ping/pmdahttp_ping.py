@@ -1,6 +1,7 @@
 #!/usr/bin/env python2
 '''
-Performance Metrics Domain Agent exporting an http status code
+Performance Metrics Domain Agent exporting the http status code, latency
+and latency histogram of a list of urls
 '''
 #
 # Copyright (c) 2014-2015 Red Hat.
@@ -20,110 +21,275 @@ Performance Metrics Domain Agent exporting an http status code
 # pylint: disable=import-error
 import cpmapi as c_api
 from pcp.pmapi import pmUnits
-from pcp.pmda import PMDA, pmdaMetric
+from pcp.pmda import PMDA, pmdaMetric, pmdaIndom, pmdaInstid
+import os
 import threading
+import time
 
 # PCP is built for python3.  This fails under the bot in python2.7
 # pylint: disable=no-name-in-module
 import urllib.request as urllib
+import urllib.error as urllib_error
+from configparser import ConfigParser
+from concurrent.futures import ThreadPoolExecutor
+
+CONFIG_FILE = os.environ.get('HTTP_PING_CONF',
+                             os.path.join(os.path.dirname(os.path.abspath(__file__)), 'http_ping.conf'))
+
+# Used when there is no config file, or it has no urls
+DEFAULT_URLS = [('google', 'http://www.google.com')]
 
 TIMEOUT = 10
+INTERVAL = 30
+WORKERS = 4
+
+# Upper bounds (in milliseconds) of the buckets of the latency histograms.
+# Responses slower than the last one only count in le_inf.
+LATENCY_BUCKETS = [50, 100, 250, 500, 1000, 2500, 5000, 10000]
 
-# This class only needs run but could expand in the future
-# pylint: disable=too-few-public-methods
-class FetchURL(object):
-    ''' External threaded class to fetch a url '''
-    def __init__(self, url, pmdaObject=None, timeout=TIMEOUT):
+class URLState(object):
+    ''' The results of pinging one url, as of the last check '''
+
+    # This class only holds values
+    # pylint: disable=too-few-public-methods
+    def __init__(self, name, url):
+        self.name = name
         self.url = url
-        self.pmda = pmdaObject
+        self.code = 0
+        self.latency = None
+        self.last_success = None
+        self.running = False
+
+        # Cumulative counts of the answered checks that took at most each of LATENCY_BUCKETS ms
+        # (plus one for all of them), the total ms they took, and the count of the checks
+        # that failed without an answer (whose latency is only how long it took to give up)
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.failures = 0
+
+    def record(self, code, latency, success):
+        ''' Record the result of a check that took latency ms, code 0 if there was no answer '''
+        self.code = code
+        self.latency = latency
+        if success:
+            self.last_success = time.time()
+
+        if code == 0:
+            self.failures += 1
+            return
+
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if latency <= bound:
+                self.buckets[i] += 1
+        self.buckets[-1] += 1
+        self.count += 1
+        self.total += latency
+
+class URLPoller(object):
+    ''' Pings every url every interval seconds, from a pool of worker threads.
+
+        A url whose previous check hasn't finished yet (e.g. a hung endpoint)
+        is skipped, so it only ever ties up one worker.
+    '''
+
+    def __init__(self, states, interval=INTERVAL, timeout=TIMEOUT, workers=WORKERS, pmdaObject=None):
+        self.states = states
+        self.interval = interval
         self.timeout = timeout
-        self.code = None
-        self.resp = None
+        self.pmda = pmdaObject
+        self.lock = threading.Lock()
+        self.pool = ThreadPoolExecutor(max_workers=workers)
 
-    def run(self):
-        ''' Run method that fetches URL in separate thread
-        '''
-        def fetch_url_thread():
-            ''' Fetch the url in a separate thread
-            '''
-            self.resp = urllib.urlopen(self.url)
-        thread = threading.Thread(target=fetch_url_thread)
+    def start(self):
+        ''' Start polling in a background thread '''
+        thread = threading.Thread(target=self.poll)
+        thread.daemon = True
         thread.start()
-        thread.join(self.timeout)
-        if thread.is_alive():
-            thread.join()
+
+    def poll(self):
+        ''' Submit a check of every url, every interval seconds '''
+        while True:
+            started = time.time()
+            for state in self.states:
+                with self.lock:
+                    if state.running:
+                        continue
+                    state.running = True
+                self.pool.submit(self.check, state)
+
+            time.sleep(max(self.interval - (time.time() - started), 0))
+
+    def check(self, state):
+        ''' Fetch the url of state and record its status code and latency '''
+        start = time.time()
+        code = 0
+        try:
+            resp = urllib.urlopen(state.url, timeout=self.timeout)
+            code = resp.getcode()
+            resp.close()
+        except urllib_error.HTTPError as error:
+            code = error.code
+        # Timeouts, refused connections, dns failures, ...
+        # pylint: disable=broad-except
+        except Exception as error:
             if self.pmda:
-                self.pmda.log('Timeout when fetching url (%s)' % self.url)
-        self.code = self.resp.getcode()
+                self.pmda.log('Failed to fetch url (%s): %s' % (state.url, error))
+
+        latency = (time.time() - start) * 1000
+        with self.lock:
+            state.record(code, latency, 0 < code < 400)
+            state.running = False
+
+    def get_state(self, inst):
+        ''' The state of instance inst, or None '''
+        if inst < 0 or inst >= len(self.states):
+            return None
+        return self.states[inst]
+
+def read_config(path):
+    ''' Read the config file. Returns (urls as [(name, url)], interval, timeout, workers) '''
+    # urls can have %-escapes, which aren't interpolations
+    config = ConfigParser(interpolation=None)
+    config.read(path)
+
+    urls = DEFAULT_URLS
+    if config.has_section('urls') and config.items('urls'):
+        urls = config.items('urls')
+
+    def option(name, default):
+        ''' A number from the [http_ping] section '''
+        if config.has_option('http_ping', name):
+            return config.getfloat('http_ping', name)
+        return default
+
+    return urls, option('interval', INTERVAL), option('timeout', TIMEOUT), int(option('workers', WORKERS))
 
 class HttpPing(PMDA):
     '''
-    Performance Metrics Domain Agent exporting for services.
-    Install it and make basic use of it if you use os_services, as follows:
+    Performance Metrics Domain Agent exporting the http status codes and latencies
+    of the urls in http_ping.conf ($HTTP_PING_CONF), one instance per url.
 
-    # $PCP_PMDAS_DIR/os_services/Install
-    $ pminfo -fmdtT os_services
-    '''
+    The urls are checked in the background, so fetches only ever return
+    the results of the last check. Install it and make basic use of it as follows:
 
-    def ping_fetch(self):
-        '''
-        Called once per PCP "fetch" PDU from pmcd(1)
-        Fetch a url
-        '''
-        fetch = FetchURL('http://www.google.com', self)
-        fetch.run()
-        self.values['ping'] = fetch.code
+    # $PCP_PMDAS_DIR/http_ping/Install
+    $ pminfo -fmdtT http_ping
+    '''
 
     def ping_fetch_callback(self, cluster, item, inst):
         '''
         Main fetch callback - looks up value associated with requested PMID
         '''
-        #self.log("fetch callback for %d.%d[%d]" % (cluster, item, inst))
-        #self.log("PM_IN_NULL:  %d" % (c_api.PM_IN_NULL))
-        if inst != c_api.PM_IN_NULL:
+        state = self.poller.get_state(inst)
+        if state is None:
             return [c_api.PM_ERR_INST, 0]
-        elif cluster != 0:
-            return [c_api.PM_ERR_PMID, 0]
-        #if item >= 0 and item < self.nmetrics:
-            #return [c_api.PM_ERR_AGAIN, 0]
 
-        if item == 0:
-            return [self.values.get('ping', 0), 1]
-        return [c_api.PM_ERR_PMID, 0]
+        with self.poller.lock:
+            if cluster == 0:
+                if item == 0:
+                    return [state.code, 1]
+                elif item == 1:
+                    if state.latency is None:
+                        return [c_api.PM_ERR_AGAIN, 0]
+                    return [state.latency, 1]
+                elif item == 2:
+                    if state.last_success is None:
+                        return [c_api.PM_ERR_AGAIN, 0]
+                    return [time.time() - state.last_success, 1]
+            elif cluster == 1:
+                if item < len(state.buckets):
+                    return [state.buckets[item], 1]
+                elif item == len(state.buckets):
+                    return [state.count, 1]
+                elif item == len(state.buckets) + 1:
+                    return [state.total, 1]
+                elif item == len(state.buckets) + 2:
+                    return [state.failures, 1]
 
+        return [c_api.PM_ERR_PMID, 0]
 
     def setup_ping_metrics(self, name):
         '''
-        Setup the metric table - ensure a values hash entry is setup for
-        each metric; that way we don't need to worry about KeyErrors in
-        the fetch callback routine (e.g. if the kernel interface changes).
+        Setup the metric table: cluster 0 has the results of the last check,
+        cluster 1 the latency histogram
         '''
-        self.values['ping'] = 0
         # This class inherits from PDMA which includes these methods
         # pylint: disable=no-member
         self.add_metric(name + '.ping',
                         pmdaMetric(self.pmid(0, 0),
                                    c_api.PM_TYPE_U32,
-                                   c_api.PM_INDOM_NULL,
+                                   self.url_indom,
                                    c_api.PM_SEM_INSTANT,
                                    pmUnits(0, 0, 0, 0, 0, 0)),
-                        'Http ping to google.com http status codde')
+                        'Http status code of the last check of the url, 0 if it failed')
+        self.add_metric(name + '.latency',
+                        pmdaMetric(self.pmid(0, 1),
+                                   c_api.PM_TYPE_DOUBLE,
+                                   self.url_indom,
+                                   c_api.PM_SEM_INSTANT,
+                                   pmUnits(0, 1, 0, 0, c_api.PM_TIME_MSEC, 0)),
+                        'Time the last check of the url took')
+        self.add_metric(name + '.last_success_age',
+                        pmdaMetric(self.pmid(0, 2),
+                                   c_api.PM_TYPE_DOUBLE,
+                                   self.url_indom,
+                                   c_api.PM_SEM_INSTANT,
+                                   pmUnits(0, 1, 0, 0, c_api.PM_TIME_SEC, 0)),
+                        'Time since the url last answered with a status code below 400')
+
+        bucket_names = ['le_%d' % bound for bound in LATENCY_BUCKETS] + ['le_inf']
+        for i, bucket in enumerate(bucket_names):
+            self.add_metric(name + '.latency_histogram.' + bucket,
+                            pmdaMetric(self.pmid(1, i),
+                                       c_api.PM_TYPE_U64,
+                                       self.url_indom,
+                                       c_api.PM_SEM_COUNTER,
+                                       pmUnits(0, 0, 1, 0, 0, c_api.PM_COUNT_ONE)),
+                            'Answered checks of the url that took at most %s ms' % bucket[3:])
+        self.add_metric(name + '.latency_histogram.count',
+                        pmdaMetric(self.pmid(1, len(bucket_names)),
+                                   c_api.PM_TYPE_U64,
+                                   self.url_indom,
+                                   c_api.PM_SEM_COUNTER,
+                                   pmUnits(0, 0, 1, 0, 0, c_api.PM_COUNT_ONE)),
+                        'Answered checks of the url')
+        self.add_metric(name + '.latency_histogram.sum',
+                        pmdaMetric(self.pmid(1, len(bucket_names) + 1),
+                                   c_api.PM_TYPE_DOUBLE,
+                                   self.url_indom,
+                                   c_api.PM_SEM_COUNTER,
+                                   pmUnits(0, 1, 0, 0, c_api.PM_TIME_MSEC, 0)),
+                        'Total time the answered checks of the url took')
+        self.add_metric(name + '.failures',
+                        pmdaMetric(self.pmid(1, len(bucket_names) + 2),
+                                   c_api.PM_TYPE_U64,
+                                   self.url_indom,
+                                   c_api.PM_SEM_COUNTER,
+                                   pmUnits(0, 0, 1, 0, 0, c_api.PM_COUNT_ONE)),
+                        'Checks of the url that failed without an answer (timeouts, refused connections, '
+                        'dns failures, ...), left out of the latency histogram')
 
     def __init__(self, name, domain):
         PMDA.__init__(self, name, domain)
 
-        self.values = {}
-        self.setup_ping_metrics(name)
-        self.nmetrics = len(self.values)
+        urls, interval, timeout, workers = read_config(CONFIG_FILE)
+        states = [URLState(url_name, url) for url_name, url in urls]
 
         # This class inherits from PDMA which includes these methods
         # pylint: disable=no-member
-        self.set_fetch(self.ping_fetch)
+        self.url_indom = self.indom(0)
+        self.add_indom(pmdaIndom(self.url_indom,
+                                 [pmdaInstid(i, state.name) for i, state in enumerate(states)]))
+
+        self.setup_ping_metrics(name)
         self.set_fetch_callback(self.ping_fetch_callback)
 
+        self.poller = URLPoller(states, interval, timeout, workers, self)
+        self.poller.start()
+
 
 if __name__ == '__main__':
     # This class inherits from PDMA which includes the run method
     # pylint: disable=no-member
     HttpPing('http_ping', 301).run()
-
@@ -0,0 +1,256 @@
+#!/usr/bin/env python2
+'''
+Performance Metrics Domain Agent exporting the state of the zagg spools
+and of the metric processors working through them
+'''
+#
+# Copyright (c) 2016 Red Hat.
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the
+# Free Software Foundation; either version 2 of the License, or (at your
+# option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License
+# for more details.
+#
+
+# Pylint has libraries that are not installed on the build bot.
+# pylint: disable=import-error
+import cpmapi as c_api
+from pcp.pmapi import pmUnits
+from pcp.pmda import PMDA, pmdaMetric, pmdaIndom, pmdaInstid
+import json
+import os
+import time
+
+# PCP is built for python3.  This fails under the bot in python2.7
+# pylint: disable=no-name-in-module
+from configparser import ConfigParser
+
+CONFIG_FILE = os.environ.get('ZAGG_PMDA_CONF',
+                             os.path.join(os.path.dirname(os.path.abspath(__file__)), 'zagg.conf'))
+
+# Used when there is no config file, or it has no targets
+DEFAULT_TARGETS = [('local_zaio', '/var/run/zagg/data/local_zaio')]
+
+# The files MetricManager keeps in every spool (see openshift_tools.monitoring.metricmanager).
+# This runs under pmcd's python3, so it reads them itself instead of importing it.
+STATE_DIRECTORY = 'state'
+SPOOL_STATS_FILE = 'spool-stats.json'
+PROCESS_STATS_SUFFIX = '.counters'
+PROCESSOR_STATE_FILE = 'processor-state.json'
+
+class JSONFile(object):
+    ''' A small json file that is only parsed again when it changes '''
+
+    # This class only needs refresh
+    # pylint: disable=too-few-public-methods
+    def __init__(self, path):
+        self.path = path
+        self.stamp = None
+        self.data = {}
+
+    def refresh(self):
+        ''' Parse the file again if its mtime or size changed. A file that is
+            missing or can't be parsed keeps the values it had before.
+        '''
+        try:
+            stat = os.stat(self.path)
+            stamp = (stat.st_mtime, stat.st_size, stat.st_ino)
+            if stamp == self.stamp:
+                return
+
+            # The files are replaced atomically, never rewritten in place
+            with open(self.path) as json_file:
+                self.data = json.load(json_file)
+            self.stamp = stamp
+
+        except (IOError, OSError, ValueError):
+            pass
+
+class ZaggTarget(object):
+    ''' The spool stats and processor state of one zagg target '''
+
+    def __init__(self, name, path):
+        self.name = name
+        self.state_directory = os.path.join(path, STATE_DIRECTORY)
+        self.stats = JSONFile(os.path.join(self.state_directory, SPOOL_STATS_FILE))
+        self.writer_stats = {}
+        self.state = JSONFile(os.path.join(self.state_directory, PROCESSOR_STATE_FILE))
+
+    def refresh(self):
+        ''' Pick up the files that changed. The spool stats are the counters of the
+            processes that are gone, plus a file of counters per process still writing.
+        '''
+        self.stats.refresh()
+        self.state.refresh()
+
+        try:
+            filenames = [f for f in os.listdir(self.state_directory) if f.endswith(PROCESS_STATS_SUFFIX)]
+        except OSError:
+            filenames = []
+
+        writer_stats = {}
+        for filename in filenames:
+            writer_stats[filename] = self.writer_stats.get(filename) or \
+                                     JSONFile(os.path.join(self.state_directory, filename))
+            writer_stats[filename].refresh()
+        self.writer_stats = writer_stats
+
+    def counter(self, area, counter):
+        ''' A counter ('written' or 'removed') of an area of the spool (zbx, heartbeat or dead-letter) '''
+        return sum([stats.data.get(area, {}).get(counter, 0)
+                    for stats in [self.stats] + list(self.writer_stats.values())])
+
+    def depth(self, area):
+        ''' The number of metrics in an area of the spool '''
+        return self.counter(area, 'written') - self.counter(area, 'removed')
+
+    def total(self, counter):
+        ''' A counter ('written' or 'removed') of the zbx metrics and heartbeats together '''
+        return self.counter('zbx', counter) + self.counter('heartbeat', counter)
+
+    def oldest_age(self):
+        ''' Seconds the oldest metric in the spool has been waiting (0 if there aren't any).
+
+            This is an upper bound: the metrics the last processor cycle couldn't send,
+            or else the ones that arrived after it started.
+        '''
+        oldest_clock = self.state.data.get('oldest_clock')
+        if self.depth('zbx') + self.depth('heartbeat') <= 0 or oldest_clock is None:
+            return 0.0
+        return max(time.time() - oldest_clock, 0.0)
+
+def read_config(path):
+    ''' Read the config file. Returns the targets as [(name, spool directory)] '''
+    # Spool paths can have a % in them, which isn't an interpolation
+    config = ConfigParser(interpolation=None)
+    config.read(path)
+
+    if config.has_section('targets') and config.items('targets'):
+        return config.items('targets')
+
+    return DEFAULT_TARGETS
+
+class Zagg(PMDA):
+    '''
+    Performance Metrics Domain Agent exporting the zagg spools in zagg.conf
+    ($ZAGG_PMDA_CONF), one instance per target.
+
+    Every fetch only lists and stats a few small files per target, which the zagg web
+    processes and ops-zagg-metric-processor keep up to date, so this can be logged every second:
+
+    # $PCP_PMDAS_DIR/zagg/Install
+    $ pminfo -fmdtT zagg
+    $ pmlogger -t 1sec -c <config with zagg> /tmp/zagg
+    '''
+
+    def zagg_fetch(self):
+        '''
+        Called once per PCP "fetch" PDU from pmcd(1)
+        Pick up the files that changed
+        '''
+        for target in self.targets:
+            target.refresh()
+
+    def zagg_fetch_callback(self, cluster, item, inst):
+        '''
+        Main fetch callback - looks up value associated with requested PMID
+        '''
+        if inst < 0 or inst >= len(self.targets):
+            return [c_api.PM_ERR_INST, 0]
+        target = self.targets[inst]
+        state = target.state.data
+
+        if cluster == 0:
+            if item == 0:
+                return [target.depth('zbx'), 1]
+            elif item == 1:
+                return [target.depth('heartbeat'), 1]
+            elif item == 2:
+                return [target.depth('dead-letter'), 1]
+            elif item == 3:
+                return [target.total('written'), 1]
+            elif item == 4:
+                return [target.total('removed'), 1]
+        elif cluster == 1:
+            if not state:
+                return [c_api.PM_ERR_AGAIN, 0]
+            if item == 0:
+                return [state['cycle_time'], 1]
+            elif item == 1:
+                return [max(time.time() - state['cycle_end'], 0.0), 1]
+            elif item == 2:
+                return [target.oldest_age(), 1]
+            elif item == 3:
+                return [state['errors'], 1]
+            elif item == 4:
+                return [state['errors_total'], 1]
+            elif item == 5:
+                return [state['cycles'], 1]
+
+        return [c_api.PM_ERR_PMID, 0]
+
+    # pylint: disable=too-many-arguments
+    def add_zagg_metric(self, name, pmid, typ, sem, units, text):
+        ''' Add a metric with an instance per target '''
+        # This class inherits from PDMA which includes these methods
+        # pylint: disable=no-member
+        self.add_metric(name, pmdaMetric(pmid, typ, self.target_indom, sem, units), text)
+
+    def setup_zagg_metrics(self, name):
+        '''
+        Setup the metric table: cluster 0 has the spool stats, cluster 1 the processor state
+        '''
+        # This class inherits from PDMA which includes these methods
+        # pylint: disable=no-member
+        count = pmUnits(0, 0, 1, 0, 0, c_api.PM_COUNT_ONE)
+        seconds = pmUnits(0, 1, 0, 0, c_api.PM_TIME_SEC, 0)
+
+        self.add_zagg_metric(name + '.spool.depth', self.pmid(0, 0), c_api.PM_TYPE_64,
+                             c_api.PM_SEM_INSTANT, count, 'Metrics waiting in the spool')
+        self.add_zagg_metric(name + '.spool.heartbeats', self.pmid(0, 1), c_api.PM_TYPE_64,
+                             c_api.PM_SEM_INSTANT, count, 'Heartbeats waiting in the spool')
+        self.add_zagg_metric(name + '.spool.dead_letter', self.pmid(0, 2), c_api.PM_TYPE_64,
+                             c_api.PM_SEM_INSTANT, count, 'Metrics in the dead-letter area of the spool')
+        self.add_zagg_metric(name + '.spool.written', self.pmid(0, 3), c_api.PM_TYPE_U64,
+                             c_api.PM_SEM_COUNTER, count, 'Metrics and heartbeats written to the spool')
+        self.add_zagg_metric(name + '.spool.removed', self.pmid(0, 4), c_api.PM_TYPE_U64,
+                             c_api.PM_SEM_COUNTER, count, 'Metrics and heartbeats that left the spool')
+
+        self.add_zagg_metric(name + '.processor.cycle_time', self.pmid(1, 0), c_api.PM_TYPE_DOUBLE,
+                             c_api.PM_SEM_INSTANT, seconds, 'Time the last processor cycle took')
+        self.add_zagg_metric(name + '.processor.last_cycle_age', self.pmid(1, 1), c_api.PM_TYPE_DOUBLE,
+                             c_api.PM_SEM_INSTANT, seconds, 'Time since the last processor cycle ended')
+        self.add_zagg_metric(name + '.processor.oldest_metric_age', self.pmid(1, 2), c_api.PM_TYPE_DOUBLE,
+                             c_api.PM_SEM_INSTANT, seconds, 'Time the oldest metric in the spool has waited')
+        self.add_zagg_metric(name + '.processor.errors', self.pmid(1, 3), c_api.PM_TYPE_U32,
+                             c_api.PM_SEM_INSTANT, count, 'Send errors of the last processor cycle')
+        self.add_zagg_metric(name + '.processor.errors_total', self.pmid(1, 4), c_api.PM_TYPE_U64,
+                             c_api.PM_SEM_COUNTER, count, 'Send errors of all processor cycles')
+        self.add_zagg_metric(name + '.processor.cycles', self.pmid(1, 5), c_api.PM_TYPE_U64,
+                             c_api.PM_SEM_COUNTER, count, 'Processor cycles')
+
+    def __init__(self, name, domain):
+        PMDA.__init__(self, name, domain)
+
+        self.targets = [ZaggTarget(target, path) for target, path in read_config(CONFIG_FILE)]
+
+        # This class inherits from PDMA which includes these methods
+        # pylint: disable=no-member
+        self.target_indom = self.indom(0)
+        self.add_indom(pmdaIndom(self.target_indom,
+                                 [pmdaInstid(i, target.name) for i, target in enumerate(self.targets)]))
+
+        self.setup_zagg_metrics(name)
+        self.set_fetch(self.zagg_fetch)
+        self.set_fetch_callback(self.zagg_fetch_callback)
+
+
+if __name__ == '__main__':
+    # This class inherits from PDMA which includes the run method
+    # pylint: disable=no-member
+    Zagg('zagg', 510).run()
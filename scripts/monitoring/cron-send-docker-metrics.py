@@ -3,6 +3,9 @@
 
 '''
     docker info data gatherer
+
+    The docker info comes from the cache ops-docker-info-collector keeps,
+    so this never waits on the docker daemon.
 '''
 
 # Adding the ignore because it does not like the naming of the script
@@ -10,19 +13,15 @@
 # pylint: disable=invalid-name
 
 
-from docker import AutoVersionClient
-from docker.errors import DockerException
 from openshift_tools.monitoring.zagg_sender import ZaggSender
-from openshift_tools.timeout import TimeoutException
-from openshift_tools.monitoring.dockerutil import DockerUtil
+from openshift_tools.monitoring.dockerutil import DockerUtil, DockerInfoCache, DockerInfoUnavailable, ParseError
 import json
 
 if __name__ == "__main__":
     keys = None
     zs = ZaggSender()
     try:
-        cli = AutoVersionClient(base_url='unix://var/run/docker.sock')
-        du = DockerUtil(cli)
+        du = DockerUtil(info_cache=DockerInfoCache())
         du_dds = du.get_disk_usage()
 
         keys = {
@@ -39,7 +38,7 @@ if __name__ == "__main__":
             'docker.storage.is_loopback': int(du_dds.is_loopback),
             'docker.ping': 1, # Docker is up
         }
-    except (DockerException, TimeoutException) as ex:
+    except (DockerInfoUnavailable, ParseError) as ex:
         print "\nERROR talking to docker: %s\n" % ex.message
         keys = {
             'docker.ping': 0,  # Docker is down
@@ -3,6 +3,9 @@
 
 '''
     Report time to execute 'docker info'
+
+    This is the time the last call of ops-docker-info-collector took,
+    so this never waits on the docker daemon itself.
 '''
 
 # Adding the ignore because it does not like the naming of the script
@@ -10,31 +13,23 @@
 # pylint: disable=invalid-name
 
 
-from docker import AutoVersionClient
-from docker.errors import DockerException
 from openshift_tools.monitoring.zagg_sender import ZaggSender
-from openshift_tools.timeout import TimeoutException
-from openshift_tools.monitoring.dockerutil import DockerUtil
+from openshift_tools.monitoring.dockerutil import DockerInfoCache, DockerInfoUnavailable
 import json
-import time
 
 if __name__ == "__main__":
     keys = None
     zs = ZaggSender()
     try:
-        cli = AutoVersionClient(base_url='unix://var/run/docker.sock')
-        du = DockerUtil(cli, max_wait=360)
-
-        # Wait up to 6 minutes
-        time_start = time.time()
-        du.get_disk_usage()
-        time_stop = time.time()
-        elapsed_ms = int((time_stop - time_start) * 1000)
+        # The collector gives up on docker info after 6 minutes
+        cache = DockerInfoCache().read_recent(max_age=900)
+        if cache['error']:
+            raise DockerInfoUnavailable(cache['error'])
 
         keys = {
-            'docker.info_elapsed_ms': elapsed_ms
+            'docker.info_elapsed_ms': int(cache['latency'] * 1000)
         }
-    except (DockerException, TimeoutException) as ex:
+    except DockerInfoUnavailable as ex:
         print "\nERROR talking to docker: %s\n" % ex.message
         keys = {
             'docker.info_elapsed_ms': 360000 # 360000 = 6 minutes
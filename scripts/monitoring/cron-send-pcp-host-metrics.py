@@ -0,0 +1,123 @@
+#!/usr/bin/env python2
+'''
+  Send the PCP metrics of this host (cpu, disk, network and filesystem) to zagg
+
+  Example:
+  ./cron-send-pcp-host-metrics.py -i 10 -v
+
+  # Only print what would be sent, with the metric groups of a config file
+  ./cron-send-pcp-host-metrics.py -c /etc/openshift_tools/pcp_host_metrics.yaml -t
+
+  # Backfill from a pmlogger archive, a value every 60 seconds from 1460000000 on
+  ./cron-send-pcp-host-metrics.py -a /var/log/pcp/pmlogger/myhost/20160407 -i 60 --start 1460000000
+'''
+# vim: expandtab:tabstop=4:shiftwidth=4
+#
+#   Copyright 2016 Red Hat Inc.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+#This is not a module, but pylint thinks it is.  This is a command.
+#pylint: disable=invalid-name
+
+import argparse
+import yaml
+from openshift_tools.monitoring.pcp_collector import PCPCollector
+from openshift_tools.monitoring.zagg_sender import ZaggSender
+
+# Archive windows to send to zagg at a time when replaying
+REPLAY_BATCH = 50
+
+def parse_args():
+    """ parse the args from the cli """
+
+    parser = argparse.ArgumentParser(description='PCP host metric sender')
+    parser.add_argument('-c', '--config', default=None,
+                        help='YAML file with the metric groups to send. Default: cpu, disk, network and filesystem')
+    parser.add_argument('-i', '--interval', default=10, type=int,
+                        help='Seconds between samples. Default: 10')
+    parser.add_argument('-n', '--count', default=2, type=int,
+                        help='Number of samples to take. Default: 2')
+    parser.add_argument('-a', '--archive', default=None,
+                        help='Replay this pmlogger archive instead of sampling pcp live. ' + \
+                             'Values are sent with the time they were logged at')
+    parser.add_argument('--start', default=None, type=float,
+                        help='With --archive, where to start, in seconds since the epoch. Default: its beginning')
+    parser.add_argument('--end', default=None, type=float,
+                        help='With --archive, where to stop, in seconds since the epoch. Default: its end')
+    parser.add_argument('-t', '--test', action='store_true', default=False,
+                        help="Run the script but don't send to zabbix")
+    parser.add_argument('-v', '--verbose', action='store_true', default=None, help='Verbose?')
+    parser.add_argument('--debug', action='store_true', default=None, help='Debug?')
+
+    return parser.parse_args()
+
+def print_values(zabbix_keys, discoveries, clock=None):
+    """ Print what is (or would be) sent """
+    prefix = '%s ' % clock if clock else ''
+
+    for discovery_key, macro, instances in discoveries:
+        print '%s%s (%s): %s' % (prefix, discovery_key, macro, ', '.join(instances))
+    for key in sorted(zabbix_keys.keys()):
+        print '%s%s: %s' % (prefix, key, zabbix_keys[key])
+
+def replay(args, collector):
+    """ Send (or print) every window of the archive, with the time it was logged at """
+    zagg_sender = None if args.test else ZaggSender(verbose=args.verbose, debug=args.debug)
+
+    windows = 0
+    for timestamp, (zabbix_keys, discoveries) in collector.replay(args.end):
+        clock = int(timestamp)
+
+        if args.test or args.verbose:
+            print_values(zabbix_keys, discoveries, clock)
+
+        if zagg_sender:
+            for discovery_key, macro, instances in discoveries:
+                zagg_sender.add_zabbix_dynamic_item(discovery_key, macro, instances, clock=clock)
+            zagg_sender.add_zabbix_keys(zabbix_keys, clock=clock)
+
+            windows += 1
+            if windows % REPLAY_BATCH == 0:
+                zagg_sender.send_metrics()
+
+    if zagg_sender and windows % REPLAY_BATCH:
+        zagg_sender.send_metrics()
+
+def main():
+    """  Main function to run the check """
+
+    args = parse_args()
+
+    groups = None
+    if args.config:
+        groups = yaml.load(file(args.config))['groups']
+
+    collector = PCPCollector(groups, interval=args.interval, count=args.count,
+                             archive=args.archive, start=args.start)
+
+    if args.archive:
+        replay(args, collector)
+        return
+
+    if args.test:
+        zabbix_keys, discoveries = collector.collect()
+    else:
+        zagg_sender = ZaggSender(verbose=args.verbose, debug=args.debug)
+        zabbix_keys, discoveries = collector.send(zagg_sender)
+
+    if args.test or args.verbose:
+        print_values(zabbix_keys, discoveries)
+
+if __name__ == '__main__':
+    main()
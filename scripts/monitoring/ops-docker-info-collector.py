@@ -0,0 +1,65 @@
+#!/usr/bin/env python2
+# vim: expandtab:tabstop=4:shiftwidth=4
+
+'''
+    Calls 'docker info' in the background and caches the result
+
+    On loaded nodes 'docker info' can take minutes. This keeps calling it, giving
+    up after --timeout seconds, and caches the output, its parsed disk usage and
+    how long the call took (see dockerutil.DockerInfoCache). cron-send-docker-metrics,
+    cron-send-docker-timer and the docker_info PMDA read the cache instead of
+    waiting on the docker daemon.
+
+    Example:
+    ops-docker-info-collector --interval 60 --timeout 360
+'''
+
+# Adding the ignore because it does not like the naming of the script
+# to be different than the class name
+# pylint: disable=invalid-name
+
+from docker import AutoVersionClient
+from openshift_tools.monitoring.dockerutil import DockerInfoCache, DOCKER_INFO_CACHE
+import argparse
+import time
+
+def parse_args():
+    """ parse the args from the cli """
+
+    parser = argparse.ArgumentParser(description='docker info collector')
+    parser.add_argument('-i', '--interval', default=60, type=int,
+                        help='Seconds between the starts of the docker info calls. Default: 60')
+    parser.add_argument('-t', '--timeout', default=360, type=int,
+                        help='Seconds after which a docker info call is given up on. Default: 360')
+    parser.add_argument('-c', '--cache', default=DOCKER_INFO_CACHE,
+                        help='File to cache the docker info in. Default: %s' % DOCKER_INFO_CACHE)
+    parser.add_argument('--once', action='store_true', default=False,
+                        help='Call docker info once and exit')
+    parser.add_argument('-v', '--verbose', action='store_true', default=False, help='Verbose?')
+
+    return parser.parse_args()
+
+def main():
+    """ Keep the cache up to date """
+
+    args = parse_args()
+    cache = DockerInfoCache(args.cache)
+
+    def docker_client():
+        ''' A new client for every call, so that a daemon that wasn't up yet or restarted is picked up '''
+        return AutoVersionClient(base_url='unix://var/run/docker.sock', timeout=args.timeout)
+
+    while True:
+        result = cache.refresh(docker_client, args.timeout)
+
+        if args.verbose or result['error']:
+            print "docker info took %.2fs%s" % (result['latency'],
+                                                ', failed: %s' % result['error'] if result['error'] else '')
+
+        if args.once:
+            break
+
+        time.sleep(max(args.interval - result['latency'], 0))
+
+if __name__ == '__main__':
+    main()
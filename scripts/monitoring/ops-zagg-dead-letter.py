@@ -0,0 +1,155 @@
+#!/usr/bin/env python2
+# vim: expandtab:tabstop=4:shiftwidth=4
+
+#
+#   Copyright 2016 Red Hat Inc.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+#This is not a module, but pylint thinks it is.  This is a command.
+#pylint: disable=invalid-name
+
+"""This is a script to inspect, replay and purge dead-lettered zagg metrics.
+
+Examples:
+
+# Show how many metrics are dead-lettered, by key and by host
+ops-zagg-dead-letter summary
+
+# List the dead-lettered heartbeats of one target
+ops-zagg-dead-letter --target 'local cluster zbx server' list --key heartbeat
+
+# Send all dead-lettered docker metrics again
+ops-zagg-dead-letter replay --key 'docker.*'
+
+# Throw away everything dead-lettered for a decommissioned host
+ops-zagg-dead-letter purge --host 'ip-172-31-1-1.*'
+"""
+
+from openshift_tools.monitoring.metricmanager import MetricManager
+
+import argparse
+import fnmatch
+from collections import Counter
+import yaml
+
+class ZaggDeadLetter(object):
+    """Works on the dead-letter areas of the targets found in /etc/openshift_tools/zagg_server.yaml
+    """
+
+    def __init__(self, args):
+        """Constructs the object
+
+        Args:
+            args: the parsed command line arguments
+        """
+
+        self.args = args
+        self.config = yaml.load(file(args.config))
+
+    def run(self):
+        """Runs the requested action against each selected target
+
+        Args: None
+        Returns: None
+        """
+        for target in self.config['targets']:
+            if self.args.target and target['name'] != self.args.target:
+                continue
+
+            mm = MetricManager(target['path'])
+            metrics = [m for m in mm.read_dead_letter_metrics() if self.matches(m)]
+
+            print
+            print "Target [%s]: %s dead-lettered metrics" % (target['name'], len(metrics))
+            print
+
+            if self.args.action == 'list':
+                self.list_metrics(metrics)
+            elif self.args.action == 'summary':
+                self.summarize_metrics(metrics)
+            elif self.args.action == 'replay':
+                mm.replay_dead_letter_metrics(metrics)
+                print "Replayed %s metrics." % len(metrics)
+            elif self.args.action == 'purge':
+                mm.purge_dead_letter_metrics(metrics)
+                print "Purged %s metrics." % len(metrics)
+
+    def matches(self, metric):
+        """Checks a metric against the --key and --host patterns
+
+        Args:
+            metric: the dead-lettered metric
+
+        Returns: True if the metric matches all given patterns
+        """
+        if self.args.key and not fnmatch.fnmatch(metric.key, self.args.key):
+            return False
+
+        if self.args.host and not fnmatch.fnmatch(metric.host, self.args.host):
+            return False
+
+        return True
+
+    @staticmethod
+    def list_metrics(metrics):
+        """Prints each metric along with why it was dead-lettered
+
+        Args:
+            metrics: the dead-lettered metrics
+
+        Returns: None
+        """
+        for metric in sorted(metrics, key=lambda m: m.clock):
+            print "%s  %s  %s = %r" % (metric.clock, metric.host, metric.key, metric.value)
+            print "    reason: %s" % metric.dead_letter_reason
+
+    @staticmethod
+    def summarize_metrics(metrics):
+        """Prints the number of metrics per key, per host and per reason
+
+        Args:
+            metrics: the dead-lettered metrics
+
+        Returns: None
+        """
+        for title, attr in [('Key', 'key'), ('Host', 'host'), ('Reason', 'dead_letter_reason')]:
+            counts = Counter(getattr(m, attr) for m in metrics)
+            if not counts:
+                continue
+
+            print "%8s  %s" % ('Count', title)
+            for value, count in counts.most_common():
+                print "%8s  %s" % (count, value)
+            print
+
+def parse_args():
+    """ parse the args from the cli """
+
+    parser = argparse.ArgumentParser(description='Zagg dead-letter tool')
+    parser.add_argument('-c', '--config', default='/etc/openshift_tools/zagg_server.yaml',
+                        help='Path to the zagg server config file.')
+    parser.add_argument('-t', '--target', default=None,
+                        help='Only work on the target with this name. Default: all targets')
+    parser.add_argument('action', choices=['list', 'summary', 'replay', 'purge'],
+                        help='What to do with the dead-lettered metrics.')
+    parser.add_argument('-k', '--key', default=None,
+                        help='Only metrics whose key matches this shell-style pattern.')
+    parser.add_argument('-s', '--host', default=None,
+                        help='Only metrics whose host matches this shell-style pattern.')
+
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    ZaggDeadLetter(parse_args()).run()
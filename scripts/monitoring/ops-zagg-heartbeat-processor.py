@@ -23,7 +23,7 @@
 """This is a script the processes heartbeat metrics
 """
 
-from openshift_tools.monitoring.zabbix_metric_processor import ZabbixSender, ZabbixMetricProcessor
+from openshift_tools.monitoring.zabbix_metric_processor import ZabbixSender, ZabbixMetricProcessor, MAX_ATTEMPTS
 from openshift_tools.monitoring.metricmanager import MetricManager
 from openshift_tools.ansible.simplezabbix import SimpleZabbix
 
@@ -77,12 +77,14 @@ class HeartbeatProcessor(object):
             url=target['api_url'],
             user=target['api_user'],
             password=target['api_password'],
+            api_stats_file=target.get('api_stats_file'),
         )
 
         zbxsender = ZabbixSender(target['trapper_server'], target['trapper_port'])
 
         hostname = socket.gethostname()
-        zmp = ZabbixMetricProcessor(mm, zbxapi, zbxsender, hostname, verbose=True)
+        zmp = ZabbixMetricProcessor(mm, zbxapi, zbxsender, hostname, verbose=True,
+                                    max_attempts=target.get('max_attempts', MAX_ATTEMPTS))
         return zmp.process_hb_metrics()
 
 if __name__ == "__main__":
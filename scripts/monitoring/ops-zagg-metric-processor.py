@@ -21,18 +21,31 @@
 #pylint: disable=invalid-name
 
 """This is a script the processes zagg metrics.
+
+By default every target is processed once, concurrently, and the script
+exits. With --daemon
+the script keeps running, watches each target's spool directory and processes
+the target as soon as new metrics show up.
 """
 
-from openshift_tools.monitoring.zabbix_metric_processor import ZabbixSender, ZabbixMetricProcessor
+from openshift_tools.monitoring.zabbix_metric_processor import ZabbixSender, ZabbixMetricProcessor, MAX_ATTEMPTS, \
+    ZabbixRefusedError
 from openshift_tools.monitoring.metricmanager import MetricManager
 from openshift_tools.ansible.simplezabbix import SimpleZabbix
+from openshift_tools.zbxapi import ZabbixAPIStats
 
-from openshift_tools.monitoring.zagg_metric_processor import ZaggMetricProcessor
+from openshift_tools.monitoring.zagg_metric_processor import ZaggMetricProcessor, CHUNK_SIZE, IN_FLIGHT
 from openshift_tools.monitoring.zagg_common import ZaggConnection
 from openshift_tools.monitoring.zagg_client import ZaggClient
 
-import yaml
+import argparse
+import os
+import signal
 import socket
+import sys
+import threading
+import time
+import yaml
 
 class ZaggProcessor(object):
     """Processes all targets found in /etc/openshift_tools/zagg_server.yaml
@@ -46,62 +59,344 @@ class ZaggProcessor(object):
         """
 
         self.config = yaml.load(file(config_file))
+        self._shutdown = threading.Event()
+
+        # Daemon mode: target name to (target, start time) of the cycles in progress
+        self._cycles = {}
+        self._cycles_lock = threading.Lock()
+
+    def run(self, default_timeout=540):
+        """Processes all defined targets in the config file concurrently
+
+        Each target is processed in its own thread, so a slow or hung target
+        doesn't delay the others. Targets that don't finish within their
+        deadline ('timeout' in the target config, in seconds) are reported as
+        failed and abandoned when the script exits.
+
+        Args:
+            default_timeout: deadline in seconds for targets without a 'timeout'
+
+        Returns: a dict of target name to the list of errors for that target
+        """
+        results = {}
+        workers = []
+
+        start_time = time.time()
+        for target in self.config['targets']:
+            worker = threading.Thread(target=self._run_target,
+                                      args=(target, results),
+                                      name=target['name'])
+            # Don't let a hung target keep the script from exiting
+            worker.daemon = True
+            worker.start()
+            workers.append((target, worker))
+
+        for target, worker in workers:
+            deadline = start_time + target.get('timeout', default_timeout)
+            worker.join(max(0, deadline - time.time()))
+
+            if worker.is_alive():
+                message = "Target [%s] did not finish within %ss" % \
+                          (target['name'], target.get('timeout', default_timeout))
+                print message
+                results[target['name']] = [message]
+
+        print
+        for target, _ in workers:
+            print "Target [%s]: %s errors occurred." % (target['name'], len(results[target['name']]))
+
+        return results
+
+    def _run_target(self, target, results):
+        """Worker thread body for run(): process a target once and record its errors
+
+        Args:
+            target: the config file portion for this specific target.
+            results: dict of target name to list of errors, filled in by this method
+
+        Returns: None
+        """
+        try:
+            results[target['name']] = self.process_target(target, self.create_processor(target))
+
+        # Reason: disable pylint broad-except because one target's failure must not affect the others
+        # Status: permanently disabled
+        # pylint: disable=broad-except
+        except Exception as error:
+            print "Error processing target [%s]: %s" % (target['name'], error)
+            results[target['name']] = [error]
+
+    # Reason: disable pylint too-many-arguments because the daemon needs its timing knobs
+    # Status: permanently disabled
+    # pylint: disable=too-many-arguments
+    def run_daemon(self, poll_interval, max_wait, shutdown_timeout, default_timeout=540):
+        """Processes each target in its own worker thread until SIGTERM or SIGINT
+
+        A target is processed whenever its spool directory changes, and at least
+        every max_wait seconds. After a cycle with errors, the target is left
+        alone for max_wait seconds. The processors (and the connections they hold)
+        are reused from cycle to cycle, and created again after a failed one.
+
+        A cycle that doesn't finish within its deadline ('timeout' in the target
+        config, in seconds) is hung on a send that will never return. The daemon
+        then exits, so that ops-run-in-loop starts it again with new connections.
 
-    def run(self):
-        """Runs through each defined target in the config file and processes it
+        Args:
+            poll_interval: seconds between checks of the spool directory
+            max_wait: seconds after which a target is processed even if its spool didn't change
+            shutdown_timeout: seconds to wait for in-flight cycles to finish on shutdown
+            default_timeout: deadline in seconds of the cycles of targets without a 'timeout'
 
-        Args: None
         Returns: None
         """
+        signal.signal(signal.SIGTERM, self._handle_shutdown)
+        signal.signal(signal.SIGINT, self._handle_shutdown)
+
+        workers = []
         for target in self.config['targets']:
-            print
-            print "Sending metrics to target [%s]" % target['name']
-            print
-            if target['type'] == 'zabbix':
-                errors = self.process_zabbix(target)
-                # TODO: add zabbix item and trigger for tracking the number of errors
-                print
-                print "Results: %s errors occurred." % len(errors)
-                if errors:
-                    print errors
-            elif target['type'] == 'zagg':
-                # TODO: add error handling for process_zagg like process_zabbix
-                self.process_zagg(target)
-            else:
-                print "Error: Target Type Not Supported: %s" % target['type']
-                # TODO: add zabbix item and trigger for tracking this failure
+            worker = threading.Thread(target=self._target_loop,
+                                      args=(target, poll_interval, max_wait),
+                                      name=target['name'])
+            worker.daemon = True
+            worker.start()
+            workers.append(worker)
+
+        # Signals are only delivered to the main thread, and only while it isn't
+        # blocked, so wait for the shutdown in short intervals.
+        while not self._shutdown.is_set():
+            self._shutdown.wait(1)
+
+            hung = self._hung_targets(default_timeout)
+            if hung:
+                print "Target(s) %s did not finish a cycle within their deadline, exiting" % \
+                      ', '.join(hung)
+                sys.stdout.flush()
+                # The hung threads can't be interrupted, and would keep sys.exit waiting
+                os._exit(1)
+
+        print "Shutting down, waiting up to %ss for targets to finish..." % shutdown_timeout
+        deadline = time.time() + shutdown_timeout
+        for worker in workers:
+            worker.join(max(0, deadline - time.time()))
+
+    def _handle_shutdown(self, signum, frame):
+        """Signal handler that asks the daemon to stop after the current cycles"""
+        del frame #make pylint happy
+        print "Received signal %s" % signum
+        self._shutdown.set()
+
+    def _hung_targets(self, default_timeout):
+        """The names of the targets whose current cycle is past its deadline"""
+        now = time.time()
+        with self._cycles_lock:
+            return [target['name'] for target, started in self._cycles.values()
+                    if now - started > target.get('timeout', default_timeout)]
+
+    def _target_loop(self, target, poll_interval, max_wait):
+        """Worker thread body: process the target whenever its spool changes
+
+        Args:
+            target: the config file portion for this specific target.
+            poll_interval: seconds between checks of the spool directory
+            max_wait: seconds after which the target is processed even if its spool didn't change
+
+        Returns: None
+        """
+        processor = None
+
+        last_mtime = None
+        last_run = 0
+        failed = False
+
+        while not self._shutdown.is_set():
+            try:
+                mtime = os.stat(target['path']).st_mtime
+
+                # After a failed cycle, wait max_wait before retrying so that we
+                # don't hammer a target that is down.
+                if (mtime != last_mtime and not failed) or time.time() - last_run >= max_wait:
+                    with self._cycles_lock:
+                        self._cycles[target['name']] = (target, time.time())
+
+                    # Metrics written while the cycle runs change the mtime again, and
+                    # get the next cycle. The cycle's own removals cause at most one
+                    # extra, empty, cycle.
+                    last_mtime = mtime
+
+                    try:
+                        # Created here, so that a target that is down when the daemon
+                        # starts is simply retried
+                        if processor is None:
+                            processor = self.create_processor(target)
+                        errors = self.process_target(target, processor)
+                    finally:
+                        with self._cycles_lock:
+                            del self._cycles[target['name']]
+
+                    last_run = time.time()
+
+                    # Metrics the trapper refused are dealt with, only errors reaching
+                    # the target mean it is down
+                    failed = any([not isinstance(error, ZabbixRefusedError) for error in errors])
+
+                    # Start over with new connections after errors
+                    if failed:
+                        processor = None
+
+            # Reason: disable pylint broad-except because one failed cycle must not kill the worker
+            # Status: permanently disabled
+            # pylint: disable=broad-except
+            except Exception as error:
+                print "Error processing target [%s]: %s" % (target['name'], error)
+                last_run = time.time()
+                failed = True
+                processor = None
+
+            self._shutdown.wait(poll_interval)
 
     @staticmethod
-    def process_zabbix(target):
-        """Process a Zabbix target
+    def create_processor(target):
+        """Creates the metric processor for a target
 
         Args:
             target: the config file portion for this specific target.
 
+        Returns: the metric processor, or None if the target type is not supported
+        """
+        if target['type'] == 'zabbix':
+            return ZaggProcessor.create_zabbix_processor(target)
+        elif target['type'] == 'zagg':
+            return ZaggProcessor.create_zagg_processor(target)
+
+        return None
+
+    @staticmethod
+    def process_target(target, processor):
+        """Processes a single target with its metric processor
+
+        Args:
+            target: the config file portion for this specific target.
+            processor: the metric processor created by create_processor
+
+        Returns: a list of errors, if any
+        """
+        print
+        print "Sending metrics to target [%s]" % target['name']
+        print
+        start_time = time.time()
+        errors = []
+        if target['type'] == 'zabbix':
+            errors = ZaggProcessor.process_zabbix(target, processor)
+            # TODO: add zabbix item and trigger for tracking the number of errors
+            print
+            print "Results: %s errors occurred." % len(errors)
+            if errors:
+                print errors
+        elif target['type'] == 'zagg':
+            errors = ZaggProcessor.process_zagg(processor)
+            if errors:
+                print errors
+        else:
+            print "Error: Target Type Not Supported: %s" % target['type']
+            # TODO: add zabbix item and trigger for tracking this failure
+            errors.append("Target Type Not Supported: %s" % target['type'])
+
+        if processor:
+            ZaggProcessor.record_cycle(processor.metric_manager, start_time, errors)
+
+        return errors
+
+    @staticmethod
+    def record_cycle(metric_manager, start_time, errors):
+        """Saves what a processing cycle did next to the target's spool, for the zagg PMDA
+
+        Args:
+            metric_manager: the MetricManager of the target
+            start_time: when the cycle started
+            errors: the errors of the cycle
+
         Returns: None
         """
+        end_time = time.time()
+        state = metric_manager.read_processor_state()
+
+        # Metrics the cycle read but couldn't send are the oldest ones waiting. If it
+        # sent them all, whatever is waiting arrived after it started.
+        oldest_clock = metric_manager.oldest_pending_clock()
+
+        try:
+            metric_manager.write_processor_state({
+                'cycle_start': start_time,
+                'cycle_end': end_time,
+                'cycle_time': end_time - start_time,
+                'cycles': state.get('cycles', 0) + 1,
+                'errors': len(errors),
+                'errors_total': state.get('errors_total', 0) + len(errors),
+                'oldest_clock': oldest_clock if oldest_clock is not None else start_time,
+            })
+
+        # Reason: disable pylint broad-except because the state is only there for monitoring
+        # Status: permanently disabled
+        # pylint: disable=broad-except
+        except Exception as error:
+            print "Error saving the processor state of [%s]: %s" % (metric_manager.metrics_directory, error)
+
+    @staticmethod
+    def create_zabbix_processor(target):
+        """Create the metric processor for a Zabbix target
+
+        Args:
+            target: the config file portion for this specific target.
+
+        Returns: a ZabbixMetricProcessor
+        """
 
         mm = MetricManager(target['path'])
         zbxapi = SimpleZabbix(
             url=target['api_url'],
             user=target['api_user'],
             password=target['api_password'],
+            api_stats_file=target.get('api_stats_file'),
         )
 
         zbxsender = ZabbixSender(target['trapper_server'], target['trapper_port'])
 
         hostname = socket.gethostname()
-        zmp = ZabbixMetricProcessor(mm, zbxapi, zbxsender, hostname, verbose=True)
-        return zmp.process_zbx_metrics()
+        return ZabbixMetricProcessor(mm, zbxapi, zbxsender, hostname, verbose=True,
+                                     max_attempts=target.get('max_attempts', MAX_ATTEMPTS))
 
     @staticmethod
-    def process_zagg(target):
-        """Process a Zagg target
+    def process_zabbix(target, zmp):
+        """Process a Zabbix target
 
         Args:
             target: the config file portion for this specific target.
+            zmp: the ZabbixMetricProcessor for this target.
 
-        Returns: None
+        Returns: a list of errors, if any
+        """
+
+        # Targets can opt in to having heartbeats processed in the same pass,
+        # instead of by ops-zagg-heartbeat-processor.
+        if target.get('process_heartbeats', False):
+            errors = zmp.process_all_metrics()
+        else:
+            errors = zmp.process_zbx_metrics()
+
+        # Report on the zabbix api calls made by this (and any other) processor run
+        if target.get('api_stats_file'):
+            errors += zmp.process_api_stats(ZabbixAPIStats.collect(target['api_stats_file']))
+
+        return errors
+
+    @staticmethod
+    def create_zagg_processor(target):
+        """Create the metric processor for a Zagg target
+
+        Args:
+            target: the config file portion for this specific target.
+
+        Returns: a ZaggMetricProcessor
         """
 
         verify = target.get('ssl_verify', False)
@@ -117,8 +412,48 @@ class ZaggProcessor(object):
                                   )
         zc = ZaggClient(zagg_conn)
 
-        zmp = ZaggMetricProcessor(mm, zc)
-        zmp.process_metrics()
+        return ZaggMetricProcessor(mm, zc,
+                                   chunk_size=target.get('chunk_size', CHUNK_SIZE),
+                                   in_flight=target.get('in_flight', IN_FLIGHT),
+                                  )
+
+    @staticmethod
+    def process_zagg(zmp):
+        """Process a Zagg target
+
+        Args:
+            zmp: the ZaggMetricProcessor for this target.
+
+        Returns: a list of errors, if any
+        """
+
+        return zmp.process_metrics()
+
+def parse_args():
+    """ parse the args from the cli """
+
+    parser = argparse.ArgumentParser(description='Zagg metric processor')
+    parser.add_argument('-c', '--config', default='/etc/openshift_tools/zagg_server.yaml',
+                        help='Path to the zagg server config file.')
+    parser.add_argument('--timeout', type=float, default=540,
+                        help='Seconds each target (in daemon mode, each cycle of a target) may take, '
+                             'unless it sets its own timeout. Default: 540')
+    parser.add_argument('--daemon', action='store_true', default=False,
+                        help='Keep running and process targets as soon as new metrics arrive.')
+    parser.add_argument('--poll-interval', type=float, default=0.5,
+                        help='Daemon mode: seconds between checks of the spool directories. Default: 0.5')
+    parser.add_argument('--max-wait', type=float, default=30,
+                        help='Daemon mode: process each target at least this often, in seconds. Default: 30')
+    parser.add_argument('--shutdown-timeout', type=float, default=60,
+                        help='Daemon mode: seconds to let in-flight processing finish on shutdown. Default: 60')
+
+    return parser.parse_args()
 
 if __name__ == "__main__":
-    ZaggProcessor('/etc/openshift_tools/zagg_server.yaml').run()
+    ARGS = parse_args()
+    ZP = ZaggProcessor(ARGS.config)
+
+    if ARGS.daemon:
+        ZP.run_daemon(ARGS.poll_interval, ARGS.max_wait, ARGS.shutdown_timeout, ARGS.timeout)
+    else:
+        ZP.run(ARGS.timeout)
@@ -68,6 +68,14 @@ class OpsZaggPCPClient(object):
         parser.add_argument('--debug', action='store_true', default=None, help='Debug?')
         parser.add_argument('-c', '--config-file', help='ops-zagg-client config file',
                             default='/etc/openshift_tools/zagg_client.yaml')
+        parser.add_argument('-a', '--archive', help='send the values of this pmlogger archive instead, ' + \
+                                                    'with the time they were logged at')
+        parser.add_argument('--step', type=float, default=60,
+                            help='with --archive, seconds between the values sent. Default: 60')
+        parser.add_argument('--start', type=float, default=None,
+                            help='with --archive, where to start, in seconds since the epoch. Default: its beginning')
+        parser.add_argument('--end', type=float, default=None,
+                            help='with --archive, where to stop, in seconds since the epoch. Default: its end')
 
         self.args = parser.parse_args()
 
@@ -119,6 +127,12 @@ class OpsZaggPCPClient(object):
     def add_pcp_to_zagg_sender(self, pcp_metrics):
         """ something pcp yada yada """
 
+        if self.args.archive:
+            for timestamp, pcp_metric_dict in pminfo.replay_archive(self.args.archive, pcp_metrics, self.args.step,
+                                                                     self.args.start, self.args.end):
+                self.zagg_sender.add_zabbix_keys(pcp_metric_dict, clock=int(timestamp))
+            return
+
         pcp_metric_dict = pminfo.get_metrics(metrics=pcp_metrics, derived_metrics=None)
 
         self.zagg_sender.add_zabbix_keys(pcp_metric_dict)
@@ -24,19 +24,18 @@ cp -p monitoring/ops-zagg-pcp-client.py %{buildroot}/usr/bin/ops-zagg-pcp-client
 cp -p monitoring/ops-zagg-metric-processor.py %{buildroot}/usr/bin/ops-zagg-metric-processor
 cp -p monitoring/ops-zagg-heartbeat-processor.py %{buildroot}/usr/bin/ops-zagg-heartbeat-processor
 cp -p monitoring/ops-zagg-heartbeater.py %{buildroot}/usr/bin/ops-zagg-heartbeater
+cp -p monitoring/ops-zagg-dead-letter.py %{buildroot}/usr/bin/ops-zagg-dead-letter
 cp -p monitoring/cron-send-process-count.sh %{buildroot}/usr/bin/cron-send-process-count
-cp -p monitoring/cron-send-filesystem-metrics.py %{buildroot}/usr/bin/cron-send-filesystem-metrics
-cp -p monitoring/cron-send-pcp-sampled-metrics.py %{buildroot}/usr/bin/cron-send-pcp-sampled-metrics
+cp -p monitoring/cron-send-pcp-host-metrics.py %{buildroot}/usr/bin/cron-send-pcp-host-metrics
 cp -p monitoring/ops-runner.py %{buildroot}/usr/bin/ops-runner
 cp -p monitoring/cron-send-ovs-status.py %{buildroot}/usr/bin/cron-send-ovs-status
 cp -p monitoring/cron-send-pcp-ping.sh %{buildroot}/usr/bin/cron-send-pcp-ping
 cp -p monitoring/cron-send-etcd-status.py %{buildroot}/usr/bin/cron-send-etcd-status
-cp -p monitoring/cron-send-disk-metrics.py %{buildroot}/usr/bin/cron-send-disk-metrics
-cp -p monitoring/cron-send-network-metrics.py %{buildroot}/usr/bin/cron-send-network-metrics
 cp -p monitoring/cron-send-s3-metrics.py %{buildroot}/usr/bin/cron-send-s3-metrics
 cp -p monitoring/cron-send-os-master-metrics.py %{buildroot}/usr/bin/cron-send-os-master-metrics
 cp -p monitoring/cron-send-docker-metrics.py %{buildroot}/usr/bin/cron-send-docker-metrics
-cp -p monitoring/cron-send-docker-metrics.py %{buildroot}/usr/bin/cron-send-docker-timer
+cp -p monitoring/cron-send-docker-timer.py %{buildroot}/usr/bin/cron-send-docker-timer
+cp -p monitoring/ops-docker-info-collector.py %{buildroot}/usr/bin/ops-docker-info-collector
 cp -p monitoring/cron-send-docker-dns-resolution.py %{buildroot}/usr/bin/cron-send-docker-dns-resolution
 cp -p monitoring/cron-send-docker-existing-dns-resolution.py %{buildroot}/usr/bin/cron-send-docker-existing-dns-resolution
 cp -p monitoring/cron-send-registry-checks.py %{buildroot}/usr/bin/cron-send-registry-checks
@@ -125,11 +124,8 @@ BuildArch:     noarch
 OpenShift Tools PCP Monitoring Scripts
 
 %files monitoring-pcp
-/usr/bin/cron-send-filesystem-metrics
-/usr/bin/cron-send-pcp-sampled-metrics
+/usr/bin/cron-send-pcp-host-metrics
 /usr/bin/cron-send-pcp-ping
-/usr/bin/cron-send-disk-metrics
-/usr/bin/cron-send-network-metrics
 /usr/bin/ops-zagg-pcp-client
 
 
@@ -148,6 +144,7 @@ OpenShift Tools Docker Monitoring Scripts
 %files monitoring-docker
 /usr/bin/cron-send-docker-metrics
 /usr/bin/cron-send-docker-timer
+/usr/bin/ops-docker-info-collector
 /usr/bin/cron-send-docker-dns-resolution
 /usr/bin/cron-send-docker-existing-dns-resolution
 
@@ -176,7 +173,7 @@ OpenShift Tools Zagg Client Monitoring Scripts
 # ----------------------------------------------------------------------------------
 %package monitoring-zagg-server
 Summary:       OpenShift Tools Zagg Server Monitoring Scripts
-Requires:      python2,python-openshift-tools-monitoring-zagg,python-openshift-tools-ansible
+Requires:      python2,python-openshift-tools-monitoring-zagg,python-openshift-tools-ansible,python-openshift-tools-zbxapi
 BuildRequires: python2-devel
 BuildArch:     noarch
 
@@ -187,6 +184,7 @@ OpenShift Tools Zagg Server Monitoring Scripts
 /usr/bin/ops-zagg-metric-processor
 /usr/bin/ops-zagg-heartbeat-processor
 /usr/bin/ops-zagg-heartbeater
+/usr/bin/ops-zagg-dead-letter
 /var/run/zagg/data
 %config(noreplace)/etc/openshift_tools/zagg_server.yaml
 
@@ -0,0 +1,137 @@
+#!/usr/bin/env python2
+'''
+ Benchmark of PMSampler.fetch_arrays with pminfo.extract_values against the same
+ fetches with pmExtractValue for every value, on metrics with many instances.
+
+ With --instances, the values are extracted from a synthetic pmResult with that
+ many instances per metric instead, without fetching anything.
+
+ This needs the pcp python bindings and a running pmcd.
+'''
+# vim: expandtab:tabstop=4:shiftwidth=4
+
+# This is a script, not a module
+# pylint: disable=invalid-name
+
+# pylint: disable=import-error
+from pcp import pmapi
+
+import argparse
+import ctypes
+import struct
+import time
+
+from openshift_tools.monitoring import pminfo
+
+# Metrics with an instance for every process, network interface or disk
+METRICS = ['proc.psinfo.utime',
+           'proc.psinfo.stime',
+           'proc.psinfo.rss',
+           'network.interface.in.bytes',
+           'network.interface.out.bytes',
+           'disk.dev.total']
+
+# The synthetic metrics: like network.interface.*.bytes, disk.dev.* (64 bit counters) and a 32 bit counter
+SYNTHETIC_TYPES = [pmapi.c_api.PM_TYPE_U64,
+                   pmapi.c_api.PM_TYPE_U64,
+                   pmapi.c_api.PM_TYPE_U64,
+                   pmapi.c_api.PM_TYPE_U32]
+
+class OneByOneSampler(pminfo.PMSampler):
+    ''' A PMSampler that extracts every value with pmExtractValue, the way it did before extract_values '''
+
+    def extract_arrays(self, results, i, value_type):
+        ''' Always extract metric i one value at a time '''
+        return self.extract_one_by_one(results, i, value_type)
+
+def time_fetches(sampler, rounds):
+    ''' The average time sampler.fetch_arrays takes, and the number of values it fetched '''
+    start = time.time()
+    for _ in range(rounds):
+        _, arrays = sampler.fetch_arrays()
+    elapsed = (time.time() - start) / rounds
+
+    return elapsed, sum([len(values) for _, values in arrays.values()])
+
+def build_result(instances):
+    ''' Lay out a pmResult the way libpcp does, with values for instances 0..instances-1
+        of every SYNTHETIC_TYPES metric. Returns the pmResult pointer and the buffers that back it.
+    '''
+    buffers = []
+
+    result_buffer = ctypes.create_string_buffer(ctypes.sizeof(pmapi.pmResult) +
+                                                (len(SYNTHETIC_TYPES) - 1) * ctypes.sizeof(ctypes.c_void_p))
+    buffers.append(result_buffer)
+    result = pmapi.pmResult.from_buffer(result_buffer)
+    result.numpmid = len(SYNTHETIC_TYPES)
+    vsets = ctypes.cast(result.vset, ctypes.POINTER(ctypes.POINTER(pmapi.pmValueSet)))
+
+    for i, value_type in enumerate(SYNTHETIC_TYPES):
+        vset_buffer = ctypes.create_string_buffer(ctypes.sizeof(pmapi.pmValueSet) +
+                                                  (instances - 1) * ctypes.sizeof(pmapi.pmValue))
+        buffers.append(vset_buffer)
+        vset = pmapi.pmValueSet.from_buffer(vset_buffer)
+        vset.numval = instances
+        vlist = (pmapi.pmValue * instances).from_address(ctypes.addressof(vset.vlist))
+
+        if value_type == pmapi.c_api.PM_TYPE_U32:
+            vset.valfmt = pmapi.c_api.PM_VAL_INSITU
+            for inst in range(instances):
+                vlist[inst].inst = inst
+                vlist[inst].value.lval = inst * 7
+        else:
+            vset.valfmt = pmapi.c_api.PM_VAL_DPTR
+            for inst in range(instances):
+                block = ctypes.create_string_buffer(pminfo.PMVALUE_BLOCK_HEADER + 8)
+                buffers.append(block)
+                struct.pack_into('=IQ', block, 0, (12 << 8) | value_type, 2 ** 40 + inst)
+                vlist[inst].inst = inst
+                vlist[inst].value.pval = ctypes.cast(block, ctypes.POINTER(pmapi.pmValueBlock))
+
+        vsets[i] = ctypes.pointer(vset)
+
+    return ctypes.pointer(result), buffers
+
+def time_extracts(extract, results, rounds):
+    ''' The average time extract takes on every metric of results, and the number of values it extracted '''
+    start = time.time()
+    for _ in range(rounds):
+        arrays = [extract(results, i, value_type) for i, value_type in enumerate(SYNTHETIC_TYPES)]
+    elapsed = (time.time() - start) / rounds
+
+    return elapsed, sum([len(values) for _, values in arrays])
+
+def main():
+    ''' Fetch (or extract) the same metrics both ways '''
+    parser = argparse.ArgumentParser(description='PMSampler.fetch_arrays, pmExtractValue vs pminfo.extract_values')
+    parser.add_argument('--metrics', nargs='+', default=METRICS, help='Metrics to fetch')
+    parser.add_argument('--instances', type=int, help='Extract a synthetic pmResult with this many instances '
+                        'per metric (e.g. 2000) instead of fetching the metrics')
+    parser.add_argument('--rounds', type=int, default=20, help='Number of times to fetch the metrics')
+    args = parser.parse_args()
+
+    if args.instances:
+        pcp = pminfo.PMInfo()
+        pcp.connect()
+        results, _buffers = build_result(args.instances)
+
+        one_time, count = time_extracts(pcp.extract_one_by_one, results, args.rounds)
+        batch_time, _ = time_extracts(pcp.extract_arrays, results, args.rounds)
+
+        print "%s metrics x %s instances, %s values, %s rounds" % (len(SYNTHETIC_TYPES), args.instances,
+                                                                   count, args.rounds)
+        print "pmExtractValue:         %8.2fms per result" % (one_time * 1000)
+        print "pminfo.extract_values:  %8.2fms per result" % (batch_time * 1000)
+        print "Speedup:                %8.1fx" % (one_time / batch_time)
+        return
+
+    one_time, count = time_fetches(OneByOneSampler(args.metrics), args.rounds)
+    batch_time, _ = time_fetches(pminfo.PMSampler(args.metrics), args.rounds)
+
+    print "%s metrics, %s values, %s rounds" % (len(args.metrics), count, args.rounds)
+    print "pmExtractValue:         %8.2fms per fetch" % (one_time * 1000)
+    print "pminfo.extract_values:  %8.2fms per fetch" % (batch_time * 1000)
+    print "Speedup:                %8.1fx" % (one_time / batch_time)
+
+if __name__ == '__main__':
+    main()
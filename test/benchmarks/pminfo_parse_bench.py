@@ -0,0 +1,114 @@
+#!/usr/bin/env python2
+'''
+ Benchmark of the regex based pminfo -f parsing pminfo_parse used to do
+ against pminfo_parse.PMInfoParser, on pminfo -f output with 10k+ metrics.
+
+ Give it a recording of a real host with:
+   pminfo -f > /tmp/pminfo-f.txt
+   python test/benchmarks/pminfo_parse_bench.py --file /tmp/pminfo-f.txt
+
+ Without --file it makes up output in the same format.
+'''
+# vim: expandtab:tabstop=4:shiftwidth=4
+
+# This is a script, not a module
+# pylint: disable=invalid-name
+
+import argparse
+import re
+import time
+
+from openshift_tools.monitoring.pminfo_parse import PMInfoParser
+
+def synthetic_output(metrics):
+    ''' pminfo -f output for metrics metrics, with single values, instances,
+        unnamed instances and metrics without values
+    '''
+    lines = []
+    for i in range(metrics):
+        lines.append('')
+        kind = i % 4
+        if kind == 0:
+            lines.append('bench.single.m%05d' % i)
+            lines.append('    value %s' % (i * 13))
+        elif kind == 1:
+            lines.append('bench.named.m%05d' % i)
+            for inst in range(8):
+                lines.append('    inst [%s or "veth %02d"] value %s' % (inst, inst, i + inst))
+        elif kind == 2:
+            lines.append('bench.unnamed.m%05d' % i)
+            for inst in range(4):
+                lines.append('    inst [%s] value %s.5' % (inst, inst))
+        else:
+            lines.append('bench.novalue.m%05d' % i)
+            lines.append('No value(s) available!')
+
+    return '\n'.join(lines) + '\n'
+
+def regex_parse(data):
+    ''' What pminfo_parse used to do: split the whole output on an alternation
+        of all of the metric names, then parse every block
+    '''
+    metrics = [line for line in data.split('\n') if line and not line.startswith(' ') and
+               not line.startswith('No value') and not line.startswith('Error:')]
+    metric_regex = re.compile('\n(' + '|'.join(metrics) + ')\n')
+
+    blocks = {}
+    split_data = re.split(metric_regex, data)
+    exception_list = ['No value(s) available!',
+                      'Error: Metric not supported',
+                     ]
+    for i in range(1, len(split_data), 2):
+        if any([exce in split_data[i+1] for exce in exception_list]):
+            continue
+        blocks[split_data[i]] = split_data[i+1]
+
+    results = {}
+    inst_line = re.compile(r'\[\d+ or')
+    for metric, metric_value in blocks.items():
+        if metric_value.startswith('    value'):
+            results[metric] = metric_value.strip().split()[1]
+        elif metric_value.startswith('    inst'):
+            for inst in metric_value.split('    inst '):
+                if not inst:
+                    continue
+                if inst_line.match(inst):
+                    metric_subname = inst.split('"')[1].replace(" ", "_")
+                else:
+                    metric_subname = inst.split('[')[1].split(']')[0]
+                results[metric + "." + metric_subname] = inst.split('] value ')[1].strip()
+
+    return results
+
+def main():
+    ''' Parse the same output both ways '''
+    parser = argparse.ArgumentParser(description='regex vs streaming pminfo -f parsing')
+    parser.add_argument('--file', help='Recorded pminfo -f output. Default: made up output')
+    parser.add_argument('--metrics', type=int, default=12000, help='Metrics of the made up output')
+    parser.add_argument('--rounds', type=int, default=3, help='Number of times to parse the output')
+    args = parser.parse_args()
+
+    if args.file:
+        data = open(args.file).read()
+    else:
+        data = synthetic_output(args.metrics)
+    lines = data.splitlines(True)
+
+    start = time.time()
+    for _ in range(args.rounds):
+        old = regex_parse(data)
+    regex_time = (time.time() - start) / args.rounds
+
+    start = time.time()
+    for _ in range(args.rounds):
+        new = PMInfoParser().parse(lines)
+    stream_time = (time.time() - start) / args.rounds
+
+    print "%s lines, %s values, %s rounds" % (len(lines), len(new), args.rounds)
+    print "Same values:        %s" % (old == new)
+    print "regex split:        %8.2fms per parse" % (regex_time * 1000)
+    print "PMInfoParser:       %8.2fms per parse" % (stream_time * 1000)
+    print "Speedup:            %8.1fx" % (regex_time / stream_time)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python2
+'''
+ Benchmark of ZabbixAPI against AsyncZabbixAPI on a local mock JSON-RPC server
+'''
+# vim: expandtab:tabstop=4:shiftwidth=4
+
+# This is a script, not a module
+# pylint: disable=invalid-name
+
+import argparse
+import BaseHTTPServer
+import json
+import SocketServer
+import threading
+import time
+
+from openshift_tools.zbxapi import ZabbixAPI, ZabbixConnection
+from openshift_tools.zbxapi.asyncapi import AsyncZabbixAPI
+
+class MockZabbixServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    ''' A threaded HTTP server answering zabbix api calls after a fixed latency '''
+    daemon_threads = True
+    latency = 0.0
+
+class MockZabbixHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    ''' Answers every *.get with one object, and logs in anybody '''
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    # pylint: disable=invalid-name
+    def do_POST(self):
+        ''' Answer a JSON-RPC call '''
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        time.sleep(self.server.latency)
+
+        if body['method'] == 'user.login':
+            result = 'token'
+        else:
+            result = [{'hostid': '10001', 'host': 'bench.example.com'}]
+
+        data = json.dumps({'jsonrpc': '2.0', 'result': result, 'id': body['id']})
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+def start_server(latency):
+    ''' Start the mock server in the background '''
+    server = MockZabbixServer(('127.0.0.1', 0), MockZabbixHandler)
+    server.latency = latency
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server
+
+def main():
+    ''' Run the same calls through both clients '''
+    parser = argparse.ArgumentParser(description='ZabbixAPI vs AsyncZabbixAPI')
+    parser.add_argument('--calls', type=int, default=200, help='Number of host.get calls')
+    parser.add_argument('--latency', type=float, default=0.02, help='Server latency per call, in seconds')
+    parser.add_argument('--concurrency', type=int, default=10, help='Calls in flight for the async client')
+    args = parser.parse_args()
+
+    server = start_server(args.latency)
+    url = 'http://127.0.0.1:%s/api_jsonrpc.php' % server.server_port
+    calls = [('host', 'get', {'filter': {'host': 'host%s.example.com' % i}}) for i in range(args.calls)]
+
+    zapi = ZabbixAPI(ZabbixConnection(url, 'bench', 'bench'))
+    start = time.time()
+    for zbx_class, method, params in calls:
+        zapi.get_content(zbx_class, method, params)
+    sync_time = time.time() - start
+    zapi.session.close()
+
+    with AsyncZabbixAPI(ZabbixConnection(url, 'bench', 'bench'), concurrency=args.concurrency) as azapi:
+        start = time.time()
+        azapi.gather(calls)
+        async_time = time.time() - start
+        connections = azapi.connection_stats()['connections']
+        azapi.session.close()
+
+    server.shutdown()
+
+    print "%s calls, %.0fms server latency" % (args.calls, args.latency * 1000)
+    print "ZabbixAPI:      %6.2fs  (%6.1f calls/s)" % (sync_time, args.calls / sync_time)
+    print "AsyncZabbixAPI: %6.2fs  (%6.1f calls/s, concurrency %s, %s connections)" % \
+          (async_time, args.calls / async_time, args.concurrency, connections)
+    print "Speedup:        %6.1fx" % (sync_time / async_time)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python2
+'''
+ Unit tests for the MetricManager dead-letter area and spool stats
+'''
+
+import json
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+import unittest
+
+# Removing invalid variable names for tests so that I can
+# keep them brief
+# pylint: disable=invalid-name
+# Disable import-error b/c our libraries aren't loaded in jenkins
+# pylint: disable=import-error
+from openshift_tools.monitoring.metricmanager import MetricManager, UniqueMetric
+
+class MetricManagerTest(unittest.TestCase):
+    '''
+     Test class for MetricManager
+    '''
+
+    def setUp(self):
+        ''' setup method will create an empty disk cache '''
+        self.directory = tempfile.mkdtemp()
+        self.mm = MetricManager(self.directory)
+
+    def tearDown(self):
+        ''' tearDown method will remove the disk cache '''
+        shutil.rmtree(self.directory)
+
+    def test_dead_letter(self):
+        ''' Testing that a dead-lettered metric moves out of the disk cache '''
+        metric = UniqueMetric('a.example.com', 'a.b.c', 10)
+        self.mm.write_metrics(metric)
+        self.mm.dead_letter_metrics(metric, 'rejected')
+
+        self.assertEqual(self.mm.read_metrics(), [])
+        dead = self.mm.read_dead_letter_metrics()
+        self.assertEqual([m.unique_id for m in dead], [metric.unique_id])
+        self.assertEqual(dead[0].dead_letter_reason, 'rejected')
+        self.assertEqual(self.mm.spool_depths(), {'zbx': 0, 'heartbeat': 0, 'dead-letter': 1})
+
+    def test_record_failed_attempt(self):
+        ''' Testing that failed attempts are saved, and dead-letter the metric at max_attempts '''
+        metric = UniqueMetric('a.example.com', 'a.b.c', 10)
+        self.mm.write_metrics(metric)
+
+        self.assertEqual(self.mm.record_failed_attempt(self.mm.read_metrics(), 'refused', 2), [])
+        metrics = self.mm.read_metrics()
+        self.assertEqual(metrics[0].attempts, 1)
+        self.assertEqual(metrics[0].last_error, 'refused')
+
+        dead = self.mm.record_failed_attempt(metrics, 'refused', 2)
+        self.assertEqual([m.unique_id for m in dead], [metric.unique_id])
+        self.assertEqual(self.mm.read_metrics(), [])
+        self.assertEqual(len(self.mm.read_dead_letter_metrics()), 1)
+
+    def test_replay(self):
+        ''' Testing that a replayed metric is back in the disk cache with no attempts '''
+        metric = UniqueMetric('a.example.com', 'a.b.c', 10)
+        self.mm.write_metrics(metric)
+        self.mm.record_failed_attempt(self.mm.read_metrics(), 'refused', 1)
+
+        self.mm.replay_dead_letter_metrics(self.mm.read_dead_letter_metrics())
+
+        self.assertEqual(self.mm.read_dead_letter_metrics(), [])
+        metrics = self.mm.read_metrics()
+        self.assertEqual([m.unique_id for m in metrics], [metric.unique_id])
+        self.assertEqual(metrics[0].attempts, 0)
+        self.assertEqual(metrics[0].dead_letter_reason, None)
+        self.assertEqual(self.mm.spool_depths(), {'zbx': 1, 'heartbeat': 0, 'dead-letter': 0})
+
+    def test_purge(self):
+        ''' Testing that a purged metric is gone '''
+        hb_metric = UniqueMetric.create_heartbeat('a.example.com', ['host template'], ['default'])
+        self.mm.write_metrics(hb_metric)
+        self.mm.dead_letter_metrics(hb_metric, 'rejected')
+
+        self.mm.purge_dead_letter_metrics(self.mm.read_dead_letter_metrics())
+
+        self.assertEqual(self.mm.read_dead_letter_metrics(), [])
+        self.assertEqual(os.listdir(self.mm.dead_letter_directory), [])
+        self.assertEqual(self.mm.spool_depths(), {'zbx': 0, 'heartbeat': 0, 'dead-letter': 0})
+
+    def test_spool_stats(self):
+        ''' Testing that the counters of every process add up '''
+        self.mm.write_metrics([UniqueMetric('a.example.com', 'a.b.c', 10),
+                               UniqueMetric('a.example.com', 'a.b.d', 10)])
+        self.mm.remove_metrics(self.mm.read_metrics()[0])
+        with open(os.path.join(self.mm.state_directory, 'other.example.com-1-abc.counters'), 'w') as stats:
+            json.dump({'zbx': {'written': 5, 'removed': 2}}, stats)
+
+        self.assertEqual(self.mm.spool_stats()['zbx'], {'written': 7, 'removed': 3})
+        self.assertEqual(self.mm.spool_depths(), {'zbx': 4, 'heartbeat': 0, 'dead-letter': 0})
+
+    def test_reconcile(self):
+        ''' Testing that a process that is gone is folded in, and the depths match the disk cache '''
+        process = subprocess.Popen(['true'])
+        process.wait()
+        os.mkdir(self.mm.state_directory)
+        gone = os.path.join(self.mm.state_directory, '%s-%s-abc.counters' % (socket.gethostname(), process.pid))
+        with open(gone, 'w') as stats:
+            json.dump({'zbx': {'written': 3, 'removed': 1}}, stats)
+
+        # One metric that was never counted, and two counted ones that aren't there
+        with open(self.mm.metric_full_path('uncounted.yml'), 'w') as metric_file:
+            metric_file.write("{host: a, key: k, value: 1, clock: 1, unique_id: uncounted}\n")
+        self.mm.read_metrics()
+
+        self.assertFalse(os.path.exists(gone))
+        self.assertEqual(self.mm.spool_stats()['zbx'], {'written': 3, 'removed': 2})
+        self.assertEqual(self.mm.spool_depths(), {'zbx': 1, 'heartbeat': 0, 'dead-letter': 0})
+
+if __name__ == "__main__":
+    unittest.main()
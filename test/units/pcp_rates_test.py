@@ -0,0 +1,122 @@
+#!/usr/bin/env python2
+'''
+ Unit tests for the PCP counter rates
+'''
+
+import sys
+import types
+import unittest
+
+# Our buildbot does not have the pcp libraries installed, pcp_rates only
+# needs the pmapi constants so stand in for them there
+try:
+    # pylint: disable=import-error,unused-import
+    import pcp.pmapi
+except ImportError:
+    C_API = types.ModuleType('cpmapi')
+    C_API.PM_TYPE_32, C_API.PM_TYPE_U32, C_API.PM_TYPE_64, C_API.PM_TYPE_U64 = 0, 1, 2, 3
+    C_API.PM_SEM_COUNTER, C_API.PM_SEM_INSTANT = 1, 3
+    PMAPI = types.ModuleType('pcp.pmapi')
+    PMAPI.c_api = C_API
+    PCP = types.ModuleType('pcp')
+    PCP.pmapi = PMAPI
+    sys.modules.update({'pcp': PCP, 'pcp.pmapi': PMAPI})
+
+# Removing invalid variable names for tests so that I can
+# keep them brief
+# pylint: disable=invalid-name
+# Disable import-error b/c our libraries aren't loaded in jenkins
+# pylint: disable=import-error,wrong-import-position
+from pcp import pmapi
+from openshift_tools.monitoring.pcp_rates import MetricRate, RateEngine
+
+PM_TIME_MSEC = 2
+PM_SPACE_KBYTE = 1
+
+class Units(object):
+    ''' A pmUnits '''
+    # pylint: disable=too-few-public-methods,too-many-arguments
+    def __init__(self, dimSpace=0, dimTime=0, dimCount=0, scaleSpace=0, scaleTime=0, scaleCount=0):
+        self.dimSpace = dimSpace
+        self.dimTime = dimTime
+        self.dimCount = dimCount
+        self.scaleSpace = scaleSpace
+        self.scaleTime = scaleTime
+        self.scaleCount = scaleCount
+
+class Desc(object):
+    ''' A pmDesc '''
+    # pylint: disable=too-few-public-methods
+    def __init__(self, mtype, sem=None, units=None):
+        self.type = mtype
+        self.sem = pmapi.c_api.PM_SEM_COUNTER if sem is None else sem
+        self.units = units or Units(dimCount=1)
+
+class MetricRateTest(unittest.TestCase):
+    '''
+     Test class for MetricRate
+    '''
+
+    def test_32bit_wrap(self):
+        ''' Testing that a 32 bit counter going backwards wrapped '''
+        rate = MetricRate(Desc(pmapi.c_api.PM_TYPE_U32))
+        samples = [(0.0, {0: 2 ** 32 - 100}), (10.0, {0: 900})]
+
+        self.assertEqual(rate.rates(samples), {0: 100.0})
+
+    def test_64bit_reset(self):
+        ''' Testing that the interval a 64 bit counter was reset in is left out '''
+        rate = MetricRate(Desc(pmapi.c_api.PM_TYPE_U64))
+        samples = [(0.0, {0: 5000}), (10.0, {0: 6000}), (20.0, {0: 100}), (30.0, {0: 300})]
+
+        # 1000 over the first 10s and 200 over the last 10s, the reset in between doesn't count
+        self.assertEqual(rate.rates(samples), {0: 60.0})
+        self.assertEqual(rate.rates(samples[1:3]), {})
+
+    def test_instances_come_and_go(self):
+        ''' Testing that instances are rated over the samples they were in '''
+        rate = MetricRate(Desc(pmapi.c_api.PM_TYPE_U64))
+        samples = [(0.0, {'sda': 0, 'sdb': 0}),
+                   (10.0, {'sda': 100, 'sdb': 50}),
+                   (20.0, {'sda': 200, 'sdc': 0}),
+                   (30.0, {'sda': 300, 'sdc': 40})]
+
+        self.assertEqual(rate.rates(samples), {'sda': 10.0, 'sdb': 5.0, 'sdc': 4.0})
+
+    def test_time_scaling(self):
+        ''' Testing that a counter of milliseconds is a fraction of the time spent '''
+        rate = MetricRate(Desc(pmapi.c_api.PM_TYPE_U64, units=Units(dimTime=1, scaleTime=PM_TIME_MSEC)))
+        samples = [(0.0, {0: 0}), (2.0, {0: 500})]
+
+        self.assertEqual(rate.rates(samples), {0: 0.25})
+
+    def test_space_scaling(self):
+        ''' Testing that a counter of kilobytes is a rate in bytes '''
+        rate = MetricRate(Desc(pmapi.c_api.PM_TYPE_U64, units=Units(dimSpace=1, scaleSpace=PM_SPACE_KBYTE)))
+        samples = [(0.0, {0: 0}), (4.0, {0: 8})]
+
+        self.assertEqual(rate.rates(samples), {0: 2048.0})
+
+    def test_instant(self):
+        ''' Testing that an instantaneous metric keeps its last value '''
+        rate = MetricRate(Desc(pmapi.c_api.PM_TYPE_U64, sem=pmapi.c_api.PM_SEM_INSTANT))
+
+        self.assertEqual(rate.rates([(0.0, {0: 5}), (10.0, {0: 3})]), {0: 3})
+
+class RateEngineTest(unittest.TestCase):
+    '''
+     Test class for RateEngine
+    '''
+
+    def test_rates(self):
+        ''' Testing that every metric is worked out, even one missing from a sample '''
+        engine = RateEngine({'disk.all.read': Desc(pmapi.c_api.PM_TYPE_U32),
+                             'mem.util.free': Desc(pmapi.c_api.PM_TYPE_U64,
+                                                   sem=pmapi.c_api.PM_SEM_INSTANT)})
+        samples = [(0.0, {'disk.all.read': {0: 10}, 'mem.util.free': {0: 7}}),
+                   (5.0, {'disk.all.read': {0: 60}})]
+
+        self.assertEqual(engine.rates(samples), {'disk.all.read': {0: 10.0}, 'mem.util.free': {}})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python2
+'''
+ Unit tests for pminfo.extract_values
+'''
+
+import ctypes
+import struct
+import sys
+import types
+import unittest
+
+# Our buildbot does not have the pcp libraries installed, extract_values only
+# needs the pmapi constants and the ctypes layout of a pmValueSet so stand in for them there
+try:
+    # pylint: disable=import-error,unused-import
+    import pcp.pmapi
+except ImportError:
+    C_API = types.ModuleType('cpmapi')
+    C_API.PM_TYPE_32, C_API.PM_TYPE_U32, C_API.PM_TYPE_64, C_API.PM_TYPE_U64 = 0, 1, 2, 3
+    C_API.PM_SEM_COUNTER, C_API.PM_SEM_INSTANT = 1, 3
+    PMAPI = types.ModuleType('pcp.pmapi')
+    PMAPI.c_api = C_API
+    PCP = types.ModuleType('pcp')
+    PCP.pmapi = PMAPI
+    sys.modules.update({'pcp': PCP, 'pcp.pmapi': PMAPI})
+
+# pcp_rates_test may have stood in for pcp.pmapi already, without the pmValueSet
+if not hasattr(sys.modules['pcp.pmapi'], 'pmValueSet'):
+    # pylint: disable=too-few-public-methods,invalid-name
+    class pmValueBlock(ctypes.Structure):
+        ''' A pmValueBlock '''
+        _fields_ = [("vtype", ctypes.c_uint, 8), ("vlen", ctypes.c_uint, 24), ("vbuf", ctypes.c_char * 1)]
+
+    class valueDref(ctypes.Union):
+        ''' The value of a pmValue, in place or in a pmValueBlock '''
+        _fields_ = [("pval", ctypes.POINTER(pmValueBlock)), ("lval", ctypes.c_int)]
+
+    class pmValue(ctypes.Structure):
+        ''' A pmValue '''
+        _fields_ = [("inst", ctypes.c_int), ("value", valueDref)]
+
+    class pmValueSet(ctypes.Structure):
+        ''' A pmValueSet '''
+        _fields_ = [("pmid", ctypes.c_uint), ("numval", ctypes.c_int), ("valfmt", ctypes.c_int),
+                    ("vlist", (pmValue * 1))]
+
+    STAND_IN = sys.modules['pcp.pmapi']
+    STAND_IN.pmValueBlock, STAND_IN.pmValue, STAND_IN.pmValueSet = pmValueBlock, pmValue, pmValueSet
+    STAND_IN.c_api.PM_TYPE_FLOAT, STAND_IN.c_api.PM_TYPE_DOUBLE, STAND_IN.c_api.PM_TYPE_STRING = 4, 5, 6
+    STAND_IN.c_api.PM_VAL_INSITU, STAND_IN.c_api.PM_VAL_DPTR = 0, 1
+
+# Removing invalid variable names for tests so that I can
+# keep them brief
+# pylint: disable=invalid-name
+# Disable import-error b/c our libraries aren't loaded in jenkins
+# pylint: disable=import-error,wrong-import-position
+from pcp import pmapi
+from openshift_tools.monitoring.pminfo import PMVALUE_BLOCK_HEADER, extract_values
+
+class ExtractValuesTest(unittest.TestCase):
+    '''
+     Test class for extract_values
+    '''
+
+    def setUp(self):
+        ''' setup method keeps the buffers behind the pmValueSets alive '''
+        self.buffers = []
+
+    def value_set(self, value_type, values, insitu):
+        ''' A pmValueSet laid out the way libpcp does, of values ([(instance id, value)]) '''
+        code = {pmapi.c_api.PM_TYPE_32: 'i', pmapi.c_api.PM_TYPE_U32: 'I', pmapi.c_api.PM_TYPE_64: 'q',
+                pmapi.c_api.PM_TYPE_U64: 'Q', pmapi.c_api.PM_TYPE_FLOAT: 'f',
+                pmapi.c_api.PM_TYPE_DOUBLE: 'd'}[value_type]
+
+        vset_buffer = ctypes.create_string_buffer(ctypes.sizeof(pmapi.pmValueSet) +
+                                                  max(len(values) - 1, 0) * ctypes.sizeof(pmapi.pmValue))
+        self.buffers.append(vset_buffer)
+        vset = pmapi.pmValueSet.from_buffer(vset_buffer)
+        vset.numval = len(values)
+        vset.valfmt = pmapi.c_api.PM_VAL_INSITU if insitu else pmapi.c_api.PM_VAL_DPTR
+        vlist = (pmapi.pmValue * max(len(values), 1)).from_address(ctypes.addressof(vset.vlist))
+
+        for j, (inst, value) in enumerate(values):
+            vlist[j].inst = inst
+            data = struct.pack('=' + code, value)
+            if insitu:
+                vlist[j].value.lval = struct.unpack('=i', data)[0]
+            else:
+                block = ctypes.create_string_buffer(PMVALUE_BLOCK_HEADER + len(data))
+                self.buffers.append(block)
+                struct.pack_into('=I', block, 0, ((PMVALUE_BLOCK_HEADER + len(data)) << 8) | value_type)
+                block[PMVALUE_BLOCK_HEADER:] = data
+                vlist[j].value.pval = ctypes.cast(block, ctypes.POINTER(pmapi.pmValueBlock))
+
+        return vset
+
+    def test_insitu_32bit(self):
+        ''' Testing 32 bit values kept in the pmValues themselves, signed and unsigned '''
+        inst_ids, values = extract_values(self.value_set(pmapi.c_api.PM_TYPE_32, [(0, -5), (3, 7)], True),
+                                          pmapi.c_api.PM_TYPE_32)
+        self.assertEqual(list(inst_ids), [0, 3])
+        self.assertEqual(list(values), [-5, 7])
+
+        inst_ids, values = extract_values(self.value_set(pmapi.c_api.PM_TYPE_U32, [(1, 2 ** 32 - 1)], True),
+                                          pmapi.c_api.PM_TYPE_U32)
+        self.assertEqual(list(inst_ids), [1])
+        self.assertEqual(list(values), [2 ** 32 - 1])
+
+    def test_pointer_u64(self):
+        ''' Testing 64 bit values kept in pmValueBlocks '''
+        vset = self.value_set(pmapi.c_api.PM_TYPE_U64, [(10, 2 ** 40 + 1), (11, 2 ** 64 - 1), (12, 0)], False)
+        inst_ids, values = extract_values(vset, pmapi.c_api.PM_TYPE_U64)
+
+        self.assertEqual(list(inst_ids), [10, 11, 12])
+        self.assertEqual(list(values), [2 ** 40 + 1, 2 ** 64 - 1, 0])
+
+    def test_pointer_double_float(self):
+        ''' Testing doubles and floats kept in pmValueBlocks '''
+        vset = self.value_set(pmapi.c_api.PM_TYPE_DOUBLE, [(0, 0.1), (1, -2.5e300)], False)
+        inst_ids, values = extract_values(vset, pmapi.c_api.PM_TYPE_DOUBLE)
+        self.assertEqual(list(inst_ids), [0, 1])
+        self.assertEqual(list(values), [0.1, -2.5e300])
+
+        vset = self.value_set(pmapi.c_api.PM_TYPE_FLOAT, [(4, 1.5), (5, -0.25)], False)
+        inst_ids, values = extract_values(vset, pmapi.c_api.PM_TYPE_FLOAT)
+        self.assertEqual(list(inst_ids), [4, 5])
+        self.assertEqual(list(values), [1.5, -0.25])
+
+    def test_no_values(self):
+        ''' Testing a metric without values, and one with an error code (a negative numval) '''
+        vset = self.value_set(pmapi.c_api.PM_TYPE_U64, [], False)
+        inst_ids, values = extract_values(vset, pmapi.c_api.PM_TYPE_U64)
+        self.assertEqual((list(inst_ids), list(values)), ([], []))
+
+        vset.numval = -12357
+        inst_ids, values = extract_values(vset, pmapi.c_api.PM_TYPE_U64)
+        self.assertEqual((list(inst_ids), list(values)), ([], []))
+
+        vset.valfmt = pmapi.c_api.PM_VAL_INSITU
+        inst_ids, values = extract_values(vset, pmapi.c_api.PM_TYPE_32)
+        self.assertEqual((list(inst_ids), list(values)), ([], []))
+
+    def test_needs_pmextractvalue(self):
+        ''' Testing that strings, and 64 bit values in place, are left to pmExtractValue '''
+        vset = self.value_set(pmapi.c_api.PM_TYPE_32, [(0, 1)], True)
+
+        self.assertEqual(extract_values(vset, pmapi.c_api.PM_TYPE_STRING), None)
+        self.assertEqual(extract_values(vset, pmapi.c_api.PM_TYPE_U64), None)
+
+if __name__ == "__main__":
+    unittest.main()
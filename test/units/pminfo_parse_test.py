@@ -0,0 +1,82 @@
+#!/usr/bin/env python2
+'''
+ Unit tests for PMInfoParser
+'''
+
+import unittest
+
+# Removing invalid variable names for tests so that I can
+# keep them brief
+# pylint: disable=invalid-name
+# Disable import-error b/c our libraries aren't loaded in jenkins
+# pylint: disable=import-error
+from openshift_tools.monitoring.pminfo_parse import PMInfoParser
+
+OUTPUT = '''
+kernel.all.load
+    inst [1 or "1 minute"] value 0.07
+    inst [5 or "5 minute"] value 0.1
+
+kernel.all.cpu.irq.hard
+    value 0
+
+quota.project.files.soft
+No value(s) available!
+
+kernel.uname.sysname
+    value "Linux"
+
+hinv.map.cpu_num
+    inst [0] value 0
+    inst [1] value 1
+'''
+
+class PMInfoParserTest(unittest.TestCase):
+    '''
+     Test class for PMInfoParser
+    '''
+
+    def test_parse(self):
+        ''' Testing the values of metrics with and without instances '''
+        results = PMInfoParser().parse(OUTPUT.splitlines(True))
+
+        self.assertEqual(results, {'kernel.all.load.1_minute': '0.07',
+                                   'kernel.all.load.5_minute': '0.1',
+                                   'kernel.all.cpu.irq.hard': '0',
+                                   'kernel.uname.sysname': '"Linux"',
+                                   'hinv.map.cpu_num.0': '0',
+                                   'hinv.map.cpu_num.1': '1'})
+
+    def test_error_drops_metric(self):
+        ''' Testing that a metric with an error has no values, even the ones before the error '''
+        lines = ['', 'mem.util.free', '    value 10', 'Error: Metric not supported', '    value 20', '',
+                 'mem.util.used', '    value 30']
+        results = PMInfoParser().parse(lines)
+
+        self.assertEqual(results, {'mem.util.used': '30'})
+
+    def test_string_value(self):
+        ''' Testing that a single string value keeps all of its words '''
+        results = PMInfoParser().parse(['', 'kernel.uname.version', '    value "#1 SMP Tue Jan 5"'])
+
+        self.assertEqual(results, {'kernel.uname.version': '"#1 SMP Tue Jan 5"'})
+
+    def test_unknown_line(self):
+        ''' Testing that an indented line that isn't a value is skipped '''
+        results = PMInfoParser().parse(['', 'disk.dev.read', '    inst [0 or "sda"] value 5',
+                                        '    something else', '    inst [1 or "sdb"] value 6'])
+
+        self.assertEqual(results, {'disk.dev.read.sda': '5', 'disk.dev.read.sdb': '6'})
+
+    def test_feed(self):
+        ''' Testing that results are kept line by line, as a metric ends '''
+        parser = PMInfoParser()
+        for line in ['\n', 'kernel.all.nprocs\n', '    value 200\n']:
+            parser.feed(line)
+        self.assertEqual(parser.results, {})
+
+        parser.feed('\n')
+        self.assertEqual(parser.results, {'kernel.all.nprocs': '200'})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python2
+'''
+ Unit tests for ZabbixMetricProcessor
+'''
+
+import shutil
+import tempfile
+import unittest
+
+# Removing invalid variable names for tests so that I can
+# keep them brief
+# pylint: disable=invalid-name
+# Disable import-error b/c our libraries aren't loaded in jenkins
+# pylint: disable=import-error
+from openshift_tools.monitoring.metricmanager import MetricManager, UniqueMetric
+from openshift_tools.monitoring.zabbix_metric_processor import ZabbixMetricProcessor, ZabbixSenderError
+
+class FakeSender(object):
+    '''
+     A zabbix trapper that refuses the metrics with a key of 'bad'
+    '''
+    # pylint: disable=too-few-public-methods
+    def __init__(self, up=True):
+        self.up = up
+        self.sent = []
+
+    def send_counted(self, metrics):
+        ''' Return (processed, failed) like ZabbixSender.send_counted '''
+        if not self.up:
+            raise ZabbixSenderError("connection refused")
+        self.sent += [m.unique_id for m in metrics]
+        failed = len([m for m in metrics if m.key == 'bad'])
+        return len(metrics) - failed, failed
+
+class ZabbixMetricProcessorTest(unittest.TestCase):
+    '''
+     Test class for ZabbixMetricProcessor
+    '''
+
+    def setUp(self):
+        ''' setup method will create a disk cache with a metric the trapper refuses '''
+        self.directory = tempfile.mkdtemp()
+        self.mm = MetricManager(self.directory)
+        self.metrics = [UniqueMetric('a.example.com', 'a.b.c', 1), UniqueMetric('a.example.com', 'bad', 'x')]
+        self.mm.write_metrics(self.metrics)
+
+    def tearDown(self):
+        ''' tearDown method will remove the disk cache '''
+        shutil.rmtree(self.directory)
+
+    def test_partly_refused_chunk(self):
+        ''' Testing that a chunk the trapper partly stored is never sent again '''
+        sender = FakeSender()
+        zmp = ZabbixMetricProcessor(self.mm, None, sender, 'zagg.example.com')
+        errors = zmp.process_zbx_metrics()
+
+        self.assertEqual(len(errors), 1)
+        for metric in self.metrics:
+            self.assertEqual(sender.sent.count(metric.unique_id), 1)
+        self.assertEqual(self.mm.read_metrics(), [])
+        self.assertEqual(self.mm.read_dead_letter_metrics(), [])
+
+    def test_refused_chunk(self):
+        ''' Testing that a chunk the trapper refused entirely is dead-lettered '''
+        self.mm.remove_metrics(self.metrics[0])
+        sender = FakeSender()
+        zmp = ZabbixMetricProcessor(self.mm, None, sender, 'zagg.example.com')
+        zmp.process_zbx_metrics()
+
+        self.assertEqual(sender.sent.count(self.metrics[1].unique_id), 1)
+        self.assertEqual(self.mm.read_metrics(), [])
+        self.assertEqual([m.key for m in self.mm.read_dead_letter_metrics()], ['bad'])
+
+    def test_trapper_down(self):
+        ''' Testing that an outage doesn't count as failed attempts '''
+        zmp = ZabbixMetricProcessor(self.mm, None, FakeSender(up=False), 'zagg.example.com',
+                                    max_attempts=1)
+        zmp.process_zbx_metrics()
+
+        self.assertEqual(self.mm.read_dead_letter_metrics(), [])
+        self.assertEqual([m.attempts for m in self.mm.read_metrics()], [0, 0, 0, 0])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python2
+'''
+ Unit tests for the ZabbixAPI batches and response cache
+'''
+
+import time
+import unittest
+
+# Removing invalid variable names for tests so that I can
+# keep them brief
+# pylint: disable=invalid-name
+# Disable import-error b/c our libraries aren't loaded in jenkins
+# pylint: disable=import-error
+from openshift_tools.zbxapi import ZabbixAPI, ZabbixAPICache, ZabbixAPIError, ZabbixConnection
+
+class FakeServer(object):
+    '''
+     Answers JSON-RPC requests in place of ZabbixAPI._post, in reverse order
+    '''
+    # pylint: disable=too-few-public-methods
+    def __init__(self):
+        self.requests = []
+
+    def post(self, body):
+        ''' Answer every call with its own method name, or an error for *.delete '''
+        self.requests.append(body)
+        if not isinstance(body, list):
+            return None, {'jsonrpc': '2.0', 'result': body['method'], 'id': body['id']}
+
+        content = []
+        for call in reversed(body):
+            if call['method'].endswith('.delete'):
+                content.append({'jsonrpc': '2.0', 'error': {'data': 'No permissions'}, 'id': call['id']})
+            else:
+                content.append({'jsonrpc': '2.0', 'result': call['method'], 'id': call['id']})
+        return None, content
+
+class ZabbixAPIBatchTest(unittest.TestCase):
+    '''
+     Test class for ZabbixAPIBatch
+    '''
+
+    def setUp(self):
+        ''' setup method will create a ZabbixAPI that talks to a FakeServer '''
+        self.server = FakeServer()
+        self.zapi = ZabbixAPI(ZabbixConnection('http://localhost/zabbix/api_jsonrpc.php', 'user', 'password'))
+        self.zapi.auth = 'token'
+        self.zapi._post = self.server.post
+
+    def test_results_by_id(self):
+        ''' Testing that responses in any order are matched up with their calls '''
+        with self.zapi.batch() as batch:
+            host = self.zapi.host.get(filter={'host': 'a.example.com'})
+            group = self.zapi.hostgroup.get(filter={'name': 'Linux servers'})
+            delete = self.zapi.item.delete(['1'])
+
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual([call.rid for call in batch.calls], [1, 2, 3])
+        self.assertEqual(host.result(), 'host.get')
+        self.assertEqual(group.result(), 'hostgroup.get')
+        self.assertEqual(delete.error(), {'data': 'No permissions'})
+        self.assertRaises(ZabbixAPIError, delete.result)
+
+    def test_max_size(self):
+        ''' Testing that a batch is sent in requests of up to max_size calls '''
+        with self.zapi.batch(max_size=2) as batch:
+            for i in range(5):
+                self.zapi.host.get(filter={'host': 'host%s' % i})
+
+        self.assertEqual([len(body) for body in self.server.requests], [2, 2, 1])
+        self.assertEqual([call.result() for call in batch.calls], ['host.get'] * 5)
+
+    def test_rejected_batch(self):
+        ''' Testing that every call gets the error of a rejected batch '''
+        self.zapi._post = lambda body: (None, {'jsonrpc': '2.0', 'error': {'data': 'Invalid request'}})
+        with self.zapi.batch() as batch:
+            self.zapi.host.get()
+            self.zapi.template.get()
+
+        self.assertEqual([call.error() for call in batch.calls], [{'data': 'Invalid request'}] * 2)
+
+    def test_not_sent_on_error(self):
+        ''' Testing that nothing is sent when the batch block raises '''
+        try:
+            with self.zapi.batch():
+                self.zapi.host.get()
+                raise ValueError()
+        except ValueError:
+            pass
+
+        self.assertEqual(self.server.requests, [])
+        self.assertEqual(self.zapi.host.get()[1]['result'], 'host.get')
+
+class ZabbixAPICacheTest(unittest.TestCase):
+    '''
+     Test class for ZabbixAPICache
+    '''
+
+    def test_params_order(self):
+        ''' Testing that the same params in any order are the same entry '''
+        cache = ZabbixAPICache(60, 10)
+        cache.put('host.get', {'output': 'extend', 'filter': {'host': 'a'}}, None, {'result': [1]})
+
+        self.assertEqual(cache.get('host.get', {'filter': {'host': 'a'}, 'output': 'extend'}),
+                         (None, {'result': [1]}))
+        self.assertEqual(cache.get('host.get', {'filter': {'host': 'b'}, 'output': 'extend'}), None)
+        self.assertEqual(cache.stats['hits'], 1)
+        self.assertEqual(cache.stats['misses'], 1)
+
+    def test_copy(self):
+        ''' Testing that changing what the cache returned doesn't change the cache '''
+        cache = ZabbixAPICache(60, 10)
+        cache.put('host.get', {}, None, {'result': [1]})
+        cache.get('host.get', {})[1]['result'].append(2)
+
+        self.assertEqual(cache.get('host.get', {}), (None, {'result': [1]}))
+
+    def test_ttl(self):
+        ''' Testing that entries expire '''
+        cache = ZabbixAPICache(0.01, 10)
+        cache.put('host.get', {}, None, {'result': []})
+        time.sleep(0.02)
+
+        self.assertEqual(cache.get('host.get', {}), None)
+
+    def test_lru(self):
+        ''' Testing that the least recently used entry is evicted '''
+        cache = ZabbixAPICache(60, 2)
+        cache.put('host.get', {'hostids': 1}, None, {'result': [1]})
+        cache.put('host.get', {'hostids': 2}, None, {'result': [2]})
+        cache.get('host.get', {'hostids': 1})
+        cache.put('host.get', {'hostids': 3}, None, {'result': [3]})
+
+        self.assertEqual(cache.get('host.get', {'hostids': 2}), None)
+        self.assertEqual(cache.get('host.get', {'hostids': 1}), (None, {'result': [1]}))
+        self.assertEqual(cache.stats['evictions'], 1)
+
+    def test_invalidate(self):
+        ''' Testing that a class is dropped without touching the others '''
+        cache = ZabbixAPICache(60, 10)
+        cache.put('host.get', {}, None, {'result': []})
+        cache.put('item.get', {}, None, {'result': []})
+        cache.invalidate('host')
+
+        self.assertEqual(cache.get('host.get', {}), None)
+        self.assertEqual(cache.get('item.get', {}), (None, {'result': []}))
+
+    def test_zapi_invalidate(self):
+        ''' Testing that writes, batched or not, drop the cached gets of their class '''
+        server = FakeServer()
+        zapi = ZabbixAPI(ZabbixConnection('http://localhost/zabbix/api_jsonrpc.php', 'user', 'password',
+                                          cache_ttl=60))
+        zapi.auth = 'token'
+        zapi._post = server.post
+
+        zapi.host.get()
+        zapi.item.get()
+        zapi.host.get()
+        self.assertEqual(len(server.requests), 2)
+
+        zapi.host.update({'hostid': '1'})
+        zapi.host.get()
+        self.assertEqual(len(server.requests), 4)
+
+        with zapi.batch():
+            zapi.item.create({'name': 'a'})
+        zapi.item.get()
+        zapi.host.get()
+        self.assertEqual(len(server.requests), 6)
+
+    def test_pages_not_cached(self):
+        ''' Testing that the pages of iter_history neither come from nor go into the cache '''
+        server = FakeServer()
+        zapi = ZabbixAPI(ZabbixConnection('http://localhost/zabbix/api_jsonrpc.php', 'user', 'password',
+                                          cache_ttl=60))
+        zapi.auth = 'token'
+
+        def post(body):
+            ''' No history at all '''
+            server.post(body)
+            return None, {'jsonrpc': '2.0', 'result': [], 'id': body['id']}
+        zapi._post = post
+
+        list(zapi.iter_history(0, 7200, {'history': 0}))
+        list(zapi.iter_history(0, 7200, {'history': 0}))
+
+        self.assertEqual(len(server.requests), 4)
+        self.assertEqual(zapi.cache_stats()['size'], 0)
+
+if __name__ == "__main__":
+    unittest.main()